@@ -5,45 +5,56 @@
 # - https://www.youtube.com/watch?v=MwZwr5Tvyxo
 # - https://www.youtube.com/watch?v=QnDWIZuWYW0
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
-from models import db
-from datetime import date
+from flask import Flask
+from exts import db, template_cache
+from compression import compression
+from instrumentation.queries import query_tracker
+from instrumentation.metrics import metrics
+from instrumentation.profiler import profiler
+from instrumentation.slowQueries import slow_query_log
+from instrumentation.tracing import tracer
+from instrumentation.memory import memory_tracker
 import config
-import os
-import hashlib
-import re
-
-from routes.registration import registration_page
-from routes.coupon import coupon_page
-from routes.achievement import achievement_page
-from routes.qrCode import qr_page
-from routes.home import home_page
-from routes.employee import employee_page
-from routes.profile import profile_page
-from routes.search import search_page
-from routes.login import login_page
-from routes.milestones import milestones_page
-from routes.restaurant import restaurant_page
-from routes.leaderboard import leaderboard_page
-
-app = Flask(__name__)
-app.register_blueprint(registration_page)
-app.register_blueprint(coupon_page)
-app.register_blueprint(achievement_page)
-app.register_blueprint(home_page)
-app.register_blueprint(employee_page)
-app.register_blueprint(profile_page)
-app.register_blueprint(search_page)
-app.register_blueprint(login_page)
-app.register_blueprint(qr_page)
-app.register_blueprint(milestones_page)
-app.register_blueprint(restaurant_page)
-app.register_blueprint(leaderboard_page)
-app.secret_key = 'shhhh'
-
-app.config.from_object(config)
-
-db.init_app(app)
+
+from routes.urls import blueprints
+
+
+def create_app(config_object=config, **settings):
+    """
+    Creates a new instance of the app.
+
+    Every app shares the single db registry in exts.py but gets its own engines,
+    so several isolated apps (e.g. one per test worker) can live in one process.
+
+    Args:
+        config_object: The module or object the configuration is loaded from.
+        settings: Configuration values overriding the ones in config_object.
+
+    Returns:
+        The new Flask app.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    app.config.update(settings)
+
+    db.init_app(app)
+    template_cache.init_app(app)
+    # Registered first so it runs last, once every other hook has set its headers
+    compression.init_app(app)
+    query_tracker.init_app(app)
+    metrics.init_app(app)
+    profiler.init_app(app)
+    slow_query_log.init_app(app)
+    tracer.init_app(app)
+    memory_tracker.init_app(app)
+
+    for blueprint in blueprints:
+        app.register_blueprint(blueprint)
+
+    return app
+
+
+app = create_app()
 
 if __name__ == '__main__':
     app.run()
@@ -0,0 +1,67 @@
+###################################################
+#                                                 #
+#   Compares a benchmark run against a stored     #
+#   baseline and reports the regressions.         #
+#                                                 #
+###################################################
+
+import json
+
+# Latencies are compared at these percentiles
+PERCENTILES = ['p50', 'p95']
+
+# Differences below this many milliseconds are timer noise, never regressions
+MIN_DIFFERENCE = 1.0
+
+
+def load(path):
+    """
+    Reads a benchmark run written by the benchmark command.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(run, path):
+    """
+    Writes a benchmark run to a JSON file.
+    """
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(baseline, current, threshold=0.2, query_threshold=0):
+    """
+    Finds the benchmarks that got slower or send more queries than in the
+    baseline.
+
+    Benchmarks missing from either run are not compared.
+
+    Args:
+        baseline: The stored run, as returned by load.
+        current: The new run.
+        threshold: The allowed latency increase, 0.2 allows p50 and p95 to be
+            20% slower than in the baseline.
+        query_threshold: The number of extra queries allowed.
+
+    Returns:
+        A list of messages, one for each regression, empty if there is none.
+    """
+    regressions = []
+    for name, new in sorted(current['results'].items()):
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        if new['errors'] > old['errors']:
+            regressions.append("%s: %d errors, was %d" % (name, new['errors'], old['errors']))
+        for p in PERCENTILES:
+            if old[p] is None or new[p] is None:
+                continue
+            if new[p] > old[p] * (1 + threshold) and new[p] - old[p] > MIN_DIFFERENCE:
+                regressions.append("%s: %s %.3fms, was %.3fms (+%.0f%%)"
+                                   % (name, p, new[p], old[p], (new[p] / old[p] - 1) * 100 if old[p] else float('inf')))
+        if old['queries'] is not None and new['queries'] is not None \
+                and new['queries'] > old['queries'] + query_threshold:
+            regressions.append("%s: %d queries, was %d" % (name, new['queries'], old['queries']))
+    return regressions
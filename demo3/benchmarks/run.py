@@ -0,0 +1,401 @@
+###################################################
+#                                                 #
+#   Times every databaseHelpers function and      #
+#   every route against a seeded database.        #
+#                                                 #
+###################################################
+
+import importlib
+import inspect
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import date, datetime
+
+from flask import current_app
+
+from exts import db, rolled_back
+from databaseHelpers.achievement import clear_achievement_rules
+from databaseHelpers.threshold import clear_milestones
+from instrumentation.queries import count_queries
+from models import Restaurant, Redeemed_Coupons, Customer_Achievement_Progress, Achievements, User, Points
+from benchmarks.seed import PASSWORD
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# qr_code writes image files and customerImport reads them, rather than
+# answering a request
+EXCLUDED_MODULES = ['qr_code', 'customerImport']
+
+# Helpers that read a file, for the same reason
+EXCLUDED_HELPERS = ['receipt.ingest_export']
+
+# Plain values passed to helper parameters with these names
+VALUES = {
+    'level': 3,
+    'reward': 50,
+    'name': "Benchmark",
+    'rname': "Benchmark",
+    'address': "1 Benchmark street",
+    'password': PASSWORD,
+    'password1': PASSWORD,
+    'password2': PASSWORD,
+    'type': 0,
+    'value': "Burger;3;True;;",
+    'experience': 120,
+    'points': 50,
+    'description': "Benchmark",
+    'begin': None,
+    'expiration': None,
+    'indefinite': True,
+    'increment': 10,
+    'total': 5,
+    'n': 50,
+    'limit': 10,
+    'sort': 'level',
+    'old_level': 0,
+    'new_level': 10,
+    'today': date.today(),
+    'chunk_size': 1000,
+    'model': Points,
+    'column': 'points',
+    'log': lambda message: None,
+}
+
+# Endpoints that only an owner can open, every other endpoint is opened as a customer
+OWNER_ENDPOINTS = [
+    'achievement_page.achievement',
+    'achievement_page.create_achievement',
+    'achievement_page.achievement_stats',
+    'achievement_page.use_achievement',
+    'coupon_page.create_coupon',
+    'coupon_page.couponStats',
+    'coupon_page.use_coupon',
+    'employee_page.employee',
+    'leaderboard_page.leaderboard',
+    'milestones_page.settings',
+    'profile_page.edit_restaurant_info',
+    'registration_page.employee_register',
+]
+
+SKIPPED_ENDPOINTS = ['static']
+
+# Helpers that need another sample than the one named like their parameter
+OVERRIDES = {
+    'achievementProgress.insert_new_achievement': {'uid': 'new_customer'},
+    'receipt.apply_receipts': {'receipts': 'cleaned_receipts'},
+    'receipt.evaluate_receipt': {'receipt': 'cleaned_receipt'},
+}
+
+
+def get_samples():
+    """
+    Picks the IDs passed to helpers and routes from the seeded database.
+
+    The sample customer has both redeemed a coupon and made progress on an
+    achievement, so every helper has rows to work on.
+
+    Returns:
+        A dictionary of IDs and plain values keyed by parameter name.
+    """
+    customers = db.session.query(Customer_Achievement_Progress.uid)
+    redeemed = Redeemed_Coupons.query.filter(Redeemed_Coupons.uid.in_(customers)) \
+        .order_by(Redeemed_Coupons.rcid).first()
+    if redeemed is None:
+        raise RuntimeError("The benchmark database is empty, run seed_benchmark first.")
+    progress = Customer_Achievement_Progress.query \
+        .join(Achievements, Achievements.aid == Customer_Achievement_Progress.aid) \
+        .filter(Customer_Achievement_Progress.uid == redeemed.uid, Achievements.rid == redeemed.rid) \
+        .order_by(Customer_Achievement_Progress.aid).first()
+    if progress is None:
+        progress = Customer_Achievement_Progress.query.filter(Customer_Achievement_Progress.uid == redeemed.uid) \
+            .order_by(Customer_Achievement_Progress.aid).first()
+    aid = progress.aid
+    new_customer = User.query.filter(User.type == -1, User.uid.notin_(customers)).first()
+    samples = dict(VALUES)
+    samples.update({
+        'uid': redeemed.uid,
+        'rid': redeemed.rid,
+        'cid': redeemed.cid,
+        'rcid': redeemed.rcid,
+        'aid': aid,
+        'new_customer': new_customer.uid if new_customer else None,
+        'email': User.query.get(redeemed.uid).email,
+        'owner': Restaurant.query.get(redeemed.rid).uid,
+    })
+    return samples
+
+
+def get_objects(samples):
+    """
+    Builds the arguments of helpers that take rows or lists returned by other
+    helpers.
+
+    The helpers are imported here since they are only needed once the
+    database has been seeded.
+
+    Returns:
+        A dictionary of functions, keyed by parameter name, that build a fresh
+        argument. Helpers may change what they are given, so every call gets
+        its own copy.
+    """
+    from databaseHelpers.achievement import get_achievements_by_rid, get_achievement_rule
+    from databaseHelpers.achievementProgress import get_exact_achivement_progress, get_recently_update_achievements
+    from databaseHelpers.coupon import get_coupons
+    from databaseHelpers.leaderboard import top_n_in_order
+    from databaseHelpers.receipt import parse_receipt, parse_receipts
+    from databaseHelpers.restaurant import get_resturant_by_rid
+    from models import Coupon
+
+    rid, uid, aid = samples['rid'], samples['uid'], samples['aid']
+
+    def receipt():
+        return {'uid': uid, 'rid': rid, 'items': [{'name': "Burger", 'quantity': 1}], 'total': 20.0, 'party': 2}
+
+    return {
+        'restaurant': lambda: get_resturant_by_rid(rid),
+        'achievement': lambda: Achievements.query.get(aid),
+        'rule': lambda: get_achievement_rule(aid),
+        'achievements': lambda: get_achievements_by_rid(rid),
+        'achievements_progress': lambda: get_exact_achivement_progress(aid, uid),
+        'achievement_progress': lambda: get_exact_achivement_progress(aid, uid),
+        'recent_achievements': lambda: get_recently_update_achievements(uid),
+        'coupon': lambda: Coupon.query.get(samples['cid']),
+        'coupons': lambda: get_coupons(rid),
+        'list': lambda: top_n_in_order(rid, 50),
+        'errmsg': lambda: [],
+        'receipt': receipt,
+        'receipts': lambda: [receipt()],
+        'cleaned_receipt': lambda: parse_receipt(receipt())[1],
+        'cleaned_receipts': lambda: parse_receipts([receipt()])[1],
+        'chunk': lambda: [(1, receipt())],
+        'totals': lambda: {'read': 0, 'rejected': 0, 'advanced': 0, 'completed': 0},
+        'rewards': lambda: {(uid, rid): 10},
+    }
+
+
+def get_helpers(modules=None):
+    """
+    Finds the functions defined in each databaseHelpers module.
+
+    Functions a module imports from another module are skipped, so every
+    helper is timed once, and so are private functions, which are timed
+    through the helpers calling them.
+
+    Args:
+        modules: Names of the modules to load, every module if None.
+
+    Returns:
+        A list of (name, function) tuples, the name being module.function.
+    """
+    if modules is None:
+        folder = os.path.join(ROOT, 'databaseHelpers')
+        modules = sorted(f[:-3] for f in os.listdir(folder) if f.endswith('.py'))
+    helpers = []
+    for name in modules:
+        if name in EXCLUDED_MODULES:
+            continue
+        module = importlib.import_module('databaseHelpers.' + name)
+        for attr, f in inspect.getmembers(module, inspect.isfunction):
+            if attr.startswith('_') or name + '.' + attr in EXCLUDED_HELPERS:
+                continue
+            if inspect.unwrap(f).__module__ == module.__name__:
+                helpers.append((name + '.' + attr, f))
+    return helpers
+
+
+def get_routes(app):
+    """
+    Lists one URL for every endpoint of the app.
+
+    Returns:
+        A list of (endpoint, rule) tuples.
+    """
+    routes = {}
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: (len(r.rule), r.rule)):
+        if rule.endpoint in SKIPPED_ENDPOINTS or 'GET' not in rule.methods:
+            continue
+        routes.setdefault(rule.endpoint, rule)
+    return sorted(routes.items())
+
+
+def route_url(rule, samples):
+    """
+    Fills the variables of a URL rule with the sample IDs.
+    """
+    values = {
+        'rid': samples['rid'],
+        'uid': samples['uid'],
+        'aid': samples['aid'],
+        'cid': samples['cid'],
+        'rname': "Benchmark",
+        'scanType': 0,
+        'itemType': "Coupon",
+        'forbiddenType': 0,
+        'name': "none.json",
+    }
+    return rule.build({k: values[k] for k in rule.arguments})[1]
+
+
+def summarize(durations, queries, errors):
+    """
+    Turns the measurements of a benchmark into its result entry.
+
+    Args:
+        durations: The time taken by each iteration, in seconds.
+        queries: The number of statements sent by each iteration.
+        errors: The number of iterations that raised an exception.
+
+    Returns:
+        A dictionary with p50, p95 and mean in milliseconds, the median number
+        of queries, the number of iterations and the number of errors.
+    """
+    if not durations:
+        return {'p50': None, 'p95': None, 'mean': None, 'queries': None, 'iterations': 0, 'errors': errors}
+    ordered = sorted(durations)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        'p50': round(statistics.median(ordered) * 1000, 3),
+        'p95': round(p95 * 1000, 3),
+        'mean': round(statistics.mean(ordered) * 1000, 3),
+        'queries': int(statistics.median(queries)),
+        'iterations': len(durations),
+        'errors': errors,
+    }
+
+
+def measure(call, iterations, warmup=1):
+    """
+    Runs call repeatedly, each time in a rolled back transaction.
+
+    Args:
+        call: A function taking no argument that prepares what it needs and
+            returns the function to be timed.
+        iterations: The number of timed iterations.
+        warmup: The number of untimed iterations run first.
+
+    Returns:
+        The result entry of the benchmark, see summarize.
+    """
+    durations, queries, errors = [], [], 0
+    for i in range(warmup + iterations):
+        with rolled_back():
+            try:
+                timed = call()
+                with count_queries() as log:
+                    start = time.perf_counter()
+                    timed()
+                    duration = time.perf_counter() - start
+            except Exception:
+                errors += 1
+                continue
+            finally:
+                # The rules and thresholds cached in the transaction were rolled back with it
+                clear_achievement_rules()
+                clear_milestones()
+        if i >= warmup:
+            durations.append(duration)
+            queries.append(log.count)
+    return summarize(durations, queries, errors)
+
+
+def benchmark_helpers(samples, iterations, match=None):
+    """
+    Times every databaseHelpers function with the sample arguments.
+
+    Returns:
+        A dictionary of result entries keyed by "helper:module.function".
+    """
+    results = {}
+    for name, f in get_helpers():
+        if match and match not in name:
+            continue
+
+        def call(f=f, overrides=OVERRIDES.get(name, {})):
+            objects = get_objects(samples)
+            args = []
+            for param, spec in inspect.signature(f).parameters.items():
+                if overrides.get(param, param) in objects:
+                    args.append(objects[overrides.get(param, param)]())
+                elif spec.default is not spec.empty and overrides.get(param, param) not in samples:
+                    # Optional parameters without a sample keep their default
+                    break
+                else:
+                    args.append(samples[overrides.get(param, param)])
+            return lambda: f(*args)
+
+        results['helper:' + name] = measure(call, iterations)
+    return results
+
+
+def benchmark_routes(app, samples, iterations, match=None):
+    """
+    Times a GET of every route through the Flask test client.
+
+    Returns:
+        A dictionary of result entries keyed by "route:endpoint".
+    """
+    client = app.test_client()
+    results = {}
+    for endpoint, rule in get_routes(app):
+        if match and match not in endpoint:
+            continue
+        url = route_url(rule, samples)
+        if endpoint in OWNER_ENDPOINTS:
+            account, type = samples['owner'], 1
+        else:
+            account, type = samples['uid'], -1
+
+        def call(url=url, account=account, type=type):
+            with client.session_transaction() as session:
+                session['account'] = account
+                session['type'] = type
+            # Streamed pages run their queries while the body is read
+            return lambda: client.get(url).get_data()
+
+        results['route:' + endpoint] = measure(call, iterations)
+    return results
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(iterations=20, match=None):
+    """
+    Runs the helper and route benchmarks against the current app's database.
+
+    Args:
+        iterations: The number of timed iterations of each benchmark.
+        match: Only run the benchmarks whose name contains this string.
+
+    Returns:
+        A dictionary with a 'meta' entry describing the run and a 'results'
+        entry with the result of each benchmark.
+    """
+    app = current_app._get_current_object()
+    samples = get_samples()
+    rows = {table.name: db.session.execute(table.count()).scalar()
+            for table in db.Model.metadata.sorted_tables}
+    db.session.remove()
+
+    results = {}
+    results.update(benchmark_helpers(samples, iterations, match))
+    results.update(benchmark_routes(app, samples, iterations, match))
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'database': repr(db.engine.url),
+            'iterations': iterations,
+            'rows': rows,
+        },
+        'results': results,
+    }
@@ -0,0 +1,257 @@
+###################################################
+#                                                 #
+#   Fills a benchmark database with synthetic     #
+#   data at a configurable scale using bulk       #
+#   inserts.                                      #
+#                                                 #
+###################################################
+
+import hashlib
+import random
+from datetime import date, datetime, timedelta
+
+from exts import db
+from models import User, Coupon, Restaurant, Points, Experience, Employee, Redeemed_Coupons, \
+    Customer_Achievement_Progress, Achievements, Thresholds, Favourite
+
+# Number of rows sent to the database in one executemany call
+CHUNK_SIZE = 10000
+
+# Rows generated per restaurant / per customer, whatever the scale
+COUPONS_PER_RESTAURANT = 20
+ACHIEVEMENTS_PER_RESTAURANT = 10
+THRESHOLDS_PER_RESTAURANT = 5
+EMPLOYEES_PER_RESTAURANT = 3
+RESTAURANTS_PER_CUSTOMER = 3
+FAVOURITES_PER_CUSTOMER = 2
+
+SCALES = {
+    'tiny': {'restaurants': 5, 'users': 200, 'progress': 500, 'redemptions': 300},
+    'small': {'restaurants': 100, 'users': 10000, 'progress': 100000, 'redemptions': 25000},
+    'medium': {'restaurants': 1000, 'users': 100000, 'progress': 2000000, 'redemptions': 500000},
+    'large': {'restaurants': 10000, 'users': 1000000, 'progress': 20000000, 'redemptions': 5000000},
+}
+
+PASSWORD = hashlib.md5("password".encode()).hexdigest()
+ITEMS = ["Burger", "Fries", "Coffee", "Salad", "Pizza", "Sushi", "Taco", "Soup"]
+
+
+def get_scale(scale, **overrides):
+    """
+    Gets the row counts for a named scale.
+
+    Args:
+        scale: One of the names in SCALES.
+        overrides: Row counts replacing the ones of the named scale, e.g. users=5000.
+
+    Returns:
+        A dictionary with the keys 'restaurants', 'users', 'progress' and 'redemptions'.
+    """
+    counts = dict(SCALES[scale])
+    counts.update({k: int(v) for k, v in overrides.items() if v is not None})
+    return counts
+
+
+def get_layout(counts):
+    """
+    Computes which user IDs are owners, employees and customers.
+
+    Owners take the first IDs, then employees, then customers.
+
+    Args:
+        counts: The row counts returned by get_scale.
+
+    Returns:
+        A dictionary with the first and last uid of each kind of user.
+    """
+    restaurants = counts['restaurants']
+    employees = restaurants * EMPLOYEES_PER_RESTAURANT
+    first_customer = restaurants + employees + 1
+    return {
+        'owners': (1, restaurants),
+        'employees': (restaurants + 1, restaurants + employees),
+        'customers': (first_customer, max(counts['users'], first_customer)),
+    }
+
+
+def chunked(rows, size=CHUNK_SIZE):
+    """
+    Groups an iterator of rows into lists of at most size rows.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_insert(model, rows):
+    """
+    Inserts rows into the model's table with one executemany per chunk.
+
+    Args:
+        model: The model whose table is filled.
+        rows: An iterator of dictionaries keyed by column name.
+
+    Returns:
+        The number of rows inserted.
+    """
+    total = 0
+    for chunk in chunked(rows):
+        db.session.execute(model.__table__.insert(), chunk)
+        db.session.commit()
+        total += len(chunk)
+    return total
+
+
+def user_rows(counts):
+    layout = get_layout(counts)
+    for uid in range(1, layout['customers'][1] + 1):
+        if uid <= layout['owners'][1]:
+            type = 1
+        elif uid <= layout['employees'][1]:
+            type = 2 if uid % EMPLOYEES_PER_RESTAURANT == 0 else 0
+        else:
+            type = -1
+        yield {'uid': uid, 'name': "user%d" % uid, 'email': "user%d@bench.test" % uid,
+               'password': PASSWORD, 'type': type}
+
+
+def restaurant_rows(counts):
+    for rid in range(1, counts['restaurants'] + 1):
+        yield {'rid': rid, 'name': "Restaurant %d" % rid, 'address': "%d Bench street" % rid, 'uid': rid}
+
+
+def employee_rows(counts):
+    first, last = get_layout(counts)['employees']
+    for uid in range(first, last + 1):
+        yield {'uid': uid, 'rid': (uid - first) // EMPLOYEES_PER_RESTAURANT + 1}
+
+
+def coupon_rows(counts, rng):
+    today = date.today()
+    cid = 0
+    for rid in range(1, counts['restaurants'] + 1):
+        for i in range(COUPONS_PER_RESTAURANT):
+            cid += 1
+            row = {'cid': cid, 'rid': rid, 'deleted': 1 if i % 10 == 9 else 0, 'name': "Coupon %d" % cid,
+                   'points': rng.randint(0, 50) * 10, 'description': "Synthetic coupon %d" % cid,
+                   'level': rng.randint(0, 10), 'begin': None, 'expiration': None}
+            if i % 4 == 0:
+                row['begin'] = today - timedelta(days=rng.randint(0, 400))
+                row['expiration'] = row['begin'] + timedelta(days=rng.randint(0, 400))
+            yield row
+
+
+def achievement_rows(counts, rng):
+    today = date.today()
+    aid = 0
+    for rid in range(1, counts['restaurants'] + 1):
+        for i in range(ACHIEVEMENTS_PER_RESTAURANT):
+            aid += 1
+            type = i % 4
+            quantity = rng.randint(2, 10) if type in (0, 3) else rng.randint(2, 8)
+            value = "%s;%d;True;;" % (ITEMS[aid % len(ITEMS)] if type == 0 else "", quantity)
+            if i % 3 == 0:
+                begin = today - timedelta(days=rng.randint(0, 400))
+                value = "%s;%d;False;%s;%s" % (ITEMS[aid % len(ITEMS)] if type == 0 else "", quantity,
+                                               begin, begin + timedelta(days=rng.randint(0, 400)))
+            yield {'aid': aid, 'rid': rid, 'name': "Achievement %d" % aid, 'experience': rng.randint(1, 20) * 10,
+                   'points': rng.randint(1, 20) * 10, 'type': type, 'value': value}
+
+
+def threshold_rows(counts, rng):
+    for rid in range(1, counts['restaurants'] + 1):
+        for i in range(1, THRESHOLDS_PER_RESTAURANT + 1):
+            yield {'rid': rid, 'level': i * 2, 'reward': rng.randint(1, 10) * 50}
+
+
+def customer_restaurants(uid, counts, per_customer):
+    """
+    Picks distinct restaurants for a customer, the same ones on every run.
+    """
+    restaurants = counts['restaurants']
+    return sorted({(uid * 7 + j * 13) % restaurants + 1 for j in range(min(per_customer, restaurants))})
+
+
+def membership_rows(counts, rng, column):
+    first, last = get_layout(counts)['customers']
+    for uid in range(first, last + 1):
+        for rid in customer_restaurants(uid, counts, RESTAURANTS_PER_CUSTOMER):
+            if column == 'points':
+                yield {'uid': uid, 'rid': rid, 'points': rng.randint(0, 100) * 10}
+            else:
+                yield {'uid': uid, 'rid': rid, 'experience': rng.randint(0, 300) * 10}
+
+
+def favourite_rows(counts):
+    first, last = get_layout(counts)['customers']
+    for uid in range(first, last + 1):
+        for rid in customer_restaurants(uid, counts, FAVOURITES_PER_CUSTOMER):
+            yield {'uid': uid, 'rid': rid}
+
+
+def progress_rows(counts, rng):
+    first, last = get_layout(counts)['customers']
+    achievements = counts['restaurants'] * ACHIEVEMENTS_PER_RESTAURANT
+    customers = last - first + 1
+    now = datetime.now()
+    # Walking achievements fastest keeps every (aid, uid) pair unique
+    for n in range(min(counts['progress'], achievements * customers)):
+        total = rng.randint(1, 10)
+        yield {'aid': n % achievements + 1, 'uid': first + n // achievements, 'progress': rng.randint(0, total),
+               'total': total, 'update': now - timedelta(minutes=rng.randint(0, 500000))}
+
+
+def redemption_rows(counts, rng):
+    first, last = get_layout(counts)['customers']
+    coupons = counts['restaurants'] * COUPONS_PER_RESTAURANT
+    for n in range(counts['redemptions']):
+        cid = rng.randint(1, coupons)
+        yield {'cid': cid, 'uid': rng.randint(first, last), 'rid': (cid - 1) // COUPONS_PER_RESTAURANT + 1,
+               'valid': rng.randint(0, 1)}
+
+
+def seed(counts, random_seed=0, log=print):
+    """
+    Drops and recreates every table of the current app's database and fills
+    them with synthetic rows.
+
+    Args:
+        counts: The row counts returned by get_scale.
+        random_seed: Seed for the generator, the same seed gives the same data.
+        log: Function called with a progress message after each table.
+
+    Returns:
+        A dictionary with the number of rows inserted into each table.
+    """
+    rng = random.Random(random_seed)
+    db.drop_all()
+    db.create_all()
+    if db.engine.url.drivername.startswith('sqlite'):
+        db.session.execute("PRAGMA synchronous = OFF")
+        db.session.execute("PRAGMA journal_mode = MEMORY")
+
+    tables = [
+        (User, user_rows(counts)),
+        (Restaurant, restaurant_rows(counts)),
+        (Employee, employee_rows(counts)),
+        (Coupon, coupon_rows(counts, rng)),
+        (Achievements, achievement_rows(counts, rng)),
+        (Thresholds, threshold_rows(counts, rng)),
+        (Points, membership_rows(counts, rng, 'points')),
+        (Experience, membership_rows(counts, rng, 'experience')),
+        (Favourite, favourite_rows(counts)),
+        (Customer_Achievement_Progress, progress_rows(counts, rng)),
+        (Redeemed_Coupons, redemption_rows(counts, rng)),
+    ]
+    inserted = {}
+    for model, rows in tables:
+        start = datetime.now()
+        inserted[model.__tablename__] = bulk_insert(model, rows)
+        log("%s: %d rows in %.1fs" % (model.__tablename__, inserted[model.__tablename__],
+                                        (datetime.now() - start).total_seconds()))
+    return inserted
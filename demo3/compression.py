@@ -0,0 +1,211 @@
+###################################################
+#                                                 #
+#   Compresses HTML and JSON responses with       #
+#   brotli or gzip, whichever the client          #
+#   accepts, streamed pages included.             #
+#                                                 #
+###################################################
+
+import os
+import time
+import zlib
+
+from flask import current_app, request
+from prometheus_client import Counter
+
+# Brotli is smaller than gzip but is a compiled extension, without it only
+# gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSED_RESPONSES = Counter('pickeasy_compressed_responses_total', 'Responses compressed',
+                               ['encoding', 'level'])
+COMPRESSION_BYTES_IN = Counter('pickeasy_compression_in_bytes_total', 'Bytes of responses before compression',
+                               ['encoding'])
+COMPRESSION_BYTES_SAVED = Counter('pickeasy_compression_saved_bytes_total', 'Bytes saved by compressing responses',
+                                  ['encoding'])
+
+_load = {'checked': 0.0, 'busy': False}
+
+
+def parse_accept_encoding(header):
+    """
+    Reads an Accept-Encoding header.
+
+    Returns:
+        A dict mapping each encoding to its quality, between 0 and 1.
+    """
+    encodings = {}
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def choose_encoding(header):
+    """
+    Picks the encoding of a response, brotli before gzip at equal quality.
+
+    Returns:
+        'br', 'gzip' or None when the client accepts neither.
+    """
+    accepted = parse_accept_encoding(header or '')
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_quality = None, 0.0
+    for encoding in offered:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_busy(threshold):
+    """
+    Checks whether the machine's CPUs are busy, from the load average per
+    CPU over the last minute. The answer is cached for a second.
+
+    Args:
+        threshold: The load per CPU above which the CPUs count as busy.
+
+    Returns:
+        True if the load is above threshold, False otherwise or when the
+        platform has no load average.
+    """
+    now = time.monotonic()
+    if now - _load['checked'] >= 1:
+        _load['checked'] = now
+        try:
+            _load['busy'] = os.getloadavg()[0] / (os.cpu_count() or 1) >= threshold
+        except (AttributeError, OSError):
+            _load['busy'] = False
+    return _load['busy']
+
+
+class Encoder(object):
+    """
+    Compresses a response body a chunk at a time.
+    """
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=level)
+        else:
+            # 16 + MAX_WBITS writes the gzip header and trailer
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        """
+        Compresses a chunk and flushes it, so the client can show it before
+        the next chunk is ready.
+        """
+        if self.encoding == 'br':
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+def count_saved(encoding, level, before, after):
+    COMPRESSED_RESPONSES.labels(encoding, str(level)).inc()
+    COMPRESSION_BYTES_IN.labels(encoding).inc(before)
+    COMPRESSION_BYTES_SAVED.labels(encoding).inc(before - after)
+
+
+class Compression(object):
+    """
+    Compresses the responses whose mimetype is in COMPRESS_MIMETYPES with the
+    best encoding the client accepts, brotli or gzip.
+
+    Responses smaller than COMPRESS_MIN_SIZE bytes are sent as they are.
+    Streamed pages are compressed while they are sent, each chunk flushed so
+    the page header still arrives first. While the load per CPU is above
+    COMPRESS_BUSY_LOAD the fastest level is used instead of COMPRESS_LEVEL,
+    trading size for CPU time.
+
+    The bytes before and after compression are counted per encoding in the
+    metrics.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIMETYPES', ['text/html', 'application/json'])
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', {'gzip': 6, 'br': 5})
+        app.config.setdefault('COMPRESS_BUSY_LEVEL', {'gzip': 1, 'br': 1})
+        app.config.setdefault('COMPRESS_BUSY_LOAD', 0.8)
+        app.after_request(self.compress)
+
+    def get_level(self, encoding):
+        config = current_app.config
+        levels = config['COMPRESS_BUSY_LEVEL'] if is_busy(config['COMPRESS_BUSY_LOAD']) else config['COMPRESS_LEVEL']
+        return levels[encoding]
+
+    def compress(self, response):
+        config = current_app.config
+        if response.mimetype not in config['COMPRESS_MIMETYPES'] or response.direct_passthrough \
+                or not 200 <= response.status_code < 300 or response.status_code == 204 \
+                or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            level = self.get_level(encoding)
+            encoder = Encoder(encoding, level)
+            response.response = self.stream(response.response, response.iter_encoded(), encoder, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            level = self.get_level(encoding)
+            encoder = Encoder(encoding, level)
+            compressed = encoder.compress(data) + encoder.finish()
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+            count_saved(encoding, level, len(data), len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def stream(self, body, chunks, encoder, level):
+        before = after = 0
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                compressed = encoder.compress(chunk)
+                before += len(chunk)
+                after += len(compressed)
+                yield compressed
+            compressed = encoder.finish()
+            after += len(compressed)
+            yield compressed
+            count_saved(encoder.encoding, level, before, after)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+
+compression = Compression()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 DEBUG = True
 
@@ -23,3 +24,134 @@ PASSWORD = '12345678'
 DB_URI = 'mysql+mysqldb://{}:{}@{}:{}/{}?charset=utf8'.format(USERNAME, PASSWORD, HOSTNAME, PORT, DATABASE)
 SQLALCHEMY_DATABASE_URI = DB_URI
 SQLALCHEMY_TRACK_MODIFICATIONS = True
+SQLALCHEMY_ECHO = False
+
+# Engine options, applied to each app's own engines when they are created.
+# Pool sizes are per process, so a pre-forked worker gets its own pool.
+DB_POOL_SIZE = 10
+DB_MAX_OVERFLOW = 5
+DB_POOL_PRE_PING = True
+
+
+# Read replicas
+# Each replica is a bind in SQLALCHEMY_BINDS, e.g.
+# SQLALCHEMY_BINDS = {'replica': 'postgres://...'}
+# SQLALCHEMY_REPLICA_BINDS = ['replica']
+SQLALCHEMY_BINDS = {}
+SQLALCHEMY_REPLICA_BINDS = []
+# Seconds a user's reads stay on the primary after they write
+REPLICATION_LAG_TOLERANCE = 5
+
+
+# Query counting
+# Adds X-SQL-Queries, X-SQL-Time and X-SQL-N-Plus-One headers to responses,
+# None follows DEBUG
+SQL_QUERY_HEADERS = None
+# A statement run this many times with different parameters in one request
+# is logged as a possible N+1
+SQL_N_PLUS_ONE_THRESHOLD = 5
+
+
+# Slow queries
+# Statements slower than this many seconds are written to SLOW_QUERY_LOG with
+# their parameters, helper, endpoint and plan. None turns the log off.
+# "python manager.py slow_query_report" groups the log by statement shape.
+SLOW_QUERY_THRESHOLD = None
+SLOW_QUERY_EXPLAIN = True
+SLOW_QUERY_LOG = 'slow_queries.jsonl'
+SLOW_QUERY_LOG_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+
+# Metrics
+# /metrics requires an "Authorization: Bearer <token>" header with this
+# token, and is not served at all while it is None
+METRICS_TOKEN = None
+
+
+# Profiling
+# Users who can see the admin pages, e.g. the profiles at /adminProfiles
+ADMIN_UIDS = []
+# A request is profiled when it sends an X-Profile-Token header made by
+# "python manager.py profile_token", when it is sampled at this rate, or when
+# it takes longer than PROFILER_SLOW_THRESHOLD seconds (None turns it off)
+PROFILER_SAMPLE_RATE = 0.0
+PROFILER_SLOW_THRESHOLD = None
+# Seconds between two samples of a profiled request's stack
+PROFILER_INTERVAL = 0.005
+# Folder the profiles are written to, only the newest PROFILER_KEEP are kept
+PROFILER_DIR = 'profiles'
+PROFILER_KEEP = 100
+
+
+# Tracing
+# Share of requests traced, with a span for the route, each databaseHelpers
+# function, each SQL statement and each template. Traces are written to
+# TRACE_DIR in the Chrome trace format, open them in chrome://tracing or
+# https://ui.perfetto.dev. Only the newest TRACE_KEEP are kept.
+TRACE_SAMPLE_RATE = 0.0
+TRACE_DIR = 'traces'
+TRACE_KEEP = 100
+
+
+# Memory
+# Starts tracemalloc with the app, so the peak memory of every request is
+# recorded. It can also be started from /adminMemory. Tracing slows requests
+# down, more so with more frames per allocation.
+MEMORY_TRACK_ROUTES = False
+MEMORY_TRACE_FRAMES = 1
+# Requests kept per endpoint, and how many of them must have a peak following
+# the number of objects loaded for the endpoint to be flagged
+MEMORY_SAMPLES = 100
+MEMORY_MIN_SAMPLES = 5
+MEMORY_GROWTH_CORRELATION = 0.8
+
+
+# Templates
+# Folder the compiled templates are saved in, shared by every worker so a
+# restarted worker does not compile them again. None turns it off.
+TEMPLATE_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'pickeasy-templates')
+# The owner list pages are sent while they are rendered, the page header
+# first and then chunks of about STREAM_CHUNK_SIZE characters. Their
+# database connection is held until the client has downloaded the page.
+STREAM_TEMPLATES = True
+STREAM_CHUNK_SIZE = 16384
+
+
+# Milestones
+# Each app caches the thresholds of a restaurant for this many seconds, in
+# every process. Changing them clears the cache of the process that made the
+# change, the other processes see the change once their copy expires.
+THRESHOLD_CACHE_SECONDS = 60
+
+
+# Receipts
+# Most receipts a point of sale can send to /receipts in one request, larger
+# exports go through "python manager.py ingest_receipts"
+RECEIPT_BATCH_LIMIT = 1000
+
+
+# Compression
+# HTML and JSON responses of at least COMPRESS_MIN_SIZE bytes are sent with
+# brotli or gzip, whichever the client accepts. While the load per CPU is
+# above COMPRESS_BUSY_LOAD the faster COMPRESS_BUSY_LEVEL is used.
+COMPRESS_MIMETYPES = ['text/html', 'application/json']
+COMPRESS_MIN_SIZE = 500
+COMPRESS_LEVEL = {'gzip': 6, 'br': 5}
+COMPRESS_BUSY_LEVEL = {'gzip': 1, 'br': 1}
+COMPRESS_BUSY_LOAD = 0.8
+
+
+# Tests
+# Databases the unit tests create their tables in. Under pytest, conftest.py
+# replaces them with in-memory databases, so each xdist worker has its own.
+TEST_DATABASE_URI = 'sqlite:///test.db'
+TEST_REPLICA_DATABASE_URI = 'sqlite:///test_replica.db'
+
+
+# Benchmarks
+# Database filled by "python manager.py seed_benchmark" and timed by
+# "python manager.py benchmark". Never point it at a real database. It is
+# kept out of the source tree, a large seed takes hundreds of megabytes.
+BENCHMARK_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'pickeasy-benchmark.db')
+BENCHMARK_BASELINE = 'benchmarks/baseline.json'
@@ -0,0 +1,100 @@
+###################################################
+#                                                 #
+#   Shared pytest fixtures. Run the suite in      #
+#   parallel with "pytest -n auto".               #
+#                                                 #
+###################################################
+
+import config
+
+# Every pytest-xdist worker is its own process, so in-memory databases give
+# each worker its own databases. This has to happen before app is imported.
+config.TEST_DATABASE_URI = 'sqlite://'
+config.TEST_REPLICA_DATABASE_URI = 'sqlite://'
+
+import pytest
+from app import create_app
+from exts import db, rolled_back
+from benchmarks.run import get_samples
+from benchmarks.seed import get_scale, seed
+from databaseHelpers.achievement import clear_achievement_rules
+from databaseHelpers.threshold import clear_milestones
+
+
+@pytest.fixture(scope='session')
+def database_app():
+    """
+    The app of app.py, which the unit tests import, with its tables created
+    once per worker.
+
+    Returns:
+        The app.
+    """
+    from app import app
+    app.config.update(TESTING = True, WTF_CSRF_ENABLED = False,
+                      SQLALCHEMY_DATABASE_URI = app.config['TEST_DATABASE_URI'])
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def database(database_app):
+    """
+    Runs a test against the empty tables of the app of app.py, inside a
+    transaction that is rolled back after it, with the app's configuration
+    restored and the rules and thresholds it cached dropped.
+
+    unittest classes use it with @pytest.mark.usefixtures('database'), their
+    setUp and tearDown no longer create and drop the tables.
+    """
+    settings = dict(database_app.config)
+    with database_app.app_context():
+        with rolled_back():
+            yield database_app
+        clear_achievement_rules()
+        clear_milestones()
+    database_app.config.clear()
+    database_app.config.update(settings)
+
+
+@pytest.fixture(scope='session')
+def seeded_app():
+    """
+    An app whose in-memory database is filled with the tiny benchmark data
+    set once per worker.
+
+    Returns:
+        An (app, samples) tuple, samples being the IDs returned by get_samples.
+    """
+    app = create_app(TESTING = True, SQLALCHEMY_DATABASE_URI = 'sqlite://')
+    with app.app_context():
+        seed(get_scale('tiny'), log = lambda message: None)
+        samples = get_samples()
+        db.session.remove()
+    return app, samples
+
+
+@pytest.fixture
+def seeded(request, seeded_app):
+    """
+    Runs a test against the seeded app, inside a transaction that is rolled
+    back after it, with the app's configuration restored and the rules and
+    thresholds it cached dropped.
+
+    unittest classes using it with @pytest.mark.usefixtures('seeded') get
+    self.app, self.client and self.samples before setUp runs.
+    """
+    app, samples = seeded_app
+    settings = dict(app.config)
+    with app.app_context():
+        with rolled_back():
+            if request.instance is not None:
+                request.instance.app = app
+                request.instance.client = app.test_client()
+                request.instance.samples = samples
+            yield app
+        clear_achievement_rules()
+        clear_milestones()
+    app.config.clear()
+    app.config.update(settings)
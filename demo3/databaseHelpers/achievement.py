@@ -1,14 +1,214 @@
-from models import Achievements
+from models import Achievements, Customer_Achievement_Progress
 import datetime
+import threading
 from datetime import date
-from dateutil.relativedelta import relativedelta
+from flask import current_app
+from exts import db, read_only
+from instrumentation.metrics import count_cache
+from instrumentation.tracing import trace_functions
 
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
 
+class AchievementRule(object):
+    """
+    An achievement row compiled once, with its value string parsed and its
+    description rendered. Rules are shared by every request of the process
+    and cannot be changed.
+
+    Attributes:
+        aid, rid, name, type, experience, points: The columns of the row.
+        item: The item to buy for type 0 achievements, "" otherwise.
+        quantity: The times, amount or group size. An integer, a float for
+          type 1 achievements.
+        begin, expiration: The dates the achievement is valid between, None
+          if it does not expire.
+        progress_max: The progress that completes the achievement.
+        description: The description shown to customers.
+    """
+
+    __slots__ = ('aid', 'rid', 'name', 'type', 'experience', 'points', 'item', 'quantity', 'begin', 'expiration',
+                 'progress_max', 'description')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AchievementRule is read only")
+
+    def __delattr__(self, name):
+        raise AttributeError("AchievementRule is read only")
+
+    def __repr__(self):
+        return '<AchievementRule %r %r>' % (self.aid, self.description)
+
+    def date_status(self, today=None):
+        """
+        Checks whether a day is in, before, or after the range of valid
+        dates of the achievement.
+
+        Args:
+            today: The day to check, today if None. A date.
+
+        Returns:
+            -1, if the day is before the achievement date range;
+            0, if the day is within the achievement date range;
+            1, if the day is after the achievement date range.
+            2, if the day is 6 months+ after date range
+        """
+        from dateutil.relativedelta import relativedelta
+        today = today or date.today()
+        if self.expiration is None:
+            return 0
+        if today > self.expiration + relativedelta(months=+6):
+            return 2
+        if today > self.expiration:
+            return 1
+        if self.begin and today < self.begin:
+            return -1
+        return 0
+
+
+def _parse_date(value):
+    """
+    Parses a YYYY-M-D date of an achievement value, None if value is empty.
+    """
+    if not value:
+        return None
+    y, m, d = value.split('-')
+    return datetime.date(int(y), int(m), int(d))
+
+
+def _parse_quantity(value):
+    """
+    Parses the quantity of an achievement value, an integer unless it has decimals.
+    """
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def compile_achievement(achievement):
+    """
+    Compiles an achievement row into a rule. The row is not cached, see
+    get_achievement_rule().
+
+    Args:
+        achievement: The achievement to compile. Achievement values must be
+          in the form "ITEM;QUANTITY;INDEFINITE;BEGIN;EXPIRATION".
+
+    Returns:
+        An AchievementRule.
+    """
+    # Values written before dates were added only have ITEM;QUANTITY
+    values = get_achievement_data(achievement) + [""] * 3
+    switcher = {
+        0: "Buy " + values[0] + " " + values[1] + " times",
+        1: "Spend $" + values[1] + " in a single visit",
+        2: "Visit with a group of at least " + values[1] + " people",
+        3: "Visit " + values[1] + " times"
+    }
+    description = switcher.get(achievement.type)
+    if values[2] == "False":
+        description = description + " between " + values[3] + " and " + values[4] + "."
+        begin, expiration = _parse_date(values[3]), _parse_date(values[4])
+    else:
+        description = description + "."
+        begin = expiration = None
+    quantity = _parse_quantity(values[1])
+    return AchievementRule(aid=achievement.aid, rid=achievement.rid, name=achievement.name, type=achievement.type,
+                           experience=achievement.experience, points=achievement.points, item=values[0],
+                           quantity=quantity, begin=begin, expiration=expiration,
+                           progress_max=int(quantity) if achievement.type in (0, 3) else 1,
+                           description=description)
+
+
+def _rule_cache():
+    """
+    Returns the rule cache of the current app, kept in its extensions since
+    every app has its own database: a dict with the (row key, AchievementRule)
+    tuple of each aid, and the lock guarding it.
+    """
+    cache = current_app.extensions.get('achievement_rules')
+    if cache is None:
+        cache = current_app.extensions.setdefault('achievement_rules', {'rules': {}, 'lock': threading.Lock()})
+    return cache
+
+
+def clear_achievement_rules(aid=None):
+    """
+    Drops the rule the current app cached for an achievement, for every
+    achievement if aid is None.
+
+    Args:
+        aid: An achievement ID. An integer.
+    """
+    cache = _rule_cache()
+    with cache['lock']:
+        if aid is None:
+            cache['rules'].clear()
+        else:
+            cache['rules'].pop(int(aid), None)
+
+
+def _row_key(achievement):
+    """
+    Returns the columns a rule is compiled from. Another process may delete
+    an achievement and SQLite may give its aid to a new one, so a rule is
+    only reused for a row with the same columns.
+    """
+    return (achievement.rid, achievement.name, achievement.type, achievement.experience, achievement.points,
+            achievement.value)
+
+
+def get_rule(achievement):
+    """
+    Gets the rule of an achievement row already loaded, compiling it only if
+    the rule cached for its aid was not compiled from the same columns.
+
+    Args:
+        achievement: An achievement of the Achievement table.
+
+    Returns:
+        An AchievementRule.
+    """
+    if achievement.aid is None:
+        return compile_achievement(achievement)
+    key = _row_key(achievement)
+    cache = _rule_cache()
+    with cache['lock']:
+        cached = cache['rules'].get(achievement.aid)
+    if cached and cached[0] == key:
+        count_cache('achievement_rules', True)
+        return cached[1]
+    count_cache('achievement_rules', False)
+    rule = compile_achievement(achievement)
+    with cache['lock']:
+        cache['rules'][rule.aid] = (key, rule)
+    return rule
+
+
+def get_achievement_rule(aid):
+    """
+    Gets the rule of an achievement. Its row is read every time, so the rule
+    of an achievement deleted or changed by another process is never
+    returned; only its compilation is cached.
+
+    Args:
+        aid: An achievement ID that corresponds to a achievement in the Achievement table.
+          An integer.
+
+    Returns:
+        An AchievementRule, None if there is no such achievement.
+    """
+    aid = int(aid)
+    achievement = Achievements.query.filter(Achievements.aid == aid).first()
+    if not achievement:
+        return None
+    return get_rule(achievement)
+
+
+@read_only
 def get_achievements_by_rid(rid):
     """
     Fetches rows from the Achievement table.
@@ -26,15 +226,17 @@ def get_achievements_by_rid(rid):
     """
     achievement_list = []
     achievements = Achievements.query.filter(Achievements.rid == rid).all()
+    today = date.today()
     for a in achievements:
+        rule = get_rule(a)
         dict = {
-            "aid": a.aid,
-            "name": a.name,
-            "description": get_achievement_description(a),
-            "experience": a.experience,
-            "points": a.points,
-            "progressMax": get_achievement_progress_maximum(a),
-            "expired": is_today_in_achievement_date_range(a)
+            "aid": rule.aid,
+            "name": rule.name,
+            "description": rule.description,
+            "experience": rule.experience,
+            "points": rule.points,
+            "progressMax": rule.progress_max,
+            "expired": rule.date_status(today)
         }
         achievement_list.append(dict)
     return achievement_list
@@ -51,21 +253,7 @@ def get_achievement_description(achievement):
     Returns:
         A description for the given achievement.
     """
-    values = get_achievement_data(achievement)
-    switcher = {
-        0: "Buy " + values[0] + " " + values[1] + " times",
-        1: "Spend $" + values[1] + " in a single visit",
-        2: "Visit with a group of at least " + values[1] + " people",
-        3: "Visit " + values[1] + " times"
-    }
-
-    description = switcher.get(achievement.type)
-    if (values[2] == "False"):
-        description = description + " between " + values[3] + " and " + values[4] + "."
-    else:
-        description = description + "."
-
-    return description
+    return get_rule(achievement).description
 
 
 def get_achievement_progress_maximum(achievement):
@@ -84,14 +272,7 @@ def get_achievement_progress_maximum(achievement):
     Returns:
         A progress maximum for a given achievement.
     """
-    values = get_achievement_data(achievement)
-    switcher = {
-        0: values[1],
-        1: 1,
-        2: 1,
-        3: values[1]
-    }
-    return int(switcher.get(achievement.type))
+    return get_rule(achievement).progress_max
 
 def is_today_in_achievement_date_range(achievement):
     """
@@ -107,23 +288,7 @@ def is_today_in_achievement_date_range(achievement):
         1, if today is after the achievement date range.
         2, if today is 6 months+ after date range
     """
-    today = date.today()
-    values = get_achievement_data(achievement)
-    if values[2] == "False":
-        e = (values[4]).split('-')
-        expiration = datetime.date(int(e[0]), int(e[1]), int(e[2]))
-        if today > expiration + relativedelta(months=+6):
-            return 2
-
-        if today > expiration:
-            return 1
-
-        e = (values[3]).split('-')
-        start = datetime.date(int(e[0]), int(e[1]), int(e[2]))
-        if today < start:
-            return -1
-
-    return 0
+    return get_rule(achievement).date_status()
 
 def get_achievement_data(achievement):
     """
@@ -210,8 +375,11 @@ def insert_achievement(rid, name, experience, points, type, value):
     achievement = Achievements(rid = rid, name = name, experience = experience, points = points, type = type, value = value)
     db.session.add(achievement)
     db.session.commit()
+    # SQLite can give the aid of a deleted achievement to a new one
+    clear_achievement_rules(achievement.aid)
 
 
+@read_only
 def filter_expired_achievements(rid):
     """
     Filters out rows from the achievemnt table.
@@ -229,22 +397,16 @@ def filter_expired_achievements(rid):
     achievement_list = []
 
     for a in achievements:
-        dict = {
-            "aid": a.aid,
-            "name": a.name,
-            "description": get_achievement_description(a),
-            "experience": a.experience,
-            "points": a.points,
-            "progressMax": get_achievement_progress_maximum(a)
-        }
-        values = a.value.split(';')
-        if values[2] == "False":
-            e = (values[4]).split('-')
-            expiration = datetime.date(int(e[0]), int(e[1]), int(e[2]))
-            if today <= expiration:
-                achievement_list.append(dict)
-        else:
-            achievement_list.append(dict)
+        rule = get_rule(a)
+        if rule.expiration is None or today <= rule.expiration:
+            achievement_list.append({
+                "aid": rule.aid,
+                "name": rule.name,
+                "description": rule.description,
+                "experience": rule.experience,
+                "points": rule.points,
+                "progressMax": rule.progress_max
+            })
     return achievement_list
 
 
@@ -252,7 +414,8 @@ def delete_achievement(aid):
     """
     Removes a row from the Achievement table.
 
-    Deletes an achievement from the database.
+    Deletes an achievement from the database, with the progress of the
+    customers on it.
 
     Args:
         aid: An achievement ID that corresponds to a achievement in the Achievement table.
@@ -264,8 +427,12 @@ def delete_achievement(aid):
     """
     achievement = Achievements.query.filter(Achievements.aid == aid).first()
     if achievement:
+        # The foreign key cascades on PostgreSQL, SQLite does not enforce it by default
+        Customer_Achievement_Progress.query.filter(Customer_Achievement_Progress.aid == aid) \
+            .delete(synchronize_session=False)
         db.session.delete(achievement)
         db.session.commit()
+        clear_achievement_rules(aid)
         return None
     return "No such achievement"
 
@@ -278,23 +445,13 @@ def get_achievement_by_aid(aid):
         An integer
 
     Returns:
-        (if found) achievement
+        (if found) the AchievementRule of the achievement
         (if not) "Not Found"
     """
-    ach = Achievements.query.filter(Achievements.aid == aid).first()
-    if ach:
-        return ach
+    rule = get_achievement_rule(aid)
+    if rule:
+        return rule
     return "Not Found"
 
-def get_exist_aid():
-    """
-    Gets all existing aid
 
-    Returns:
-        A list of all aids in the database.
-    """
-    aid_list = []
-    achievements = Achievements.query.all()
-    for a in achievements:
-        aid_list.append(a.aid)
-    return aid_list
+trace_functions(__name__)
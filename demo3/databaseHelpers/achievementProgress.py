@@ -4,18 +4,18 @@ from databaseHelpers.achievement import *
 from databaseHelpers.experience import *
 from databaseHelpers.points import *
 from databaseHelpers.restaurant import get_restaurant_name_by_rid
-from datetime import datetime
+from datetime import date, datetime
+from sqlalchemy import case, func
+from sqlalchemy.orm import joinedload
+from exts import db, read_only, STREAM_BATCH_SIZE
+from instrumentation.tracing import trace_functions
 
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
 
 NOT_STARTED = 0
 IN_PROGRESS = 1
 COMPLETE = 2
 
+@read_only
 def get_achievement_progress_by_uid(uid):
     """
     Fetches rows from the Achievement Progress table.
@@ -33,19 +33,18 @@ def get_achievement_progress_by_uid(uid):
     """
     achievement_progress_list = []
     achievement_progress = Customer_Achievement_Progress.query.filter(Customer_Achievement_Progress.uid == uid).all()
-    aid_list = get_exist_aid()
     for a in achievement_progress:
-        if a.aid in aid_list:
-            dict = {
-                "aid": a.aid,
-                "uid": a.uid,
-                "progress": a.progress,
-                "progressMax": a.total,
-                "update": a.update
-            }
-            achievement_progress_list.append(dict)
+        dict = {
+            "aid": a.aid,
+            "uid": a.uid,
+            "progress": a.progress,
+            "progressMax": a.total,
+            "update": a.update
+        }
+        achievement_progress_list.append(dict)
     return achievement_progress_list
 
+@read_only
 def get_achievement_with_progress_data(aid, uid):
     """
     Appends progress data for a given user and a fiven achievement
@@ -59,10 +58,10 @@ def get_achievement_with_progress_data(aid, uid):
     Returns:
         An achievement with progress data.
     """
-    achievement = get_achievement_by_aid(aid)
+    achievement = get_achievement_rule(aid)
     progress = get_exact_achivement_progress(aid, uid)
 
-    if (achievement == 'Not Found'):
+    if achievement is None:
         return None
     if (progress == 'Not Found'):
         progressCount = 0
@@ -72,10 +71,10 @@ def get_achievement_with_progress_data(aid, uid):
     dict = {
         "aid": achievement.aid,
         "name": achievement.name,
-        "description": get_achievement_description(achievement),
+        "description": achievement.description,
         "experience": achievement.experience,
         "points": achievement.points,
-        "progressMax": get_achievement_progress_maximum(achievement),
+        "progressMax": achievement.progress_max,
         "progress": progressCount
     }
     return dict
@@ -198,10 +197,12 @@ def add_one_progress_bar(achievements_progress, aid, uid):
     Returns:
         None
     """
-    ach = get_achievement_by_aid(aid)
-    total = get_achievement_progress_maximum(ach)
     if achievements_progress == 'Not Found':
-        achievements_progress = insert_new_achievement(aid, uid, total)
+        achievement = get_achievement_rule(aid)
+        if achievement is None:
+            # Deleted or archived since it was scanned
+            return None
+        achievements_progress = insert_new_achievement(aid, uid, achievement.progress_max)
 
     achievements_progress.progress += 1
     achievements_progress.update = datetime.now()
@@ -221,10 +222,9 @@ def complete_progress(achievement_progress):
     Returns:
         None
     """
-    rid = get_rid_points_exp_by_aid(achievement_progress.aid)['rid']
+    achievement = get_achievement_rule(achievement_progress.aid)
+    rid, points, exp = achievement.rid, achievement.points, achievement.experience
     uid = achievement_progress.uid
-    points = get_rid_points_exp_by_aid(achievement_progress.aid)['points']
-    exp = get_rid_points_exp_by_aid(achievement_progress.aid)['exp']
 
     user_point = get_points(uid, rid)
     if not user_point:
@@ -250,7 +250,7 @@ def get_rid_points_exp_by_aid(aid):
         (if found) a dictionary of 'rid', 'points' and 'exp' by the given aid
         (if not) 'Not Found'
     """
-    achievement = Achievements.query.filter(Achievements.aid==aid).first()
+    achievement = get_achievement_rule(aid)
     if achievement:
         return {'rid': achievement.rid,
                 'points': achievement.points,
@@ -277,10 +277,11 @@ def insert_new_achievement(aid, uid, total):
     return ap
 
 
+@read_only
 def get_achievements_with_progress_entry_count(achievements):
     """
     Appends number of progress entries by customers to each achievement at a given
-    restaurant.
+    restaurant, counted by a single grouped query.
 
     Args:
         achievements: The achievements from a given restaurant. A list of dict
@@ -289,16 +290,23 @@ def get_achievements_with_progress_entry_count(achievements):
     Returns:
         A list of achievements with progress entry count data.
     """
+    progress = Customer_Achievement_Progress
+    aids = [a['aid'] for a in achievements]
+    counts = {}
+    if aids:
+        counts = dict(db.session.query(progress.aid, func.count(progress.aid))
+                      .filter(progress.aid.in_(aids)).group_by(progress.aid))
     for a in achievements:
-        entries = Customer_Achievement_Progress.query.filter(Customer_Achievement_Progress.aid == a['aid']).count()
-        a['progress_entries'] = entries
+        a['progress_entries'] = counts.get(a['aid'], 0)
 
     return achievements
 
 
+@read_only
 def get_achievement_progress_stats(achievements):
     """
-    Get the stats of given achievements list with two extra key, 'in progress' and 'complete'
+    Get the stats of given achievements list with two extra key, 'in progress' and 'complete',
+    counted by a single grouped query
 
     Args:
         achievements: a list of dict which contains info of achievement_progress
@@ -306,59 +314,108 @@ def get_achievement_progress_stats(achievements):
     Returns:
         achievement with extra key 'in progress' and 'complete'
     """
+    progress = Customer_Achievement_Progress
+    aids = [a['aid'] for a in achievements]
+    counts = {}
+    if aids:
+        complete = func.sum(case([(progress.progress == progress.total, 1)], else_=0))
+        counts = dict((aid, (started, completed)) for aid, started, completed in
+                      db.session.query(progress.aid, func.count(progress.aid), complete)
+                      .filter(progress.aid.in_(aids)).group_by(progress.aid))
     for a in achievements:
-        a['in progress'] = 0
-        a['complete'] = 0
-        achievement_progress = Customer_Achievement_Progress.query.filter(Customer_Achievement_Progress.aid==a['aid']).all()
-        for ap in achievement_progress:
-            progress = get_progress_completion_status(ap)
-            if progress == IN_PROGRESS:
-                a['in progress'] += 1
-            elif progress == COMPLETE:
-                a['complete'] += 1
+        started, completed = counts.get(a['aid'], (0, 0))
+        a['in progress'] = started - completed
+        a['complete'] = completed
 
     return achievements
 
 
+@read_only
+def iter_achievement_progress_stats(rid, batch_size=STREAM_BATCH_SIZE):
+    """
+    Streams the achievements of a restaurant with their progress stats.
+
+    Like get_achievement_progress_stats(get_achievements_by_rid(rid)), but
+    the progress entries are counted by a single grouped query instead of
+    being loaded for every achievement, and its rows are fetched batch_size
+    at a time while they are iterated.
+
+    Args:
+        rid: The restaurant ID the achievements belong to.
+        batch_size: The number of rows fetched at a time.
 
-def get_recently_update_achievements(uid):
+    Yields:
+        A dict for each achievement, with the keys of get_achievements_by_rid
+        and two extra keys, 'in progress' and 'complete'.
     """
-    Return the recent 3 updated achievement.
+    progress = Customer_Achievement_Progress
+    complete = func.sum(case([(progress.progress == progress.total, 1)], else_=0))
+    query = db.session.query(Achievements, func.count(progress.aid), complete) \
+        .outerjoin(progress, progress.aid == Achievements.aid) \
+        .filter(Achievements.rid == rid).group_by(Achievements.aid)
+    today = date.today()
+    for a, started, completed in query.yield_per(batch_size):
+        rule = get_rule(a)
+        yield {
+            "aid": rule.aid,
+            "name": rule.name,
+            "description": rule.description,
+            "experience": rule.experience,
+            "points": rule.points,
+            "progressMax": rule.progress_max,
+            "expired": rule.date_status(today),
+            "in progress": started - completed,
+            "complete": completed
+        }
+
+
+@read_only
+def get_recently_update_achievements(uid, limit=3):
+    """
+    Return the recently updated achievement progress, with one query on the
+    (uid, update) index.
 
     Args:
         uid: user id
+        limit: the number of achievement progress returned
 
     Returns:
-        a list of recent achievement progress (<=3)
+        a list of recent achievement progress (<=limit), most recent first
     """
-    from operator import itemgetter
-    recent_achievements = []
-    ap_list = get_achievement_progress_by_uid(uid)
-    new_list = sorted(ap_list, key=itemgetter('update'), reverse=True)
-    for ap in new_list[:3]:
-        recent_achievements.append(get_exact_achivement_progress(ap['aid'], ap['uid']))
-    return recent_achievements
+    return Customer_Achievement_Progress.query \
+        .join(Achievements, Achievements.aid == Customer_Achievement_Progress.aid) \
+        .filter(Customer_Achievement_Progress.uid == uid) \
+        .order_by(Customer_Achievement_Progress.update.desc()).limit(limit).all()
 
 
+@read_only
 def get_updated_info(recent_achievements):
     """
     :param recent_achievements: a list of achievement_progress (<=3) sorted by updated time
     :return: a dict of these achievement_progress containing following info:
     'aid', 'uid', 'progress', 'progressMax', 'description', 'name', 'points' and 'experience'
     """
+    aids = set(ap.aid for ap in recent_achievements)
+    loaded = {}
+    if aids:
+        loaded = dict((a.aid, a) for a in Achievements.query.options(joinedload(Achievements.restaurant))
+                      .filter(Achievements.aid.in_(aids)))
     achievements = []
     for ap in recent_achievements:
-        a = Achievements.query.filter(Achievements.aid == ap.aid).first()
+        a = loaded[ap.aid]
         achievement = {'aid': ap.aid,
                        'uid': ap.uid,
                        'progress': ap.progress,
                        'progressMax': ap.total,
-                       'description': get_achievement_description(a),
+                       'description': get_rule(a).description,
                        'name': a.name,
                        'points': a.points,
                        'experience': a.experience,
-                       'rname': get_restaurant_name_by_rid(a.rid),
-                       'raddress': get_restaurant_address(a.rid)
+                       'rname': a.restaurant.name if a.restaurant else None,
+                       'raddress': a.restaurant.address if a.restaurant else None
                        }
         achievements.append(achievement)
     return achievements
+
+
+trace_functions(__name__)
@@ -0,0 +1,368 @@
+from models import Coupon, Redeemed_Coupons, Achievements, Customer_Achievement_Progress, Restaurant, \
+    Archived_Coupon, Archived_Redeemed_Coupons, Archived_Achievements, Archived_Achievement_Progress
+from databaseHelpers.achievement import clear_achievement_rules, compile_achievement, get_rule
+from databaseHelpers.redeemedCoupons import get_kept_expiration_cutoff
+from datetime import date, datetime
+from sqlalchemy import and_, bindparam, case, exists, func, literal, or_, select
+from exts import db, read_only
+from instrumentation.tracing import trace_functions
+
+# Number of rows moved to an archive table in one transaction
+CHUNK_SIZE = 1000
+
+
+def archive_redemptions(today, chunk_size=CHUNK_SIZE, log=print):
+    """
+    Moves the redemptions customers no longer see to redeemed_coupons_archive:
+    the used ones, and the ones of coupons that expired more than 6 months
+    before today.
+
+    Each chunk is committed with the counters of its coupons, so the holders
+    and uses of a coupon stay the same.
+
+    Args:
+        today: The date the expiration cutoff is computed from.
+        chunk_size: The number of redemptions moved in one transaction.
+        log: Function called with a progress message after each chunk.
+
+    Returns:
+        The number of redemptions archived.
+    """
+    cutoff = get_kept_expiration_cutoff(today)
+    archive = Archived_Redeemed_Coupons.__table__
+    coupons = Coupon.__table__
+    add_counters = coupons.update().where(coupons.c.cid == bindparam('c_cid')) \
+        .values(archived_held=coupons.c.archived_held + bindparam('c_held'),
+                archived_used=coupons.c.archived_used + bindparam('c_used'))
+    archived = 0
+    while True:
+        rows = db.session.query(Redeemed_Coupons.rcid, Redeemed_Coupons.cid, Redeemed_Coupons.valid) \
+            .join(Coupon, Coupon.cid == Redeemed_Coupons.cid) \
+            .filter(or_(Redeemed_Coupons.valid != 1, Coupon.expiration <= cutoff)) \
+            .order_by(Redeemed_Coupons.rcid).limit(chunk_size).all()
+        if not rows:
+            return archived
+        rcids = [r.rcid for r in rows]
+        counters = {}
+        for r in rows:
+            held, used = counters.get(r.cid, (0, 0))
+            counters[r.cid] = (held + 1, used) if r.valid == 1 else (held, used + 1)
+        try:
+            db.session.execute(archive.insert().from_select(
+                ['rcid', 'cid', 'uid', 'rid', 'valid', 'name', 'points', 'expiration', 'archived'],
+                select([Redeemed_Coupons.rcid, Redeemed_Coupons.cid, Redeemed_Coupons.uid, Redeemed_Coupons.rid,
+                        Redeemed_Coupons.valid, Coupon.name, Coupon.points, Coupon.expiration,
+                        literal(datetime.now(), db.DateTime)])
+                .select_from(Redeemed_Coupons.__table__.join(coupons, coupons.c.cid == Redeemed_Coupons.cid))
+                .where(Redeemed_Coupons.rcid.in_(rcids))))
+            db.session.execute(add_counters, [{'c_cid': cid, 'c_held': held, 'c_used': used}
+                                              for cid, (held, used) in counters.items()])
+            Redeemed_Coupons.query.filter(Redeemed_Coupons.rcid.in_(rcids)).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        archived += len(rows)
+        log("%d redemptions archived" % archived)
+
+
+def archive_deleted_coupons(chunk_size=CHUNK_SIZE, log=print):
+    """
+    Moves the deleted coupons no customer holds any more to coupons_archive,
+    with their counters. Run after archive_redemptions, which archives their
+    used redemptions.
+
+    Args:
+        chunk_size: The number of coupons moved in one transaction.
+        log: Function called with a progress message after each chunk.
+
+    Returns:
+        The number of coupons archived.
+    """
+    columns = ['cid', 'rid', 'deleted', 'name', 'points', 'description', 'level', 'expiration', 'begin',
+               'archived_held', 'archived_used']
+    archived = 0
+    while True:
+        cids = [cid for cid, in db.session.query(Coupon.cid)
+                .filter(Coupon.deleted == 1, ~exists().where(Redeemed_Coupons.cid == Coupon.cid))
+                .order_by(Coupon.cid).limit(chunk_size)]
+        if not cids:
+            return archived
+        try:
+            db.session.execute(Archived_Coupon.__table__.insert().from_select(
+                columns + ['archived'],
+                select([getattr(Coupon, c) for c in columns] + [literal(datetime.now(), db.DateTime)])
+                .where(Coupon.cid.in_(cids))))
+            Coupon.query.filter(Coupon.cid.in_(cids)).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        archived += len(cids)
+        log("%d deleted coupons archived" % archived)
+
+
+def get_expired_aids(today):
+    """
+    Gets the achievements that expired more than 6 months before today.
+
+    Returns:
+        A list of achievement IDs.
+    """
+    # Only achievements with dates have ";False;" in their value
+    achievements = Achievements.query.filter(Achievements.value.like('%;False;%')).order_by(Achievements.aid)
+    return [a.aid for a in achievements if get_rule(a).date_status(today) == 2]
+
+
+def archive_achievement(aid, chunk_size=CHUNK_SIZE, log=print):
+    """
+    Moves an achievement and its progress entries to the archive tables.
+
+    The progress entries are moved chunk_size at a time, then the
+    achievement is moved with the number of entries started and completed,
+    and its archived entries are linked to it. An archival that stopped
+    halfway resumes with the entries left.
+
+    An achievement deleted before or while it is archived is skipped, and
+    the entries already moved stay unlinked in the archive with its aid.
+
+    Args:
+        aid: An achievement ID that corresponds to a achievement in the Achievement table.
+          An integer.
+        chunk_size: The number of progress entries moved in one transaction.
+        log: Function called with a message when the achievement is skipped.
+
+    Returns:
+        The number of progress entries archived, None if there is no such
+        achievement.
+    """
+    progress = Customer_Achievement_Progress
+    archive = Archived_Achievement_Progress
+    if Achievements.query.filter(Achievements.aid == aid).first() is None:
+        log("Achievement %s skipped, it no longer exists" % aid)
+        return None
+    moved = 0
+    while True:
+        uids = [uid for uid, in db.session.query(progress.uid).filter(progress.aid == aid)
+                .order_by(progress.uid).limit(chunk_size)]
+        if not uids:
+            break
+        try:
+            db.session.execute(archive.__table__.insert().from_select(
+                ['aid', 'uid', 'progress', 'total', 'update', 'archived'],
+                select([progress.aid, progress.uid, progress.progress, progress.total, progress.update,
+                        literal(datetime.now(), db.DateTime)])
+                .where(and_(progress.aid == aid, progress.uid.in_(uids)))))
+            progress.query.filter(progress.aid == aid, progress.uid.in_(uids)).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        moved += len(uids)
+
+    try:
+        achievement = Achievements.query.filter(Achievements.aid == aid).first()
+        if achievement is None:
+            db.session.rollback()
+            log("Achievement %s skipped after archiving %d progress entries, it was deleted" % (aid, moved))
+            return None
+        unlinked = and_(archive.aid == aid, archive.achievement_id == None)
+        started, completed = db.session.query(func.count(archive.id),
+                                              func.sum(case([(archive.progress >= archive.total, 1)], else_=0))) \
+            .filter(unlinked).one()
+        row = Archived_Achievements(aid=aid, rid=achievement.rid, name=achievement.name,
+                                    experience=achievement.experience, points=achievement.points,
+                                    type=achievement.type, value=achievement.value, started=started,
+                                    completed=completed or 0, archived=datetime.now())
+        db.session.add(row)
+        db.session.flush()
+        archive.query.filter(unlinked).update({'achievement_id': row.id}, synchronize_session=False)
+        db.session.delete(achievement)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    clear_achievement_rules(aid)
+    return moved
+
+
+def archive_expired_achievements(today, chunk_size=CHUNK_SIZE, log=print):
+    """
+    Moves the achievements that expired more than 6 months before today to
+    achievements_archive, with their progress entries.
+
+    Args:
+        today: The date the expiration is checked against.
+        chunk_size: The number of progress entries moved in one transaction.
+        log: Function called with a progress message after each achievement.
+
+    Returns:
+        A tuple containing the number of achievements and of progress entries
+        archived.
+    """
+    achievements = entries = 0
+    for aid in get_expired_aids(today):
+        moved = archive_achievement(aid, chunk_size, log)
+        if moved is None:
+            continue
+        entries += moved
+        achievements += 1
+        log("%d expired achievements archived with %d progress entries" % (achievements, entries))
+    return achievements, entries
+
+
+def archive(today=None, chunk_size=CHUNK_SIZE, log=print):
+    """
+    Moves the rows the app no longer lists out of the hot tables: used
+    redemptions and those of coupons expired more than 6 months ago, deleted
+    coupons no one holds, and achievements expired more than 6 months ago
+    with their progress entries.
+
+    Every step commits chunk_size rows at a time, so it can be stopped and
+    run again.
+
+    Args:
+        today: The date the expirations are checked against, today if None.
+        chunk_size: The number of rows moved in one transaction.
+        log: Function called with progress messages.
+
+    Returns:
+        A dict with the number of redemptions, coupons, achievements and
+        progress entries archived.
+    """
+    today = today or date.today()
+    stats = {'redemptions': archive_redemptions(today, chunk_size, log),
+             'coupons': archive_deleted_coupons(chunk_size, log)}
+    stats['achievements'], stats['progress'] = archive_expired_achievements(today, chunk_size, log)
+    return stats
+
+
+@read_only
+def get_archived_coupons_by_uid(uid):
+    """
+    Get the archived redemptions of a customer, the history
+    get_redeemed_coupons_by_uid no longer lists.
+
+    Args:
+        uid: The user ID that corresponds to the User that is fetched.
+
+    Returns:
+        a list of dictionaries with the rcid, cid, name, points, expiration,
+        whether the coupon was used, when it was archived and the restaurant
+        name, newest first
+    """
+    rows = db.session.query(Archived_Redeemed_Coupons, Restaurant.name) \
+        .outerjoin(Restaurant, Restaurant.rid == Archived_Redeemed_Coupons.rid) \
+        .filter(Archived_Redeemed_Coupons.uid == uid).order_by(Archived_Redeemed_Coupons.id.desc())
+    return [{
+        "rcid": c.rcid,
+        "cid": c.cid,
+        "cname": c.name,
+        "points": c.points,
+        "expiration": c.expiration,
+        "used": c.valid != 1,
+        "archived": c.archived,
+        "rname": rname
+    } for c, rname in rows]
+
+
+@read_only
+def get_archived_coupons_by_rid(rid, status='all', today=None):
+    """
+    Get the archived coupons of a restaurant with their counters, the deleted
+    coupons iter_redeemed_coupons_by_rid no longer lists.
+
+    Args:
+        rid: The restaurant ID the coupons belong to.
+        status: 'all', 'active', 'expired' or 'deleted', see
+          get_coupon_conditions. Archived coupons are all deleted.
+        today: The date coupons expire against, today if None.
+
+    Returns:
+        a list of dictionaries with the keys of the rows of
+        iter_redeemed_coupons_by_rid, the holders and uses being the ones
+        counted when the coupon was archived
+    """
+    if status == 'active':
+        return []
+    coupons = Archived_Coupon.query.filter(Archived_Coupon.rid == rid)
+    if status == 'expired':
+        coupons = coupons.filter(Archived_Coupon.expiration != None,
+                                 Archived_Coupon.expiration < (today or date.today()))
+    return [{
+        "cid": c.cid,
+        "name": c.name,
+        "description": c.description,
+        "points": c.points,
+        "level": c.level,
+        "begin": c.begin,
+        "expiration": c.expiration,
+        "deleted": c.deleted,
+        "holders": c.archived_held,
+        "used": c.archived_used
+    } for c in coupons.order_by(Archived_Coupon.cid)]
+
+
+@read_only
+def get_archived_achievements_by_uid(uid):
+    """
+    Get the progress of a customer on archived achievements.
+
+    Args:
+        uid: user id
+
+    Returns:
+        a list of dictionaries with the aid, name, description, progress,
+        progressMax, last update and restaurant name, most recently updated
+        first
+    """
+    progress = Archived_Achievement_Progress
+    rows = db.session.query(progress, Archived_Achievements, Restaurant.name) \
+        .join(Archived_Achievements, Archived_Achievements.id == progress.achievement_id) \
+        .outerjoin(Restaurant, Restaurant.rid == Archived_Achievements.rid) \
+        .filter(progress.uid == uid).order_by(progress.update.desc())
+    return [{
+        "aid": a.aid,
+        "name": a.name,
+        "description": compile_achievement(a).description,
+        "progress": p.progress,
+        "progressMax": p.total,
+        "update": p.update,
+        "rname": rname
+    } for p, a, rname in rows]
+
+
+@read_only
+def get_archived_achievement_stats(rid):
+    """
+    Get the archived achievements of a restaurant with their progress stats,
+    like iter_achievement_progress_stats for the live ones.
+
+    Args:
+        rid: The restaurant ID the achievements belong to.
+
+    Returns:
+        a list of dictionaries with the aid, name, description, experience,
+        points, progressMax, expired (2, archived achievements having expired
+        more than 6 months ago), 'in progress' and 'complete'
+    """
+    achievements = Archived_Achievements.query.filter(Archived_Achievements.rid == rid) \
+        .order_by(Archived_Achievements.aid)
+    stats = []
+    for a in achievements:
+        rule = compile_achievement(a)
+        stats.append({
+            "aid": a.aid,
+            "name": a.name,
+            "description": rule.description,
+            "experience": a.experience,
+            "points": a.points,
+            "progressMax": rule.progress_max,
+            "expired": 2,
+            "in progress": a.started - a.completed,
+            "complete": a.completed
+        })
+    return stats
+
+
+trace_functions(__name__)
@@ -1,11 +1,16 @@
 from models import Coupon, User, Restaurant
 from datetime import date
+from sqlalchemy import and_, case, literal_column, not_
+from exts import db, read_only, STREAM_BATCH_SIZE
+from instrumentation.tracing import trace_functions
 
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
+# The orders of get_coupon_catalog
+COUPON_SORTS = {
+    'level': [Coupon.level, Coupon.cid],
+    'points': [Coupon.points, Coupon.cid],
+    'name': [Coupon.name, Coupon.cid],
+    'newest': [Coupon.cid.desc()],
+}
 
 
 def insert_coupon(rid, name, points, description, level, begin, expiration, indefinite):
@@ -55,6 +60,7 @@ def insert_coupon(rid, name, points, description, level, begin, expiration, inde
     return errmsg
 
 
+@read_only
 def get_coupons(rid):
     """
     Fetches rows from the Coupon table.
@@ -86,6 +92,30 @@ def get_coupons(rid):
         coupon_list.append(dict)
     return coupon_list
 
+
+@read_only
+def iter_coupons(rid, batch_size=STREAM_BATCH_SIZE):
+    """
+    Streams rows from the Coupon table.
+
+    Like get_coupons, but the coupons are fetched batch_size at a time while
+    they are iterated, so a page can list thousands of them without holding
+    them all in memory.
+
+    Args:
+        rid: A restaurant ID that corresponds to a restaurant in the Restaurant
+          table. A integer.
+        batch_size: The number of rows fetched at a time.
+
+    Yields:
+        A row with the cid, name, description, points, level, begin,
+        expiration and deleted of each coupon of the restaurant.
+    """
+    query = db.session.query(Coupon.cid, Coupon.name, Coupon.description, Coupon.points, Coupon.level,
+                             Coupon.begin, Coupon.expiration, Coupon.deleted).filter(Coupon.rid == rid)
+    for row in query.yield_per(batch_size):
+        yield row
+
 def is_today_in_coupon_date_range(coupon):
     """
     Checks whether today is in, before, or after the range of
@@ -126,28 +156,119 @@ def delete_coupon(cid):
     return None
 
 
-def filter_valid_coupons(coupons):
+def get_coupon_conditions(rid, status='active', points=None, level=None, purchasable=None, today=None):
     """
-    Removes invalid coupons from the coupons list.
+    Builds the SQL conditions selecting coupons of a restaurant's catalog.
+
+    Active coupons are matched with a literal deleted = 0, so the database
+    can use the partial index on active coupons.
 
-    Deletes coupons that are either deleted or expired.
+    Args:
+        rid: A restaurant ID that corresponds to a restaurant in the Restaurant
+          table. A integer.
+        status: 'active' for coupons neither deleted nor expired, 'expired',
+          'deleted' or 'all'.
+        points: The customer's points at the restaurant, needed to filter on
+          purchasable.
+        level: The customer's level at the restaurant, needed to filter on
+          purchasable.
+        purchasable: True for the coupons the customer can buy, False for the
+          ones they cannot, None for both.
+        today: The date coupons expire against, today if None.
+
+    Returns:
+        A list of conditions on the Coupon table.
+    """
+    today = today or date.today()
+    expired = and_(Coupon.expiration != None, Coupon.expiration < today)
+    conditions = [Coupon.rid == rid]
+    if status == 'active':
+        conditions += [Coupon.deleted == literal_column('0'), not_(expired)]
+    elif status == 'expired':
+        conditions.append(expired)
+    elif status == 'deleted':
+        conditions.append(Coupon.deleted == 1)
+    elif status != 'all':
+        raise ValueError("Unknown coupon status %r" % status)
+    if purchasable is not None:
+        can_buy = and_(Coupon.points <= points, Coupon.level <= level)
+        conditions.append(can_buy if purchasable else not_(can_buy))
+    return conditions
+
+
+def get_coupon_order(sort):
+    """
+    Gets the ORDER BY of a coupon catalog sort, ties broken by cid.
 
     Args:
-        coupons: A list of dictinaries, each dictinary must have the keys,
-          int 'deleted' and DateTime 'expiration'.
+        sort: One of COUPON_SORTS.
 
     Returns:
-        A the list coupons with the invalid dictinaries removed.
+        A list of columns to order by.
     """
-    today = date.today()
-    copy = coupons[:]
-    for c in copy:
-        if (c["deleted"] == 1) or (c["expiration"] != None and today > c["expiration"]):
-            coupons.remove(c)
+    if sort not in COUPON_SORTS:
+        raise ValueError("Unknown coupon sort %r" % sort)
+    return COUPON_SORTS[sort]
+
+
+@read_only
+def get_coupon_catalog(rid, status='active', points=None, level=None, purchasable=None, sort='level',
+                       page=1, per_page=None):
+    """
+    Fetches a page of a restaurant's coupons, filtered and sorted by the
+    database.
 
-    return coupons
+    Args:
+        rid: A restaurant ID that corresponds to a restaurant in the Restaurant
+          table. A integer.
+        status: 'active', 'expired', 'deleted' or 'all', see
+          get_coupon_conditions.
+        points: The customer's points at the restaurant, None if there is no
+          customer.
+        level: The customer's level at the restaurant, None if there is no
+          customer.
+        purchasable: True or False to only get the coupons the customer can
+          or cannot buy, None for both.
+        sort: 'level', 'points', 'name' or 'newest'.
+        page: The page to get, starting at 1.
+        per_page: The number of coupons in a page, every coupon if None.
+
+    Returns:
+        A list of coupons like get_coupons. When points and level are given,
+        each also has 'purchasable', True if the customer has enough points
+        and a high enough level to buy it.
+    """
+    columns = [Coupon.cid, Coupon.name, Coupon.description, Coupon.points, Coupon.level,
+               Coupon.begin, Coupon.expiration, Coupon.deleted]
+    customer = points is not None and level is not None
+    if customer:
+        columns.append(case([(and_(Coupon.points <= points, Coupon.level <= level), 1)], else_=0)
+                       .label('purchasable'))
+    query = db.session.query(*columns) \
+        .filter(*get_coupon_conditions(rid, status, points, level, purchasable)) \
+        .order_by(*get_coupon_order(sort))
+    if per_page is not None:
+        query = query.limit(per_page).offset((page - 1) * per_page)
+
+    coupon_list = []
+    for row in query:
+        dict = {
+            "cid": row.cid,
+            "name": row.name,
+            "description": row.description,
+            "points": row.points,
+            "level": row.level,
+            "begin": row.begin,
+            "expiration": row.expiration,
+            "deleted": row.deleted
+        }
+        if customer:
+            dict["purchasable"] = bool(row.purchasable)
+        coupon_list.append(dict)
+    return coupon_list
 
 
+@read_only
 def get_coupon_by_cid(cid):
     """
     Get a list of dictionary which contains all coupon info by the given cid
@@ -163,23 +284,35 @@ def get_coupon_by_cid(cid):
     coupon = Coupon.query.filter(Coupon.cid == cid).first()
 
     if coupon:
-        c = {
-            "cid": coupon.cid,
-            "rid": coupon.rid,
-            "points": coupon.points,
-            "cname": coupon.name,
-            "cdescription": coupon.description,
-            "clevel": coupon.level,
-            "begin": coupon.begin,
-            "expiration": coupon.expiration,
-            "status": is_today_in_coupon_date_range(coupon)
-        }
-
-        return c
+        return get_coupon_info(coupon)
     else:
         return None
 
 
+def get_coupon_info(coupon):
+    """
+    Get the dictionary of get_coupon_by_cid from a coupon already loaded.
+
+    Args:
+        coupon: A row of the Coupon table.
+
+    Returns:
+        a dictionary of the coupon info
+    """
+    return {
+        "cid": coupon.cid,
+        "rid": coupon.rid,
+        "points": coupon.points,
+        "cname": coupon.name,
+        "cdescription": coupon.description,
+        "clevel": coupon.level,
+        "begin": coupon.begin,
+        "expiration": coupon.expiration,
+        "status": is_today_in_coupon_date_range(coupon)
+    }
+
+
+@read_only
 def find_res_name_of_coupon_by_cid(cid):
     """
     Get the restaurant name by the given cid
@@ -201,6 +334,7 @@ def find_res_name_of_coupon_by_cid(cid):
         return "Not Found"
 
 
+@read_only
 def find_res_addr_of_coupon_by_cid(cid):
     """
     Get the restaurant address by the given cid
@@ -236,3 +370,6 @@ def get_rid_by_cid(cid):
     if c:
         return c.rid
     return "Not Found"
+
+
+trace_functions(__name__)
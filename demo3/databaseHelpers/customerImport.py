@@ -0,0 +1,303 @@
+from models import User, Points, Experience
+from exts import db
+from sqlalchemy import and_, bindparam
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from instrumentation.tracing import trace_functions
+
+# Number of input rows imported in one transaction
+CHUNK_SIZE = 5000
+
+
+def read_rows(path):
+    """
+    Streams the rows of a CSV or JSONL file one at a time.
+
+    A file whose name ends with .jsonl or .json holds one JSON object per line,
+    any other file is read as a CSV file with a header row.
+
+    Args:
+        path: The path of the file to read. A string.
+
+    Returns:
+        A generator of (line, row) tuples, line being the row's line number
+        in the file and row a dict keyed by column name, None if the line is
+        not valid JSON.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.jsonl') or path.endswith('.json'):
+            for line, text in enumerate(f, 1):
+                if text.strip():
+                    try:
+                        yield line, json.loads(text)
+                    except ValueError:
+                        # Rejected by the caller like any invalid row, so a resumed import gets past it
+                        yield line, None
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def parse_row(row):
+    """
+    Cleans one input row.
+
+    Args:
+        row: A dict with an email key and optional name, password, points and
+          experience keys, None for a line that could not be read.
+
+    Returns:
+        A touple containing an error message, None if the row is valid, and the
+        cleaned row with the email in lower case, the password hashed the same
+        way as the registration form and the balances as integers.
+    """
+    if not isinstance(row, dict):
+        return "Invalid row, please provide a JSON object.", None
+    email = (row.get('email') or '').strip().lower()
+    if not email or len(email) > 64:
+        return "Invalid email.", None
+    balances = {}
+    for key in ('points', 'experience'):
+        try:
+            balances[key] = int(row.get(key) or 0)
+        except (TypeError, ValueError):
+            return "Invalid amount for %s." % key, None
+        if balances[key] < 0:
+            return "Invalid amount for %s." % key, None
+    password = row.get('password') or ''
+    return None, {
+        'email': email,
+        'name': ((row.get('name') or '').strip() or email.split('@')[0])[:64],
+        # Users without a password cannot log in until one is set for them
+        'password': hashlib.md5(password.encode()).hexdigest() if password else '',
+        'points': balances['points'],
+        'experience': balances['experience'],
+    }
+
+
+def copy_field(value):
+    """
+    Formats a value for COPY ... WITH CSV, which reads an unquoted empty field
+    as NULL and a quoted one as an empty string.
+
+    Returns:
+        The field as a string.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return '"%s"' % value.replace('"', '""')
+    return str(value)
+
+
+def copy_rows(table, rows):
+    """
+    Inserts rows into a table in the current transaction.
+
+    Uses COPY on PostgreSQL and a single executemany on any other database.
+
+    Args:
+        table: The table to fill.
+        rows: A list of dicts keyed by column name, all with the same keys.
+
+    Returns:
+        None.
+    """
+    if not rows:
+        return None
+    if db.session.get_bind().dialect.name != 'postgresql':
+        db.session.execute(table.insert(), rows)
+        return None
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(copy_field(row[c]) for c in columns) + '\n')
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert('COPY "%s" (%s) FROM STDIN WITH CSV' % (table.name, ', '.join('"%s"' % c for c in columns)),
+                       buffer)
+    cursor.close()
+    return None
+
+
+def set_balances(model, column, rid, balances):
+    """
+    Sets a balance column of the Points or Experience table for many users at
+    one restaurant, inserting the rows that do not exist yet.
+
+    Args:
+        model: Points or Experience.
+        column: The name of the balance column, 'points' or 'experience'.
+        rid: The restaurant ID the balances belong to. An integer.
+        balances: A dict mapping user IDs to their balance.
+
+    Returns:
+        None.
+    """
+    existing = set(uid for uid, in db.session.query(model.uid)
+                   .filter(model.rid == rid, model.uid.in_(bindparam('uids', expanding=True)))
+                   .params(uids=list(balances)))
+    updates = [{'b_uid': uid, 'b_balance': balance} for uid, balance in balances.items() if uid in existing]
+    if updates:
+        table = model.__table__
+        db.session.execute(table.update().where(and_(table.c.uid == bindparam('b_uid'), table.c.rid == rid))
+                           .values({column: bindparam('b_balance')}), updates)
+    copy_rows(model.__table__, [{'uid': uid, 'rid': rid, column: balance}
+                                for uid, balance in balances.items() if uid not in existing])
+    return None
+
+
+def import_chunk(rows, rid):
+    """
+    Imports a chunk of cleaned rows in the current transaction.
+
+    Users are matched by email, only the ones that do not exist yet are
+    inserted. Balances replace the user's current balance at the restaurant,
+    so importing the same rows twice gives the same result.
+
+    Args:
+        rows: A list of rows returned by parse_row, with unique emails.
+        rid: The restaurant ID the balances belong to. An integer.
+
+    Returns:
+        The number of users inserted.
+    """
+    # An expanding parameter is compiled once instead of once per email
+    by_email = db.session.query(User.email, User.uid).filter(User.email.in_(bindparam('emails', expanding=True)))
+    uids = dict(by_email.params(emails=[r['email'] for r in rows]))
+    new_users = [{'name': r['name'], 'email': r['email'], 'password': r['password'], 'type': -1}
+                 for r in rows if r['email'] not in uids]
+    copy_rows(User.__table__, new_users)
+    if new_users:
+        uids.update(by_email.params(emails=[u['email'] for u in new_users]))
+    set_balances(Points, 'points', rid, {uids[r['email']]: r['points'] for r in rows})
+    set_balances(Experience, 'experience', rid, {uids[r['email']]: r['experience'] for r in rows})
+    return len(new_users)
+
+
+def read_checkpoint(checkpoint, path, rid):
+    """
+    Reads the checkpoint left by an import of the same file that did not finish.
+
+    Returns:
+        The checkpoint's dict, or None if there is no checkpoint for this file
+        and restaurant.
+    """
+    if not os.path.exists(checkpoint):
+        return None
+    with open(checkpoint) as f:
+        state = json.load(f)
+    if state.get('path') != os.path.abspath(path) or state.get('rid') != rid:
+        return None
+    return state
+
+
+def write_checkpoint(checkpoint, state):
+    """
+    Atomically replaces the checkpoint file.
+    """
+    temporary = checkpoint + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(state, f)
+    os.replace(temporary, checkpoint)
+
+
+def import_customers(path, rid, chunk_size=CHUNK_SIZE, checkpoint=None, restart=False, log=print):
+    """
+    Imports customers and their points and experience at a restaurant from a
+    CSV or JSONL file.
+
+    Each row has an email and optional name, password, points and experience.
+    Rows are read as a stream and imported chunk_size at a time, each chunk
+    in its own transaction. After a chunk is committed the line it ended on is
+    saved to the checkpoint file, so an import that failed resumes after the
+    last committed chunk when it is run again.
+
+    Args:
+        path: The path of the file to import. A string.
+        rid: The restaurant ID the balances belong to. An integer.
+        chunk_size: The number of rows imported in one transaction.
+        checkpoint: The path of the checkpoint file, path + '.checkpoint' by
+          default.
+        restart: Ignore an existing checkpoint and import the whole file.
+        log: Function called with a progress message after each chunk and for
+          each rejected row.
+
+    Returns:
+        A dict with the number of rows read, users inserted, users that
+        already existed, rows rejected and emails repeated within a chunk, the
+        elapsed seconds and the rows imported per second.
+    """
+    checkpoint = checkpoint or path + '.checkpoint'
+    state = None if restart else read_checkpoint(checkpoint, path, rid)
+    if state is None:
+        state = {'path': os.path.abspath(path), 'rid': rid, 'line': 0,
+                 'stats': {'read': 0, 'inserted': 0, 'existing': 0, 'rejected': 0, 'duplicates': 0}}
+    else:
+        log("Resuming after line %d" % state['line'])
+    stats = state['stats']
+    run = {'read': 0, 'pending': 0, 'start': time.time()}
+
+    chunk = {}
+    last_line = state['line']
+    for line, row in read_rows(path):
+        if line <= state['line']:
+            continue
+        run['pending'] += 1
+        last_line = line
+        errmsg, row = parse_row(row)
+        if errmsg:
+            stats['rejected'] += 1
+            log("Line %d rejected: %s" % (line, errmsg))
+        elif row['email'] in chunk:
+            # The last row of a user wins, as it would if they were in separate chunks
+            stats['duplicates'] += 1
+            chunk[row['email']] = row
+        else:
+            chunk[row['email']] = row
+        if len(chunk) >= chunk_size:
+            commit_chunk(chunk, rid, last_line, state, checkpoint, run, log)
+            chunk = {}
+    commit_chunk(chunk, rid, last_line, state, checkpoint, run, log)
+
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    elapsed = time.time() - run['start']
+    stats['seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = round(run['read'] / elapsed) if elapsed else None
+    return stats
+
+
+def commit_chunk(chunk, rid, line, state, checkpoint, run, log):
+    """
+    Imports and commits a chunk, then moves the checkpoint to the chunk's last line.
+
+    Returns:
+        None.
+    """
+    try:
+        inserted = import_chunk(list(chunk.values()), rid) if chunk else 0
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    stats = state['stats']
+    stats['read'] += run['pending']
+    stats['inserted'] += inserted
+    stats['existing'] += len(chunk) - inserted
+    run['read'] += run['pending']
+    run['pending'] = 0
+    state['line'] = line
+    write_checkpoint(checkpoint, state)
+    elapsed = time.time() - run['start']
+    log("Line %d: %d rows, %d new users, %.0f rows/s"
+        % (line, stats['read'], stats['inserted'], run['read'] / elapsed if elapsed else 0))
+    return None
+
+
+trace_functions(__name__)
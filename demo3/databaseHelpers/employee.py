@@ -1,9 +1,7 @@
-from models import Employee, User
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
+from models import Employee, User, Points, Experience, Favourite, Redeemed_Coupons, Customer_Achievement_Progress
+from sqlalchemy.orm import joinedload
+from exts import db, read_only, STREAM_BATCH_SIZE
+from instrumentation.tracing import trace_functions
 
 
 def insert_new_employee(uid, rid):
@@ -24,6 +22,7 @@ def insert_new_employee(uid, rid):
     return None
 
 
+@read_only
 def get_employees(rid):
     """
     Fetches rows from the Employee table.
@@ -40,9 +39,9 @@ def get_employees(rid):
         match rid.
     """
     employee_list = []
-    employees = Employee.query.filter(Employee.rid == rid).all()
+    employees = Employee.query.options(joinedload(Employee.user, innerjoin=True)).filter(Employee.rid == rid).all()
     for e in employees:
-        employee = User.query.filter(User.uid == e.uid).first()
+        employee = e.user
         dict = {
             "uid": employee.uid,
             "name": employee.name,
@@ -53,11 +52,34 @@ def get_employees(rid):
     return employee_list
 
 
+@read_only
+def iter_employees(rid, batch_size=STREAM_BATCH_SIZE):
+    """
+    Streams the employees of a restaurant from the Employee and User tables.
+
+    Like get_employees, but with one joined query whose rows are fetched
+    batch_size at a time while they are iterated.
+
+    Args:
+        rid: A restaurant ID that corresponds to a restaurant in the Restaurant
+          table. A integer.
+        batch_size: The number of rows fetched at a time.
+
+    Yields:
+        A row with the uid, name, email and type of each employee.
+    """
+    query = db.session.query(User.uid, User.name, User.email, User.type) \
+        .join(Employee, Employee.uid == User.uid).filter(Employee.rid == rid)
+    for row in query.yield_per(batch_size):
+        yield row
+
+
 def delete_employee(uid):
     """
     Removes a row from the Employee table and User Table.
 
-    Deletes a employee user from the database.
+    Deletes a employee user from the database, with every row referring to
+    the user, in one transaction.
 
     Args:
         uid: A user ID that corresponds to a user in the User and Employee
@@ -66,11 +88,10 @@ def delete_employee(uid):
     Returns:
         None.
     """
-    # Deletes employee from employee table
-    Employee.query.filter(Employee.uid == uid).delete()
-    db.session.commit()
-    # Deletes employee from user table
-    User.query.filter(User.uid == uid).delete()
+    # The foreign keys cascade on PostgreSQL, SQLite does not enforce them by default
+    for model in (Employee, Points, Experience, Favourite, Redeemed_Coupons, Customer_Achievement_Progress):
+        model.query.filter(model.uid == uid).delete(synchronize_session=False)
+    User.query.filter(User.uid == uid).delete(synchronize_session=False)
     db.session.commit()
     return None
 
@@ -91,3 +112,6 @@ def get_employee_rid(uid):
         return employee.rid
     else:
         return None
+
+
+trace_functions(__name__)
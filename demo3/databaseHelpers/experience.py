@@ -1,13 +1,9 @@
 from models import Experience
+from exts import db
 from databaseHelpers.level import *
 from databaseHelpers.threshold import *
 from databaseHelpers.restaurant import *
-
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
+from instrumentation.tracing import trace_functions
 
 
 def insert_experience(uid, rid):
@@ -83,13 +79,17 @@ def update_experience(uid, rid, increment):
 
     if not errmsg:
         old_level = convert_experience_to_level(experience.experience)
-        milestone = get_milestone(uid, rid)
         Experience.query.filter(Experience.uid == uid).filter(Experience.rid == rid).update(dict(experience=experience.experience + increment))
         db.session.commit()
-        if milestone:
-            new_level = convert_experience_to_level(experience.experience)
-            if old_level < new_level and new_level == int(milestone["level"]):
-                update_points(uid, rid, milestone["reward"])
+        new_level = convert_experience_to_level(experience.experience)
+        # Every milestone passed is rewarded, even when several levels are gained at once
+        if old_level < new_level:
+            reward = sum(m["reward"] for m in get_crossed_milestones(rid, old_level, new_level))
+            if reward:
+                update_points(uid, rid, reward)
         return None
 
     return errmsg
+
+
+trace_functions(__name__)
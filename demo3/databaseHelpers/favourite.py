@@ -1,11 +1,8 @@
 from models import Favourite
 from databaseHelpers.restaurant import *
-
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
+from sqlalchemy.orm import joinedload, selectinload
+from exts import db, read_only
+from instrumentation.tracing import trace_functions
 
 
 def add_favourite(uid, rid):
@@ -39,6 +36,7 @@ def check_favourite(uid, rid):
     fav = Favourite.query.filter(Favourite.uid == uid, Favourite.rid == rid).first()
     return fav != None
 
+@read_only
 def get_favourites(uid):
     """
     Fetches for all rows with corresponding uid and rid in the Favourite table.
@@ -51,17 +49,38 @@ def get_favourites(uid):
     Returns:
         A list of restaurants that are favourited
     """
-    fav = Favourite.query.filter(Favourite.uid == uid).all()
+    fav = Favourite.query.options(selectinload(Favourite.restaurant)).filter(Favourite.uid == uid).all()
     fav_list = []
     for f in fav:
         dict = {
             "rid": f.rid,
-            "name": get_restaurant_name_by_rid(f.rid),
-            "address": get_restaurant_address(f.rid)
+            "name": f.restaurant.name if f.restaurant else None,
+            "address": f.restaurant.address if f.restaurant else None
         }
         fav_list.append(dict)
     return fav_list
 
+@read_only
+def get_recent_favourites(uid, limit):
+    """
+    Fetches the restaurants most recently added to a user's favourites, with
+    one query on the (uid, created) index.
+
+    Args:
+        uid: A user ID that corresponds to a user in the User table. A integer.
+        limit: The number of favourites returned. A integer.
+
+    Returns:
+        A list of at most limit favourites like get_favourites, newest first.
+    """
+    fav = Favourite.query.options(joinedload(Favourite.restaurant)).filter(Favourite.uid == uid) \
+        .order_by(Favourite.created.desc(), Favourite.rid.desc()).limit(limit).all()
+    return [{
+        "rid": f.rid,
+        "name": f.restaurant.name if f.restaurant else None,
+        "address": f.restaurant.address if f.restaurant else None
+    } for f in fav]
+
 def remove_faviourite(uid, rid):
     """
     Removes a row from the Favourite table.
@@ -78,3 +97,6 @@ def remove_faviourite(uid, rid):
     if fav:
         db.session.delete(fav)
         db.session.commit()
+
+
+trace_functions(__name__)
@@ -0,0 +1,36 @@
+from databaseHelpers.achievementProgress import get_recently_update_achievements, get_updated_info
+from databaseHelpers.favourite import get_recent_favourites
+from databaseHelpers.redeemedCoupons import get_recent_redeemed_coupons
+from exts import read_only
+from instrumentation.tracing import trace_functions
+
+HOME_FEED_SIZE = 3
+
+
+@read_only
+def get_home_feed(uid, limit=HOME_FEED_SIZE):
+    """
+    Fetches the recent activity shown on a customer's home page.
+
+    Every list is read with a LIMIT query on an index starting with the user
+    ID, so the cost does not grow with the customer's history.
+
+    Args:
+        uid: A user ID that corresponds to a customer in the User table. An integer.
+        limit: The number of items of each kind. An integer.
+
+    Returns:
+        A dict with the newest first lists:
+        'coupons': the last coupons redeemed and still held,
+        'restaurants': the last restaurants added to the favourites,
+        'achievements': the last achievement progress updated, as returned
+        by get_updated_info.
+    """
+    return {
+        'coupons': get_recent_redeemed_coupons(uid, limit),
+        'restaurants': get_recent_favourites(uid, limit),
+        'achievements': get_updated_info(get_recently_update_achievements(uid, limit))
+    }
+
+
+trace_functions(__name__)
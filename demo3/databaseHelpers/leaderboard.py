@@ -1,14 +1,11 @@
 from models import Experience
 from databaseHelpers.user import *
 from databaseHelpers.level import *
-
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
+from exts import db, read_only
+from instrumentation.tracing import trace_functions
 
 
+@read_only
 def top_n_in_order(rid, n):
     """
     :param rid: restaurant id
@@ -25,6 +22,7 @@ def top_n_in_order(rid, n):
     sort_list = sorted(dict.items(), key=lambda item:item[1], reverse=True)
     return sort_list[:n]
 
+@read_only
 def get_data(list):
     """
     :param list: the sorted list given by top_n_in_order
@@ -42,3 +40,5 @@ def get_data(list):
         data_list.append(data)
     return data_list
 
+
+trace_functions(__name__)
@@ -1,10 +1,6 @@
 from models import Experience
-
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
+from exts import db
+from instrumentation.tracing import trace_functions
 
 
 def convert_experience_to_level(experience):
@@ -43,4 +39,7 @@ def get_experience_since_last_level(level, experience):
     Returns:
         The integer number of experience earned since the user's last level up.
     """
-    return experience - (sum(range(level+1))*100)
\ No newline at end of file
+    return experience - (sum(range(level+1))*100)
+
+
+trace_functions(__name__)
@@ -1,10 +1,6 @@
 from models import Points
-
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
+from exts import db
+from instrumentation.tracing import trace_functions
 
 
 def insert_points(uid, rid):
@@ -83,4 +79,7 @@ def update_points(uid, rid, increment):
         db.session.commit()
         return None
 
-    return errmsg
\ No newline at end of file
+    return errmsg
+
+
+trace_functions(__name__)
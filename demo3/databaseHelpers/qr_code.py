@@ -1,12 +1,15 @@
-import qrcode
-from PIL import Image
 import os
 import config
 from pathlib import Path
+from instrumentation.tracing import trace_functions
+
+# qrcode pulls in PIL, which is slow to import, so it is only imported the
+# first time a QR code is made rather than when the app starts.
 
 # the method of generating qr code comes from
 # https://note.nkmk.me/en/python-pillow-qrcode/
 def to_qr(url, uid, cid):
+    import qrcode
     img = qrcode.make(url)
     if config.STATUS == 'TEST':
         path = str(get_root()) + '/static/Resources/QR/'+str(uid)+'_'+str(cid)+'.png'
@@ -25,7 +28,7 @@ def update_achievement_qr(url, aid, uid):
     :param uid: user id, example:3
     :return: the img path, example: /static/Resources/QR/update_achievement/3_5.png
     """
-
+    import qrcode
     img = qrcode.make(url)
     if config.STATUS == 'TEST':
         path = str(get_root()) + '/static/Resources/QR/update_achievement/'+str(uid)+'_'+str(aid)+'.png'
@@ -51,4 +54,4 @@ def get_root():
     return path
 
 
-
+trace_functions(__name__)
@@ -0,0 +1,335 @@
+from models import User, Points, Experience, Achievements, Customer_Achievement_Progress, Restaurant, Employee
+from databaseHelpers.achievement import get_rule
+from databaseHelpers.customerImport import copy_rows, read_rows
+from databaseHelpers.level import convert_experience_to_level
+from databaseHelpers.threshold import get_crossed_milestones
+from datetime import datetime
+from exts import db
+from instrumentation.tracing import trace_functions
+
+# Number of receipts of a POS export ingested in one transaction
+CHUNK_SIZE = 1000
+
+
+def parse_receipt(receipt):
+    """
+    Cleans one receipt sent by a point of sale.
+
+    Args:
+        receipt: A dict with uid and rid keys, and optional items, total,
+          party and time keys. items is a list of dicts with a name and a
+          quantity, total the amount spent, party the size of the group and
+          time when the receipt was printed, as an ISO 8601 string.
+
+    Returns:
+        A tuple containing a list of error messages, empty if the receipt is
+        valid, and the cleaned receipt with the item names in lower case
+        mapped to their summed quantities.
+    """
+    errmsg = []
+    if not isinstance(receipt, dict):
+        return ["A receipt must be an object."], None
+    cleaned = {}
+    for key in ('uid', 'rid'):
+        try:
+            cleaned[key] = int(receipt.get(key))
+        except (TypeError, ValueError):
+            errmsg.append("Invalid %s." % key)
+
+    items = {}
+    for item in receipt.get('items') or []:
+        try:
+            name = item['name'].strip().lower()
+            quantity = int(item.get('quantity', 1))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            errmsg.append("Invalid item, please provide a name and a quantity.")
+            continue
+        if quantity < 0:
+            errmsg.append("Invalid quantity for %s." % name)
+        items[name] = items.get(name, 0) + quantity
+    cleaned['items'] = items
+
+    try:
+        cleaned['total'] = float(receipt.get('total') or 0)
+        cleaned['party'] = int(receipt.get('party') or 1)
+    except (TypeError, ValueError):
+        errmsg.append("Invalid total or party size.")
+    else:
+        if cleaned['total'] < 0 or cleaned['party'] < 1:
+            errmsg.append("Invalid total or party size.")
+
+    try:
+        cleaned['time'] = datetime.fromisoformat(receipt['time']) if receipt.get('time') else datetime.now()
+    except (TypeError, ValueError):
+        errmsg.append("Invalid time, please provide an ISO 8601 date and time.")
+    return errmsg, cleaned
+
+
+def parse_receipts(receipts):
+    """
+    Cleans a batch of receipts and checks their customers exist.
+
+    Args:
+        receipts: A list of receipts as accepted by parse_receipt.
+
+    Returns:
+        A tuple containing a list of {'index', 'errors'} dicts for the
+        rejected receipts and the list of cleaned valid receipts.
+    """
+    rejected, parsed = [], []
+    for index, receipt in enumerate(receipts):
+        errmsg, cleaned = parse_receipt(receipt)
+        if errmsg:
+            rejected.append({'index': index, 'errors': errmsg})
+        else:
+            parsed.append((index, cleaned))
+
+    uids = set(r['uid'] for i, r in parsed)
+    customers = set(uid for uid, in db.session.query(User.uid).filter(User.uid.in_(uids), User.type == -1)) \
+        if uids else set()
+    valid = []
+    for index, receipt in parsed:
+        if receipt['uid'] in customers:
+            valid.append(receipt)
+        else:
+            rejected.append({'index': index, 'errors': ["No customer with this uid."]})
+    rejected.sort(key=lambda r: r['index'])
+    return rejected, valid
+
+
+def evaluate_receipt(rule, receipt):
+    """
+    Calculates how much a receipt advances an achievement.
+
+    Args:
+        rule: The AchievementRule of the achievement.
+        receipt: A receipt cleaned by parse_receipt.
+
+    Returns:
+        The progress made, 0 if the receipt does not count towards the
+        achievement. An integer.
+    """
+    if rule.type == 0:
+        return receipt['items'].get(rule.item.strip().lower(), 0)
+    if rule.type == 1:
+        return 1 if receipt['total'] >= rule.quantity else 0
+    if rule.type == 2:
+        return 1 if receipt['party'] >= rule.quantity else 0
+    if rule.type == 3:
+        return 1
+    return 0
+
+
+def credit_rewards(model, column, rewards):
+    """
+    Adds amounts to a balance column of the Points or Experience table in the
+    current transaction, inserting the rows that do not exist yet.
+
+    Args:
+        model: Points or Experience.
+        column: The name of the balance column, 'points' or 'experience'.
+        rewards: A dict mapping (uid, rid) tuples to the amount to add.
+
+    Returns:
+        A dict mapping (uid, rid) tuples to the balance before the amount
+        was added.
+    """
+    if not rewards:
+        return {}
+    uids, rids = set(uid for uid, rid in rewards), set(rid for uid, rid in rewards)
+    rows = dict(((r.uid, r.rid), r) for r in model.query.filter(model.uid.in_(uids), model.rid.in_(rids))
+                if (r.uid, r.rid) in rewards)
+    before, missing = {}, []
+    for (uid, rid), amount in rewards.items():
+        row = rows.get((uid, rid))
+        if row is None:
+            before[(uid, rid)] = 0
+            missing.append({'uid': uid, 'rid': rid, column: amount})
+        else:
+            before[(uid, rid)] = getattr(row, column) or 0
+            setattr(row, column, before[(uid, rid)] + amount)
+    # The changed rows are written by a single executemany when the session flushes
+    copy_rows(model.__table__, missing)
+    return before
+
+
+def apply_receipts(receipts):
+    """
+    Evaluates every active achievement of their restaurants against cleaned
+    receipts, in the current transaction.
+
+    Achievements, progress, points and experience are each read with one
+    query for the whole batch. Receipts are applied in order, so a receipt
+    completing an achievement stops later ones from advancing it. Completed
+    achievements credit their points and experience once per customer and
+    restaurant, with the rewards of every milestone the experience crosses.
+
+    Args:
+        receipts: A list of receipts cleaned by parse_receipts.
+
+    Returns:
+        A dict with the number of receipts, of progress entries advanced and
+        the list of {'aid', 'uid'} dicts of the achievements completed.
+    """
+    stats = {'receipts': len(receipts), 'advanced': 0, 'completed': []}
+    if not receipts:
+        return stats
+    rids = set(r['rid'] for r in receipts)
+    uids = set(r['uid'] for r in receipts)
+    rules = {}
+    for a in Achievements.query.filter(Achievements.rid.in_(rids)):
+        rules.setdefault(a.rid, []).append(get_rule(a))
+    aids = [rule.aid for restaurant in rules.values() for rule in restaurant]
+    progress = {}
+    if aids:
+        progress = dict(((p.aid, p.uid), p) for p in Customer_Achievement_Progress.query
+                        .filter(Customer_Achievement_Progress.uid.in_(uids), Customer_Achievement_Progress.aid.in_(aids)))
+
+    advanced = set()
+    points, experience = {}, {}
+    for receipt in receipts:
+        day = receipt['time'].date()
+        for rule in rules.get(receipt['rid'], []):
+            if rule.date_status(day) != 0:
+                continue
+            key = (rule.aid, receipt['uid'])
+            entry = progress.get(key)
+            if entry is not None and entry.progress >= entry.total:
+                continue
+            increment = evaluate_receipt(rule, receipt)
+            if not increment:
+                continue
+            if entry is None:
+                entry = Customer_Achievement_Progress(aid=rule.aid, uid=receipt['uid'], progress=0,
+                                                      total=rule.progress_max)
+                db.session.add(entry)
+                progress[key] = entry
+            entry.progress = min(entry.total, entry.progress + increment)
+            entry.update = receipt['time']
+            advanced.add(key)
+            if entry.progress == entry.total:
+                account = (receipt['uid'], rule.rid)
+                points[account] = points.get(account, 0) + rule.points
+                experience[account] = experience.get(account, 0) + rule.experience
+                stats['completed'].append({'aid': rule.aid, 'uid': receipt['uid']})
+
+    before = credit_rewards(Experience, 'experience', experience)
+    for (uid, rid), old in before.items():
+        crossed = get_crossed_milestones(rid, convert_experience_to_level(old),
+                                         convert_experience_to_level(old + experience[(uid, rid)]))
+        reward = sum(m['reward'] for m in crossed)
+        if reward:
+            points[(uid, rid)] = points.get((uid, rid), 0) + reward
+    credit_rewards(Points, 'points', dict((k, v) for k, v in points.items() if v))
+    stats['advanced'] = len(advanced)
+    return stats
+
+
+def get_scannable_rids(uid):
+    """
+    Gets the restaurants a user owns or works at.
+
+    Args:
+        uid: A user ID. An integer.
+
+    Returns:
+        A set of restaurant IDs.
+    """
+    owned = db.session.query(Restaurant.rid).filter(Restaurant.uid == uid)
+    employed = db.session.query(Employee.rid).filter(Employee.uid == uid)
+    return set(rid for rid, in owned.union(employed))
+
+
+def ingest_receipts(receipts, scanner=None):
+    """
+    Applies a batch of receipts in a single transaction.
+
+    Nothing is written if a receipt is rejected or applying them fails.
+
+    Args:
+        receipts: A list of receipts as accepted by parse_receipt.
+        scanner: The user sending the receipts, who must own or work at the
+          restaurant of every receipt. None to skip the check.
+
+    Returns:
+        A tuple containing the list of rejected receipts returned by
+        parse_receipts, and the stats returned by apply_receipts, None if a
+        receipt was rejected.
+    """
+    rejected, valid = parse_receipts(receipts)
+    if scanner is not None and not rejected:
+        allowed = get_scannable_rids(scanner)
+        rejected = [{'index': i, 'errors': ["You cannot scan at this restaurant."]}
+                    for i, r in enumerate(valid) if r['rid'] not in allowed]
+    if rejected:
+        return rejected, None
+    try:
+        stats = apply_receipts(valid)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return [], stats
+
+
+def ingest_export(path, chunk_size=CHUNK_SIZE, start=0, log=print):
+    """
+    Ingests the receipts of a POS export, a JSONL file with one receipt per
+    line.
+
+    Receipts are read as a stream and applied chunk_size at a time, each
+    chunk in its own transaction. Rejected receipts are logged and skipped.
+    Receipts are not idempotent, after a failure the export is resumed with
+    start set to the last line logged as committed.
+
+    Args:
+        path: The path of the JSONL file. A string.
+        chunk_size: The number of receipts applied in one transaction.
+        start: The number of lines to skip.
+        log: Function called with a message after each chunk and for each
+          rejected receipt.
+
+    Returns:
+        A dict with the number of receipts read and rejected, of progress
+        entries advanced and of achievements completed.
+    """
+    totals = {'read': 0, 'rejected': 0, 'advanced': 0, 'completed': 0}
+    chunk = []
+    for line, receipt in read_rows(path):
+        if line <= start:
+            continue
+        chunk.append((line, receipt))
+        if len(chunk) >= chunk_size:
+            commit_receipts(chunk, totals, log)
+            chunk = []
+    if chunk:
+        commit_receipts(chunk, totals, log)
+    return totals
+
+
+def commit_receipts(chunk, totals, log):
+    """
+    Applies and commits a chunk of (line, receipt) tuples of a POS export,
+    then adds its stats to totals.
+
+    Returns:
+        None.
+    """
+    rejected, valid = parse_receipts([receipt for line, receipt in chunk])
+    for r in rejected:
+        log("Line %d rejected: %s" % (chunk[r['index']][0], " ".join(r['errors'])))
+    try:
+        stats = apply_receipts(valid)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    totals['read'] += len(chunk)
+    totals['rejected'] += len(rejected)
+    totals['advanced'] += stats['advanced']
+    totals['completed'] += len(stats['completed'])
+    log("Line %d committed: %d receipts, %d achievements completed" % (chunk[-1][0], totals['read'], totals['completed']))
+    return None
+
+
+trace_functions(__name__)
@@ -1,19 +1,18 @@
 from models import Coupon, Redeemed_Coupons, User
 from databaseHelpers.coupon import *
 from databaseHelpers.restaurant import *
-from datetime import date
-from dateutil.relativedelta import relativedelta
-
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
+from datetime import date, timedelta
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import contains_eager, joinedload
+from exts import db, read_only, STREAM_BATCH_SIZE
+from instrumentation.tracing import trace_functions
 
 
+@read_only
 def get_redeemed_coupons_by_rid(rid):
     """
-    Add two keys in coupons dictionary which represents the holders and used coupons.
+    Add two keys in coupons dictionary which represents the holders and used coupons,
+    counted by a single grouped query.
 
     Args:
         rid: The restaurant ID that corresponds to the Restaurant that is fetched.
@@ -22,18 +21,53 @@ def get_redeemed_coupons_by_rid(rid):
         a list of coupon which has two extra key, 'holders' and 'used'
         'holders' records the number of users who currently own this coupon
         'used' records the number of previous usage of this coupon
+        both including the redemptions archived
     """
     coupons = get_coupons(rid)
+    # The archived redemptions are only counted
+    holders = func.sum(case([(Redeemed_Coupons.valid == 1, 1)], else_=0)) + Coupon.archived_held
+    used = func.sum(case([(Redeemed_Coupons.valid == 0, 1)], else_=0)) + Coupon.archived_used
+    counts = dict((cid, (held, spent)) for cid, held, spent in
+                  db.session.query(Coupon.cid, holders, used)
+                  .outerjoin(Redeemed_Coupons, and_(Redeemed_Coupons.cid == Coupon.cid, Redeemed_Coupons.rid == rid))
+                  .filter(Coupon.rid == rid).group_by(Coupon.cid))
 
     for c in coupons:
-        holders = Redeemed_Coupons.query.filter(Redeemed_Coupons.rid == rid, Redeemed_Coupons.cid == c['cid'], Redeemed_Coupons.valid == 1).count()
-        used = Redeemed_Coupons.query.filter(Redeemed_Coupons.rid == rid, Redeemed_Coupons.cid == c['cid'], Redeemed_Coupons.valid == 0).count()
-        c['holders'] = holders
-        c['used'] = used
+        c['holders'], c['used'] = counts[c['cid']]
 
     return coupons
 
 
+@read_only
+def iter_redeemed_coupons_by_rid(rid, status='all', batch_size=STREAM_BATCH_SIZE):
+    """
+    Streams the coupons of a restaurant with their holders and uses.
+
+    Like get_redeemed_coupons_by_rid, but the counts are computed by a single
+    grouped query instead of two per coupon, and its rows are fetched
+    batch_size at a time while they are iterated.
+
+    Args:
+        rid: The restaurant ID that corresponds to the Restaurant that is fetched.
+        status: 'all', 'active', 'expired' or 'deleted', see get_coupon_conditions.
+        batch_size: The number of rows fetched at a time.
+
+    Yields:
+        A row with the columns of each coupon and two more, 'holders' and
+        'used', like the dictionaries of get_redeemed_coupons_by_rid.
+    """
+    # The archived redemptions are only counted
+    holders = func.sum(case([(Redeemed_Coupons.valid == 1, 1)], else_=0)) + Coupon.archived_held
+    used = func.sum(case([(Redeemed_Coupons.valid == 0, 1)], else_=0)) + Coupon.archived_used
+    query = db.session.query(Coupon.cid, Coupon.name, Coupon.description, Coupon.points, Coupon.level,
+                             Coupon.begin, Coupon.expiration, Coupon.deleted,
+                             holders.label('holders'), used.label('used')) \
+        .outerjoin(Redeemed_Coupons, and_(Redeemed_Coupons.cid == Coupon.cid, Redeemed_Coupons.rid == rid)) \
+        .filter(*get_coupon_conditions(rid, status)).group_by(Coupon.cid)
+    for row in query.yield_per(batch_size):
+        yield row
+
+
 def mark_redeem_coupon_used_by_rcid(rcid):
     """
     Change valid to one by the given rcid
@@ -69,6 +103,7 @@ def find_rcid_by_cid_and_uid(cid, uid):
     return "Not Found"
 
 
+@read_only
 def get_redeemed_coupons_by_uid(uid):
     """
     Get a list of the redeemed coupons by uid
@@ -79,19 +114,80 @@ def get_redeemed_coupons_by_uid(uid):
     Returns:
         a list of the redeemed coupons with extra fields restaurant name
     """
-    coupons = Redeemed_Coupons.query.filter(Redeemed_Coupons.uid == uid, Redeemed_Coupons.valid == 1).all()
+    from dateutil.relativedelta import relativedelta
+    coupons = Redeemed_Coupons.query \
+        .options(joinedload(Redeemed_Coupons.coupon).joinedload(Coupon.restaurant)) \
+        .filter(Redeemed_Coupons.uid == uid, Redeemed_Coupons.valid == 1) \
+        .order_by(Redeemed_Coupons.rcid).all()
     coupon_list = []
 
     for c in coupons:
-        dict = get_coupon_by_cid(c.cid)
+        if c.coupon is None:
+            continue
+        dict = get_coupon_info(c.coupon)
         if not dict["expiration"] or dict["expiration"] + relativedelta(months=+6) > date.today():
-            dict["rname"] = get_restaurant_name_by_rid(c.rid)
-            dict["raddress"] = get_restaurant_address(c.rid)
+            restaurant = c.coupon.restaurant
+            dict["rname"] = restaurant.name if restaurant else None
+            dict["raddress"] = restaurant.address if restaurant else None
             coupon_list.append(dict)
 
     return coupon_list
 
 
+def get_kept_expiration_cutoff(today):
+    """
+    Get the expiration date up to which redeemed coupons are no longer listed,
+    the last date for which expiration + 6 months <= today.
+
+    Args:
+        today: The date of the listing.
+
+    Returns:
+        a date
+    """
+    from dateutil.relativedelta import relativedelta
+    cutoff = today - relativedelta(months=+6)
+    # Adding months clamps to the end of the month, so step to the exact day
+    while cutoff + relativedelta(months=+6) > today:
+        cutoff -= timedelta(days=1)
+    while cutoff + timedelta(days=1) + relativedelta(months=+6) <= today:
+        cutoff += timedelta(days=1)
+    return cutoff
+
+
+@read_only
+def get_recent_redeemed_coupons(uid, limit):
+    """
+    Get the coupons most recently redeemed by uid that are still held, with
+    one query on the (uid, valid, rcid) index.
+
+    Args:
+        uid: The user ID that corresponds to the User that is fetched.
+        limit: The number of coupons returned.
+
+    Returns:
+        a list of at most limit coupons like get_redeemed_coupons_by_uid,
+        newest first
+    """
+    cutoff = get_kept_expiration_cutoff(date.today())
+    coupons = Redeemed_Coupons.query \
+        .join(Redeemed_Coupons.coupon) \
+        .options(contains_eager(Redeemed_Coupons.coupon).joinedload(Coupon.restaurant)) \
+        .filter(Redeemed_Coupons.uid == uid, Redeemed_Coupons.valid == 1,
+                or_(Coupon.expiration == None, Coupon.expiration > cutoff)) \
+        .order_by(Redeemed_Coupons.rcid.desc()).limit(limit).all()
+    coupon_list = []
+
+    for c in coupons:
+        dict = get_coupon_info(c.coupon)
+        restaurant = c.coupon.restaurant
+        dict["rname"] = restaurant.name if restaurant else None
+        dict["raddress"] = restaurant.address if restaurant else None
+        coupon_list.append(dict)
+
+    return coupon_list
+
+
 def insert_redeemed_coupon(cid, uid, rid):
     """
     Insert a redeemed coupon to database
@@ -109,3 +205,6 @@ def insert_redeemed_coupon(cid, uid, rid):
     db.session.commit()
 
     return coupon.rcid
+
+
+trace_functions(__name__)
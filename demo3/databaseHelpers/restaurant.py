@@ -1,11 +1,7 @@
 from models import Restaurant, Employee, Achievements
 from sqlalchemy import func
-
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
+from exts import db, read_only
+from instrumentation.tracing import trace_functions
 
 
 def insert_new_restaurant(rname, address, uid):
@@ -49,6 +45,7 @@ def get_rid(uid):
     return None
 
 
+@read_only
 def get_resturant_by_name(name):
     """
     Fetches a list of resturants from the Restaurant table.
@@ -76,6 +73,7 @@ def get_resturant_by_name(name):
     return res_list
 
 
+@read_only
 def get_restaurant_name_by_rid(rid):
     """
     Fetches a row from the Resturant table.
@@ -133,6 +131,7 @@ def update_restaurant_information(restaurant, name, address):
         db.session.commit()
     return errmsg
 
+@read_only
 def get_restaurant_address(rid):
     """
     Get the restaurant address by the given rid
@@ -201,3 +200,6 @@ def get_errmsg_registration(rname, address, errmsg):
         errmsg.append("A restaurant address is required.")
 
     return errmsg
+
+
+trace_functions(__name__)
@@ -1,13 +1,30 @@
+import threading
+import time
+from bisect import bisect_right
+from flask import current_app
 from models import Thresholds, Experience
 from sqlalchemy import asc, desc
 from databaseHelpers.level import *
 from databaseHelpers.points import *
+from exts import db, read_only
+from instrumentation.metrics import count_cache
+from instrumentation.tracing import trace_functions
+
+
+def _milestone_cache():
+    """
+    Returns the threshold cache of the current app, kept in its extensions
+    since every app has its own database: a dict with the (read at, levels,
+    rewards) tuple of each restaurant with levels sorted, a counter per
+    restaurant bumped by each change so a read that raced a change is not
+    cached, and the lock guarding both.
+    """
+    cache = current_app.extensions.get('milestones')
+    if cache is None:
+        cache = current_app.extensions.setdefault('milestones', {'tables': {}, 'changes': {},
+                                                                 'lock': threading.Lock()})
+    return cache
 
-import config
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
 
 def insert_threshold(rid, level, reward):
     """
@@ -35,6 +52,7 @@ def insert_threshold(rid, level, reward):
         threshold = Thresholds(rid = rid, level = level, reward = reward)
         db.session.add(threshold)
         db.session.commit()
+        clear_milestones(rid)
 
     return errmsg
 
@@ -54,8 +72,10 @@ def delete_threshold(rid, level):
     if threshold:
         db.session.delete(threshold)
         db.session.commit()
+        clear_milestones(rid)
 
 
+@read_only
 def get_thresholds(rid):
     """
     Get a list of dictionary containing rid, level and reward form the restaurant of given rid
@@ -105,6 +125,7 @@ def update_threshold(rid, level, reward):
     if not errmsg and threshold:
         threshold.reward = reward
         db.session.commit()
+        clear_milestones(rid)
 
     return errmsg
 
@@ -125,6 +146,99 @@ def check_threshold(rid, level):
     return threshold != None
 
 
+def clear_milestones(rid=None):
+    """
+    Drops the thresholds the current app cached for a restaurant, for every
+    restaurant if rid is None.
+
+    Args:
+        rid: The unique ID of the restaurant. An integer.
+    """
+    cache = _milestone_cache()
+    with cache['lock']:
+        if rid is None:
+            cache['tables'].clear()
+            cache['changes'].clear()
+        else:
+            cache['tables'].pop(int(rid), None)
+            cache['changes'][int(rid)] = cache['changes'].get(int(rid), 0) + 1
+
+
+@read_only
+def get_milestone_table(rid):
+    """
+    Get the thresholds of a restaurant from the cache of the current app in
+    this process, read from the database if they are not cached or older
+    than THRESHOLD_CACHE_SECONDS.
+
+    Args:
+        rid: The unique ID of the restaurant. An integer.
+
+    Returns:
+        A (levels, rewards) tuple of lists sorted by level, the reward of
+        levels[i] being rewards[i]. They are shared, do not change them.
+    """
+    rid = int(rid)
+    now = time.monotonic()
+    cache = _milestone_cache()
+    with cache['lock']:
+        cached = cache['tables'].get(rid)
+        changes = cache['changes'].get(rid, 0)
+    if cached and now - cached[0] < current_app.config.get('THRESHOLD_CACHE_SECONDS', 60):
+        count_cache('thresholds', True)
+        return cached[1], cached[2]
+    count_cache('thresholds', False)
+
+    rows = db.session.query(Thresholds.level, Thresholds.reward).filter(Thresholds.rid == rid) \
+        .order_by(Thresholds.level).all()
+    levels = [r.level for r in rows]
+    rewards = [r.reward for r in rows]
+    with cache['lock']:
+        if cache['changes'].get(rid, 0) == changes:
+            cache['tables'][rid] = (now, levels, rewards)
+    return levels, rewards
+
+
+def get_next_milestone(rid, level):
+    """
+    Get the first milestone above a level.
+
+    Args:
+        rid: The unique ID of the restaurant. An integer.
+        level: The level of the user. An integer.
+
+    Returns:
+        A dictionary of the level and reward of the milestone, None if there
+        is no milestone above level.
+    """
+    levels, rewards = get_milestone_table(rid)
+    i = bisect_right(levels, level)
+    if i == len(levels):
+        return None
+    return {
+        "level": levels[i],
+        "reward": rewards[i]
+    }
+
+
+def get_crossed_milestones(rid, old_level, new_level):
+    """
+    Get the milestones reached by going from a level to a higher one.
+
+    Args:
+        rid: The unique ID of the restaurant. An integer.
+        old_level: The level before the change. An integer.
+        new_level: The level after the change. An integer.
+
+    Returns:
+        A list of dictionary of the level and reward of every milestone above
+        old_level and up to new_level, by level.
+    """
+    levels, rewards = get_milestone_table(rid)
+    start, end = bisect_right(levels, old_level), bisect_right(levels, new_level)
+    return [{"level": levels[i], "reward": rewards[i]} for i in range(start, end)]
+
+
 def get_milestone(uid, rid):
     """
     Get a list of dictionary of the milestone.
@@ -139,16 +253,10 @@ def get_milestone(uid, rid):
     """
     experience = Experience.query.filter(Experience.uid == uid).filter(Experience.rid == rid).first()
     if experience:
-        experience = experience.experience
-        level = convert_experience_to_level(experience)
-        threshold = Thresholds.query.filter(Thresholds.rid == rid, Thresholds.level > level).order_by(asc(Thresholds.level)).first()
-        if threshold:
-            return {
-                "level": threshold.level,
-                "reward": threshold.reward
-            }
+        return get_next_milestone(rid, convert_experience_to_level(experience.experience))
     return None
 
+@read_only
 def get_incomplete_milestones(rid, level):
     """
     Get all the milestone that is not completed in certain restaurant.
@@ -160,10 +268,9 @@ def get_incomplete_milestones(rid, level):
     Returns:
         A list of all incomplete milestone.
     """
-    threshold_list = get_thresholds(rid)
-    incomplete_list = []
-    for t in threshold_list:
-        if t["level"] > level:
-            incomplete_list.append(t)
+    levels, rewards = get_milestone_table(rid)
+    return [{"rid": int(rid), "level": levels[i], "reward": rewards[i]}
+            for i in range(bisect_right(levels, level), len(levels))]
+
 
-    return incomplete_list
+trace_functions(__name__)
@@ -1,11 +1,7 @@
 from models import User
-import config
+from exts import db, read_only
 import hashlib
-
-if config.STATUS == "TEST":
-    from models import db
-else:
-    from exts import db
+from instrumentation.tracing import trace_functions
 
 
 def insert_new_user(name, email, password1, password2, type):
@@ -70,6 +66,7 @@ def get_user_login(email, password):
     user = User.query.filter(User.email == email, User.password == password).first()
     return user
   
+@read_only
 def get_user_name_by_uid(uid):
     """
     Get the user's name by the given uid
@@ -103,6 +100,7 @@ def update_type(uid, type):
         user.type = type
         db.session.commit()
 
+@read_only
 def get_user(uid):
     """
     Get a dictionary contains uid, name and email by the given uid
@@ -123,3 +121,6 @@ def get_user(uid):
         }
         return dict
     return None
+
+
+trace_functions(__name__)
@@ -30,7 +30,8 @@ CREATE TABLE IF NOT EXISTS `points` (
   `uid`          int               NOT NULL,
   `rid`          int               NOT NULL,
   `points`       int               NOT NULL,
-  PRIMARY KEY (`pid`)
+  PRIMARY KEY (`pid`),
+  KEY `ix_points_uid_rid` (`uid`, `rid`)
 );
 CREATE TABLE IF NOT EXISTS `employee` (
   `uid`          int               NOT NULL,
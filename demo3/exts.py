@@ -1,3 +1,340 @@
-from flask_sqlalchemy import SQLAlchemy
+import inspect
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
 
-db = SQLAlchemy()
+from flask import (Response, before_render_template, current_app, g, has_app_context, has_request_context,
+                   render_template, session, stream_with_context, template_rendered)
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from jinja2 import FileSystemBytecodeCache, Markup
+from sqlalchemy import orm
+from sqlalchemy.sql.dml import UpdateBase
+
+# Key in the flask session remembering when a user last wrote to the primary,
+# so their reads stay on the primary until the replicas have caught up.
+LAST_WRITE_KEY = '_db_last_write'
+
+# Rows fetched at a time by the helpers streaming a table to a page
+STREAM_BATCH_SIZE = 500
+
+# Written by base.html where the page header ends, streamed pages send
+# everything before it at once
+STREAM_FLUSH = '<!-- flush -->'
+
+_routing = threading.local()
+
+
+def read_only(f):
+    """
+    Marks a databaseHelpers function as read only.
+
+    Queries issued while a read only helper is running are routed to one of
+    the replica binds listed in SQLALCHEMY_REPLICA_BINDS, unless the current
+    session has already written to the primary. A generator helper is read
+    only while it computes each row, not while its caller uses the row.
+
+    Args:
+        f: The helper function to be marked.
+
+    Returns:
+        The wrapped helper function.
+    """
+    if inspect.isgeneratorfunction(f):
+        @wraps(f)
+        def generator(*args, **kwargs):
+            rows = f(*args, **kwargs)
+            try:
+                while True:
+                    _routing.depth = getattr(_routing, 'depth', 0) + 1
+                    try:
+                        row = next(rows)
+                    except StopIteration:
+                        return
+                    finally:
+                        _routing.depth -= 1
+                    yield row
+            finally:
+                rows.close()
+        generator.read_only = True
+        return generator
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        _routing.depth = getattr(_routing, 'depth', 0) + 1
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _routing.depth -= 1
+    wrapper.read_only = True
+    return wrapper
+
+
+def in_read_only():
+    """
+    Checks whether a read only helper is currently running on this thread.
+
+    Returns:
+        True if queries may be routed to a replica, False otherwise.
+    """
+    return getattr(_routing, 'depth', 0) > 0
+
+
+@contextmanager
+def rolled_back():
+    """
+    Runs the block inside a transaction that is always rolled back, so
+    helpers and routes that write leave the database as it was. Used by the
+    benchmarks and the test fixtures in conftest.py.
+
+    Sessions opened in the block, including the ones opened by requests, are
+    bound to the same connection. Their commits only end a nested transaction.
+    """
+    factory = db.session.session_factory
+    kw = dict(factory.kw)
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    db.session.remove()
+    factory.configure(bind=connection, binds={})
+    try:
+        yield
+    finally:
+        db.session.remove()
+        factory.kw.clear()
+        factory.kw.update(kw)
+        transaction.rollback()
+        connection.close()
+
+
+class RoutingSession(SignallingSession):
+    """
+    A session that sends read only queries to a replica bind and everything
+    else to the primary.
+
+    Once the session flushes or executes an UPDATE/DELETE/INSERT it is pinned
+    to the primary until it is removed at the end of the request, so a read
+    that follows a write always sees that write.
+    """
+
+    def __init__(self, db, **options):
+        self.pinned = False
+        SignallingSession.__init__(self, db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.pin_to_primary()
+        elif not self.pinned and in_read_only():
+            replica = self.get_replica()
+            if replica is not None:
+                return replica
+        return SignallingSession.get_bind(self, mapper, clause)
+
+    def pin_to_primary(self):
+        """
+        Sends every following query of this session to the primary and
+        remembers the write in the user's flask session.
+        """
+        self.pinned = True
+        if has_request_context():
+            session[LAST_WRITE_KEY] = time.time()
+
+    def get_replica(self):
+        """
+        Picks a replica engine for a read only query.
+
+        Returns:
+            A replica engine, or None if no replica is configured or the user
+            wrote to the primary less than REPLICATION_LAG_TOLERANCE seconds ago.
+        """
+        replicas = self.app.config.get('SQLALCHEMY_REPLICA_BINDS') or []
+        if not replicas:
+            return None
+        if has_request_context() and LAST_WRITE_KEY in session:
+            tolerance = self.app.config.get('REPLICATION_LAG_TOLERANCE', 0)
+            if time.time() - session[LAST_WRITE_KEY] < tolerance:
+                return None
+        state = self.app.extensions['sqlalchemy']
+        return state.db.get_engine(self.app, bind=random.choice(replicas))
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """
+    Flask-SQLAlchemy extension whose sessions split reads and writes between
+    the replica binds and the primary database.
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        """
+        Applies the app's DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING and
+        DB_POOL_CLASS settings to an engine that is about to be created for it.
+
+        SQLite engines keep the pool Flask-SQLAlchemy picks for them, since
+        they do not take a pool size.
+        """
+        SQLAlchemy.apply_driver_hacks(self, app, sa_url, options)
+        options['pool_pre_ping'] = app.config.get('DB_POOL_PRE_PING', False)
+        if sa_url.drivername.startswith('sqlite'):
+            return
+        if app.config.get('DB_POOL_SIZE') is not None:
+            options['pool_size'] = app.config['DB_POOL_SIZE']
+        if app.config.get('DB_MAX_OVERFLOW') is not None:
+            options['max_overflow'] = app.config['DB_MAX_OVERFLOW']
+        if app.config.get('DB_POOL_CLASS') is not None:
+            options['poolclass'] = app.config['DB_POOL_CLASS']
+
+    def dispose_engines(self, app):
+        """
+        Closes the pooled connections of every engine of an app and forgets
+        the engines, so they are created again with the app's current
+        settings the next time they are used.
+
+        Called in each gunicorn worker after the fork, since connections
+        opened by the master must not be shared between processes.
+        """
+        state = app.extensions['sqlalchemy']
+        for connector in state.connectors.values():
+            if connector._engine is not None:
+                connector._engine.dispose()
+        state.connectors.clear()
+
+
+db = RoutingSQLAlchemy()
+
+
+class TemplateCache(object):
+    """
+    Keeps compiled templates on disk and compiles every template up front.
+
+    Jinja compiles a template the first time a worker renders it. With
+    TEMPLATE_CACHE_DIR set, the compiled code is saved in that folder, so a
+    new or restarted worker loads it instead of compiling again. A template
+    whose source changed is compiled again.
+
+    warm() loads every template into the app, so no request compiles one.
+    gunicorn calls it in the master before forking, so the workers share
+    the loaded templates and only one process writes the cache files.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TEMPLATE_CACHE_DIR', None)
+        app.config.setdefault('STREAM_TEMPLATES', True)
+        app.config.setdefault('STREAM_CHUNK_SIZE', 16384)
+        folder = app.config['TEMPLATE_CACHE_DIR']
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+            app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(folder))
+
+    def warm(self, app):
+        """
+        Loads every template of the app, from the cache folder or by
+        compiling it.
+
+        Args:
+            app: The app whose templates are loaded.
+
+        Returns:
+            The number of templates and the seconds it took.
+        """
+        start = time.perf_counter()
+        names = app.jinja_env.list_templates(extensions=['html'])
+        for name in names:
+            app.jinja_env.get_template(name)
+        seconds = time.perf_counter() - start
+        app.logger.info("Loaded %d templates in %.1fms", len(names), seconds * 1000)
+        return len(names), seconds
+
+
+template_cache = TemplateCache()
+
+
+def stream_template(template_name, **context):
+    """
+    Renders a template while it is being sent, for pages listing rows that a
+    generator helper fetches a batch at a time.
+
+    The page header, everything before the STREAM_FLUSH marker of base.html,
+    is sent as soon as it is rendered. The rest is sent in chunks of about
+    STREAM_CHUNK_SIZE characters, so the rows are never all in memory. The
+    response headers, X-SQL-Queries included, are sent before the rows are
+    queried. The request's database connection and transaction are held
+    until the last chunk is sent, for as long as the client takes to
+    download the page.
+
+    The measurements that after_request hooks register with after_body are
+    taken after the last chunk, so they cover the rendering and the queries
+    of the rows.
+
+    Args:
+        template_name: The name of the template.
+        context: The variables of the template.
+
+    Returns:
+        A streamed response, or the rendered page when STREAM_TEMPLATES is off.
+    """
+    app = current_app._get_current_object()
+    if not app.config['STREAM_TEMPLATES']:
+        return render_template(template_name, **context)
+    template = app.jinja_env.get_or_select_template(template_name)
+    app.update_template_context(context)
+    context['stream_flush'] = Markup(STREAM_FLUSH)
+    size = app.config['STREAM_CHUNK_SIZE']
+    g.after_body = []
+
+    def generate():
+        try:
+            before_render_template.send(app, template=template, context=context)
+            chunk, length = [], 0
+            for piece in template.generate(context):
+                if STREAM_FLUSH in piece:
+                    head, _, piece = str.partition(piece, STREAM_FLUSH)
+                    chunk.append(head)
+                    yield ''.join(chunk)
+                    chunk, length = [], 0
+                chunk.append(piece)
+                length += len(piece)
+                if length >= size:
+                    yield ''.join(chunk)
+                    chunk, length = [], 0
+            yield ''.join(chunk)
+            template_rendered.send(app, template=template, context=context)
+        finally:
+            # Also when the client goes away before the end of the page. A response never read is
+            # closed when it is garbage collected, possibly once its app context is gone
+            if has_app_context():
+                for callback in g.pop('after_body', []):
+                    callback()
+
+    return Response(stream_with_context(generate()), mimetype='text/html')
+
+
+def after_body(response, callback):
+    """
+    Calls callback once the body of a response has been generated, for
+    after_request hooks measuring the whole request.
+
+    A response of stream_template is rendered while it is sent, after the
+    after_request hooks ran, so callback is called after its last chunk,
+    still in the request context. Any other response is already rendered and
+    callback is called at once.
+
+    Args:
+        response: The response the after_request hook was given.
+        callback: A function called without arguments.
+
+    Returns:
+        None.
+    """
+    if response.is_streamed and g.get('after_body') is not None:
+        g.after_body.append(callback)
+    else:
+        callback()
+    return None
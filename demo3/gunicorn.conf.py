@@ -0,0 +1,67 @@
+# Gunicorn settings, read from the working directory when gunicorn starts.
+import gc
+import os
+import shutil
+import tempfile
+
+# Each worker writes its metrics to files in this directory, and /metrics
+# merges them. It has to be set before prometheus_client is imported, and
+# must start empty. The app is preloaded before on_starting runs, so it is
+# reset as soon as this file is read.
+metrics_dir = os.environ.setdefault('prometheus_multiproc_dir',
+                                    os.path.join(tempfile.gettempdir(), 'pickeasy-metrics'))
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir)
+
+# Workers
+# gthread workers serve `threads` requests at once each, so one slow page no
+# longer holds up every request queued behind it. GUNICORN_WORKER_CLASS=sync
+# restores one request at a time. gevent also works once gevent is installed
+# (and psycogreen on PostgreSQL): sessions, the query log and the replica
+# routing are all kept per thread, which gevent turns into per greenlet.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+# Workers are restarted after this many requests, give or take the jitter so
+# they do not all restart at once, which bounds slow memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+# The app is imported once by the master and the workers share its memory
+# until they write to it
+preload_app = True
+
+
+def when_ready(server):
+    # Workers start with every template and view loaded
+    if server.cfg.preload_app:
+        from exts import template_cache
+        from routes.urls import load_views
+        template_cache.warm(server.app.wsgi())
+        load_views(server.app.wsgi())
+    # Objects the master loaded are moved out of the collector's reach. The
+    # collector writes to every object it scans, which would copy the shared
+    # pages into each worker.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from exts import db, template_cache
+    app = worker.app.wsgi()
+    if not server.cfg.preload_app:
+        template_cache.warm(app)
+    # Every thread may hold a connection, gevent's greenlets wait for one
+    if worker_class == 'gthread':
+        pool_size = app.config.get('DB_POOL_SIZE') or 0
+        if pool_size + (app.config.get('DB_MAX_OVERFLOW') or 0) < threads:
+            app.config['DB_POOL_SIZE'] = threads
+    db.dispose_engines(app)
+
+
+def child_exit(server, worker):
+    # Live gauges of a dead worker must not be summed anymore
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
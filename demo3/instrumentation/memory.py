@@ -0,0 +1,238 @@
+import linecache
+import os
+import threading
+import tracemalloc
+from collections import deque
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from prometheus_client import Histogram
+
+from exts import after_body, db
+
+REQUEST_PEAK_MEMORY = Histogram('pickeasy_request_peak_bytes', 'Peak memory allocated while handling a request',
+                                ['endpoint'], buckets=(2 ** 16, 2 ** 18, 2 ** 20, 2 ** 22, 2 ** 24, 2 ** 26, 2 ** 28))
+
+# Allocations made by tracemalloc itself and the import machinery are noise
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_local = threading.local()
+_lock = threading.Lock()
+_baseline = {}
+routes = {}
+
+
+class RouteMemory(object):
+    """
+    The peak memory of the recent requests of one endpoint, with the number
+    of ORM objects each of them loaded.
+    """
+
+    def __init__(self, size):
+        self.count = 0
+        self.max_peak = 0
+        self.samples = deque(maxlen=size)
+
+    def add(self, objects, peak):
+        self.count += 1
+        self.max_peak = max(self.max_peak, peak)
+        self.samples.append((objects, peak))
+
+    @property
+    def mean_peak(self):
+        return sum(p for o, p in self.samples) / len(self.samples) if self.samples else 0
+
+    @property
+    def max_objects(self):
+        return max(o for o, p in self.samples) if self.samples else 0
+
+    def correlation(self):
+        """
+        The correlation between the objects loaded and the peak memory of the
+        recent requests, None when either of them never changed.
+        """
+        n = len(self.samples)
+        if n < 2:
+            return None
+        mean_o = sum(o for o, p in self.samples) / n
+        mean_p = self.mean_peak
+        covariance = sum((o - mean_o) * (p - mean_p) for o, p in self.samples)
+        spread_o = sum((o - mean_o) ** 2 for o, p in self.samples)
+        spread_p = sum((p - mean_p) ** 2 for o, p in self.samples)
+        if not spread_o or not spread_p:
+            return None
+        return covariance / (spread_o * spread_p) ** 0.5
+
+    def grows(self, min_samples, threshold):
+        """
+        Whether the endpoint's memory grows with the data it loads, i.e. its
+        peak follows the number of objects loaded over at least min_samples
+        requests.
+        """
+        correlation = self.correlation()
+        return len(self.samples) >= min_samples and correlation is not None and correlation >= threshold
+
+
+def start_tracing(frames=1):
+    """
+    Starts tracemalloc, keeping frames frames of traceback per allocation.
+    More frames show more of the caller but cost more memory and time.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing():
+    """
+    Stops tracemalloc and forgets its traces and the baseline snapshot.
+    """
+    tracemalloc.stop()
+    _baseline.clear()
+
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+
+def save_baseline():
+    """
+    Takes the snapshot diff_allocations compares to.
+    """
+    _baseline['snapshot'] = take_snapshot()
+
+
+def describe(stat):
+    frame = stat.traceback[0]
+    return {
+        'site': "%s:%d" % (os.path.relpath(frame.filename) if frame.filename.startswith(os.getcwd())
+                           else frame.filename, frame.lineno),
+        'line': linecache.getline(frame.filename, frame.lineno).strip(),
+    }
+
+
+def top_allocations(limit=20):
+    """
+    Finds the lines holding the most memory.
+
+    Returns:
+        A list of dicts with the site, source line, size in bytes and number
+        of blocks, biggest first. Empty if tracemalloc is not tracing.
+    """
+    if not tracemalloc.is_tracing():
+        return []
+    return [dict(describe(s), size=s.size, count=s.count)
+            for s in take_snapshot().statistics('lineno')[:limit]]
+
+
+def diff_allocations(limit=20):
+    """
+    Compares the memory held by each line to the baseline snapshot.
+
+    Returns:
+        A list of dicts with the site, source line, size and number of blocks
+        and their change since the baseline, biggest growth first. Empty if
+        there is no baseline.
+    """
+    if not tracemalloc.is_tracing() or 'snapshot' not in _baseline:
+        return []
+    stats = take_snapshot().compare_to(_baseline['snapshot'], 'lineno')
+    return [dict(describe(s), size=s.size, count=s.count, size_diff=s.size_diff, count_diff=s.count_diff)
+            for s in stats[:limit]]
+
+
+def route_report():
+    """
+    Summarizes the peak memory of each endpoint of the current app.
+
+    Returns:
+        A list of dicts with the endpoint, its number of requests, their mean
+        and max peak in bytes, the most objects one of them loaded, the
+        correlation between objects and peak and whether it grows with data,
+        biggest max peak first.
+    """
+    config = current_app.config
+    with _lock:
+        items = list(routes.items())
+    report = []
+    for endpoint, memory in items:
+        correlation = memory.correlation()
+        report.append({'endpoint': endpoint, 'count': memory.count, 'mean_peak': int(memory.mean_peak),
+                       'max_peak': memory.max_peak, 'max_objects': memory.max_objects,
+                       'correlation': None if correlation is None else round(correlation, 2),
+                       'grows': memory.grows(config['MEMORY_MIN_SAMPLES'], config['MEMORY_GROWTH_CORRELATION'])})
+    return sorted(report, key=lambda r: r['max_peak'], reverse=True)
+
+
+@event.listens_for(db.Model, 'load', propagate=True)
+def count_loaded(target, context):
+    if getattr(_local, 'objects', None) is not None:
+        _local.objects += 1
+
+
+class MemoryTracker(object):
+    """
+    Records the peak memory of every request while tracemalloc is tracing,
+    with the number of ORM objects the request loaded.
+
+    Tracing starts with the app when MEMORY_TRACK_ROUTES is set, or from the
+    /adminMemory page. An endpoint whose peak follows the number of objects
+    it loads, with a correlation of at least MEMORY_GROWTH_CORRELATION over
+    MEMORY_MIN_SAMPLES requests, is flagged as growing with data.
+
+    The peak is process wide, so it is only exact when a worker handles one
+    request at a time. Run gunicorn with GUNICORN_WORKER_CLASS=sync while
+    measuring, threaded workers add up the peaks of concurrent requests.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MEMORY_TRACK_ROUTES', False)
+        app.config.setdefault('MEMORY_TRACE_FRAMES', 1)
+        app.config.setdefault('MEMORY_SAMPLES', 100)
+        app.config.setdefault('MEMORY_MIN_SAMPLES', 5)
+        app.config.setdefault('MEMORY_GROWTH_CORRELATION', 0.8)
+        if app.config['MEMORY_TRACK_ROUTES']:
+            start_tracing(app.config['MEMORY_TRACE_FRAMES'])
+        app.before_request(self.start)
+        app.after_request(self.record)
+        app.teardown_request(self.stop)
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            return
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        g.memory_start = tracemalloc.get_traced_memory()[0]
+        _local.objects = 0
+
+    def stop(self, exception=None):
+        _local.objects = None
+
+    def record(self, response):
+        if 'memory_start' in g:
+            after_body(response, self.observe)
+        return response
+
+    def observe(self):
+        if not tracemalloc.is_tracing():
+            return
+        # reset_peak only exists from Python 3.9, before that the peak is the growth since the request started
+        peak = max(tracemalloc.get_traced_memory()[1 if hasattr(tracemalloc, 'reset_peak') else 0]
+                   - g.memory_start, 0)
+        endpoint = request.endpoint or 'none'
+        REQUEST_PEAK_MEMORY.labels(endpoint).observe(peak)
+        with _lock:
+            if endpoint not in routes:
+                routes[endpoint] = RouteMemory(current_app.config['MEMORY_SAMPLES'])
+            routes[endpoint].add(_local.objects or 0, peak)
+
+
+memory_tracker = MemoryTracker()
@@ -0,0 +1,158 @@
+import os
+import time
+
+from flask import before_render_template, g, request, template_rendered
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, \
+    CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
+from sqlalchemy.pool import QueuePool
+
+from exts import after_body
+
+# Buckets of the latency histograms, in seconds
+LATENCY_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram('pickeasy_request_seconds', 'Time spent handling a request',
+                            ['blueprint', 'endpoint', 'method'], buckets=LATENCY_BUCKETS)
+REQUESTS = Counter('pickeasy_requests_total', 'Requests handled', ['blueprint', 'endpoint', 'method', 'status'])
+REQUEST_DB_TIME = Histogram('pickeasy_request_db_seconds', 'Time a request spent waiting for the database',
+                            ['blueprint', 'endpoint'], buckets=LATENCY_BUCKETS)
+REQUEST_RENDER_TIME = Histogram('pickeasy_request_render_seconds', 'Time a request spent rendering templates',
+                                ['blueprint', 'endpoint'], buckets=LATENCY_BUCKETS)
+POOL_CHECKOUT_WAIT = Histogram('pickeasy_db_pool_checkout_seconds', 'Time spent waiting for a pooled connection',
+                               buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1.0, 5.0, 30.0))
+POOL_CHECKED_OUT = Gauge('pickeasy_db_pool_checked_out', 'Connections currently checked out of the pool',
+                         multiprocess_mode='livesum')
+CACHE_REQUESTS = Counter('pickeasy_cache_requests_total', 'Cache lookups', ['cache', 'result'])
+SCANS = Counter('pickeasy_scans_total', 'QR codes scanned by staff', ['type', 'result'])
+PURCHASES = Counter('pickeasy_coupon_purchases_total', 'Coupons bought by customers', ['result'])
+
+
+class TimedQueuePool(QueuePool):
+    """
+    A QueuePool that records how long each checkout waited for a connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return QueuePool._do_get(self)
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+            POOL_CHECKED_OUT.set(self.checkedout())
+
+    def _do_return_conn(self, conn):
+        QueuePool._do_return_conn(self, conn)
+        POOL_CHECKED_OUT.set(self.checkedout())
+
+
+def count_cache(cache, hit):
+    """
+    Counts a cache lookup, the hit ratio of a cache being its hits over all
+    its lookups.
+
+    Args:
+        cache: The name of the cache. A string.
+        hit: True if the value was found in the cache.
+    """
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def count_scan(type, result):
+    """
+    Counts a coupon or achievement QR code scan.
+
+    Args:
+        type: 'coupon' or 'achievement'.
+        result: 'success', 'failure', 'forbidden' or 'nonexistent'.
+    """
+    SCANS.labels(type, result).inc()
+
+
+def count_purchase(result):
+    """
+    Counts a coupon purchase attempt.
+
+    Args:
+        result: 'success', 'points' or 'level', the last two being the
+          requirement the customer did not meet.
+    """
+    PURCHASES.labels(result).inc()
+
+
+def get_registry():
+    """
+    Gets the registry to export.
+
+    When prometheus_multiproc_dir is set, as it is by gunicorn.conf.py, every
+    worker writes its metrics to files in that directory and the registry
+    merges them, so any worker can answer a scrape for all of them.
+
+    Returns:
+        A prometheus_client CollectorRegistry.
+    """
+    if 'prometheus_multiproc_dir' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def export():
+    """
+    Renders every metric in the Prometheus text format.
+
+    Returns:
+        A (body, content type) tuple.
+    """
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
+
+
+class Metrics(object):
+    """
+    Records the latency of every request, split between the database and
+    template rendering, labeled by blueprint and endpoint.
+
+    The database time comes from the request's QueryLog, so the QueryTracker
+    must be registered as well.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DB_POOL_CLASS', TimedQueuePool)
+        app.before_request(self.start)
+        app.after_request(self.record)
+        before_render_template.connect(self.start_render, app)
+        template_rendered.connect(self.stop_render, app)
+
+    def start(self):
+        g.metrics_start = time.perf_counter()
+        g.render_time = 0.0
+
+    def start_render(self, sender, template, context, **extra):
+        g.render_start = time.perf_counter()
+
+    def stop_render(self, sender, template, context, **extra):
+        if 'render_start' in g:
+            g.render_time = g.get('render_time', 0.0) + time.perf_counter() - g.pop('render_start')
+
+    def record(self, response):
+        if 'metrics_start' in g:
+            after_body(response, lambda: self.observe(response))
+        return response
+
+    def observe(self, response):
+        blueprint = request.blueprint or ''
+        endpoint = request.endpoint or 'none'
+        REQUEST_LATENCY.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - g.metrics_start)
+        REQUESTS.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+        REQUEST_RENDER_TIME.labels(blueprint, endpoint).observe(g.get('render_time', 0.0))
+        log = g.get('query_log')
+        if log is not None:
+            REQUEST_DB_TIME.labels(blueprint, endpoint).observe(log.duration)
+
+
+metrics = Metrics()
@@ -0,0 +1,240 @@
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, request
+
+from exts import after_body
+
+# Header a developer sends to profile one request, see make_token
+TOKEN_HEADER = 'X-Profile-Token'
+
+
+def make_token(secret, ttl=300):
+    """
+    Makes a token that turns on profiling for the requests that send it in
+    the X-Profile-Token header, until it expires.
+
+    Args:
+        secret: The app's SECRET_KEY.
+        ttl: The number of seconds the token stays valid.
+
+    Returns:
+        A string made of the expiry time and its HMAC signature.
+    """
+    expires = str(int(time.time() + ttl))
+    signature = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return expires + '.' + signature
+
+
+def check_token(secret, token):
+    """
+    Checks a token made by make_token.
+
+    Returns:
+        True if the token is signed with secret and has not expired.
+    """
+    expires, _, signature = (token or '').partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def collapse(frame):
+    """
+    Turns a stack into the collapsed format read by flame graph tools,
+    outermost call first, e.g. "app.py:wsgi_app;routes/home.py:home".
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append("%s:%s" % (os.path.relpath(code.co_filename) if code.co_filename.startswith(os.getcwd())
+                                else os.path.basename(code.co_filename), code.co_name))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler(threading.Thread):
+    """
+    A background thread that records the stack of every thread being
+    profiled every interval seconds.
+
+    Only the threads handling a profiled request are looked at, so the cost
+    of the thread is nothing while no request is profiled.
+    """
+
+    def __init__(self, interval):
+        threading.Thread.__init__(self, name='profiler', daemon=True)
+        self.interval = interval
+        self.profiled = {}
+        self.lock = threading.Lock()
+
+    def add(self, thread_id):
+        stacks = Counter()
+        with self.lock:
+            self.profiled[thread_id] = stacks
+        return stacks
+
+    def remove(self, thread_id):
+        with self.lock:
+            self.profiled.pop(thread_id, None)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                profiled = list(self.profiled.items())
+            if not profiled:
+                continue
+            frames = sys._current_frames()
+            for thread_id, stacks in profiled:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks[collapse(frame)] += 1
+
+
+def list_captures(folder):
+    """
+    Lists the requests profiled into a folder, most recent first.
+
+    Returns:
+        A list of the dicts saved with each capture.
+    """
+    if not os.path.isdir(folder):
+        return []
+    captures = []
+    for name in sorted(os.listdir(folder), reverse=True):
+        if name.endswith('.json'):
+            with open(os.path.join(folder, name)) as f:
+                captures.append(json.load(f))
+    return captures
+
+
+class Profiler(object):
+    """
+    Profiles requests with a statistical sampler.
+
+    A request is profiled when it sends a valid X-Profile-Token header, when
+    it is picked at random with probability PROFILER_SAMPLE_RATE, or when it
+    takes longer than PROFILER_SLOW_THRESHOLD seconds. Setting the threshold
+    samples every request and only keeps the slow ones.
+
+    Each capture is written to PROFILER_DIR as NAME.collapsed, the stacks in
+    the collapsed format flamegraph.pl and speedscope read, and NAME.json with
+    the request and its SQL timeline. Only the newest PROFILER_KEEP captures
+    are kept.
+    """
+
+    def __init__(self, app=None):
+        self.sampler = None
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILER_DIR', 'profiles')
+        app.config.setdefault('PROFILER_SAMPLE_RATE', 0.0)
+        app.config.setdefault('PROFILER_SLOW_THRESHOLD', None)
+        app.config.setdefault('PROFILER_INTERVAL', 0.005)
+        app.config.setdefault('PROFILER_KEEP', 100)
+        app.before_request(self.start)
+        app.after_request(self.stop)
+        app.teardown_request(self.discard)
+
+    def get_sampler(self, interval):
+        # Threaded workers may profile their first requests at the same time
+        with self.lock:
+            if self.sampler is None:
+                self.sampler = Sampler(interval)
+                self.sampler.start()
+            return self.sampler
+
+    def get_trigger(self):
+        """
+        Decides whether the current request is profiled.
+
+        Returns:
+            'token', 'sampled' or 'slow', None if it is not profiled.
+        """
+        config = current_app.config
+        token = request.headers.get(TOKEN_HEADER)
+        if token and check_token(config['SECRET_KEY'], token):
+            return 'token'
+        if config['PROFILER_SAMPLE_RATE'] and random.random() < config['PROFILER_SAMPLE_RATE']:
+            return 'sampled'
+        if config['PROFILER_SLOW_THRESHOLD'] is not None:
+            return 'slow'
+        return None
+
+    def start(self):
+        trigger = self.get_trigger()
+        if trigger is None:
+            return
+        sampler = self.get_sampler(current_app.config['PROFILER_INTERVAL'])
+        g.profile = {'trigger': trigger, 'thread': threading.get_ident(), 'started': time.perf_counter(),
+                     'stacks': sampler.add(threading.get_ident())}
+
+    def discard(self, exception=None):
+        profile = g.pop('profile', None)
+        if profile is not None and self.sampler is not None:
+            self.sampler.remove(profile['thread'])
+
+    def stop(self, response):
+        profile = g.get('profile')
+        if profile is not None:
+            after_body(response, lambda: self.finish(profile, response))
+        return response
+
+    def finish(self, profile, response):
+        self.sampler.remove(profile['thread'])
+        duration = time.perf_counter() - profile['started']
+        threshold = current_app.config['PROFILER_SLOW_THRESHOLD']
+        if profile['trigger'] == 'slow' and duration < threshold:
+            return
+        self.save(profile, duration, response)
+
+    def save(self, profile, duration, response):
+        """
+        Writes a capture and removes the oldest ones.
+        """
+        folder = current_app.config['PROFILER_DIR']
+        os.makedirs(folder, exist_ok=True)
+        name = "%s-%s-%d" % (datetime.now().strftime('%Y%m%d%H%M%S%f'), request.endpoint or 'none', os.getpid())
+        with open(os.path.join(folder, name + '.collapsed'), 'w') as f:
+            for stack, count in profile['stacks'].most_common():
+                f.write("%s %d\n" % (stack, count))
+        log = g.get('query_log')
+        queries = []
+        if log is not None:
+            queries = [{'offset': round((q[3] - profile['started']) * 1000, 3), 'duration': round(q[2] * 1000, 3),
+                        'statement': ' '.join(q[0].split())} for q in log.queries]
+        capture = {
+            'name': name,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'trigger': profile['trigger'],
+            'duration': round(duration * 1000, 3),
+            'samples': sum(profile['stacks'].values()),
+            'queries': queries,
+        }
+        with open(os.path.join(folder, name + '.json'), 'w') as f:
+            json.dump(capture, f, indent=2)
+        for old in list_captures(folder)[current_app.config['PROFILER_KEEP']:]:
+            for extension in ('.json', '.collapsed'):
+                path = os.path.join(folder, old['name'] + extension)
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+profiler = Profiler()
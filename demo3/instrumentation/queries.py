@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from exts import after_body
+
+_active = threading.local()
+
+
+class QueryLog(object):
+    """
+    The statements sent to the database while the log is active.
+
+    Each entry is a (statement, parameters, seconds, started) tuple, started
+    being the time.perf_counter() value when the statement was sent.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        """
+        The total time spent in the database, in seconds.
+        """
+        return sum(q[2] for q in self.queries)
+
+    def n_plus_one(self, threshold):
+        """
+        Finds the statements repeated with different parameters, usually one
+        query per row of an earlier result.
+
+        Args:
+            threshold: The number of executions from which a statement is
+                reported.
+
+        Returns:
+            A list of (statement, executions) tuples, most executed first.
+        """
+        shapes = OrderedDict()
+        for query in self.queries:
+            shapes.setdefault(query[0], []).append(repr(query[1]))
+        repeated = [(s, len(p)) for s, p in shapes.items() if len(p) >= threshold and len(set(p)) > 1]
+        return sorted(repeated, key=lambda r: r[1], reverse=True)
+
+
+def active_logs():
+    if not hasattr(_active, 'logs'):
+        _active.logs = []
+    return _active.logs
+
+
+@contextmanager
+def count_queries():
+    """
+    Records the statements sent to any engine by this thread inside the block.
+
+    Example:
+        with count_queries() as log:
+            get_employees(1)
+        assert log.count <= 2
+
+    Returns:
+        The QueryLog of the block.
+    """
+    log = QueryLog()
+    active_logs().append(log)
+    try:
+        yield log
+    finally:
+        active_logs().remove(log)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if active_logs():
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    logs = active_logs()
+    if not logs or not conn.info.get('query_start'):
+        return
+    started = conn.info['query_start'].pop()
+    seconds = time.perf_counter() - started
+    for log in logs:
+        log.queries.append((statement, parameters, seconds, started))
+
+
+class QueryTracker(object):
+    """
+    Counts the statements and database time of every request.
+
+    The numbers are logged after each request, and added to the response as
+    X-SQL-Queries, X-SQL-Time and X-SQL-N-Plus-One headers when
+    SQL_QUERY_HEADERS is set (it follows DEBUG by default). Statements run at
+    least SQL_N_PLUS_ONE_THRESHOLD times with different parameters are logged
+    as warnings.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_QUERY_HEADERS', None)
+        app.config.setdefault('SQL_N_PLUS_ONE_THRESHOLD', 5)
+        app.before_request(self.start)
+        app.after_request(self.report)
+        app.teardown_request(self.stop)
+
+    def start(self):
+        g.query_log = QueryLog()
+        active_logs().append(g.query_log)
+
+    def stop(self, exception=None):
+        log = g.pop('query_log', None)
+        if log in active_logs():
+            active_logs().remove(log)
+
+    def report(self, response):
+        log = g.get('query_log')
+        if log is None:
+            return response
+        threshold = current_app.config['SQL_N_PLUS_ONE_THRESHOLD']
+        headers = current_app.config['SQL_QUERY_HEADERS']
+        if headers is None:
+            headers = current_app.debug
+        if headers:
+            # The headers of a streamed page go out before its rows are queried
+            response.headers['X-SQL-Queries'] = str(log.count)
+            response.headers['X-SQL-Time'] = "%.3f" % (log.duration * 1000)
+            response.headers['X-SQL-N-Plus-One'] = str(len(log.n_plus_one(threshold)))
+        after_body(response, lambda: self.log(log, threshold))
+        return response
+
+    def log(self, log, threshold):
+        """
+        Logs the statements of the request, and warns about N+1 patterns.
+        """
+        current_app.logger.debug("%s %s: %d queries in %.1fms", request.method, request.path,
+                                 log.count, log.duration * 1000)
+        for statement, executions in log.n_plus_one(threshold):
+            current_app.logger.warning("Possible N+1 on %s %s (%s): %d executions of %s", request.method,
+                                       request.path, request.endpoint, executions, " ".join(statement.split()))
+
+
+query_tracker = QueryTracker()
@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Folder of the helpers a slow statement is blamed on
+HELPERS_FOLDER = os.sep + 'databaseHelpers' + os.sep
+
+# Literals and bind parameters of every paramstyle, replaced by ? in shapes
+LITERALS = re.compile(r"'(?:[^']|'')*'|%\(\w+\)s|%s|:\w+|\$\d+|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize(statement):
+    """
+    Reduces a statement to its shape, so the same query run with different
+    parameters or IN lists of different lengths is grouped together.
+
+    Example:
+        normalize("SELECT * FROM user WHERE uid IN (?, ?, ?) AND type = 1")
+        returns "SELECT * FROM user WHERE uid IN (?...) AND type = ?"
+
+    Returns:
+        The statement without literals, parameters and repeated whitespace.
+    """
+    shape = LITERALS.sub('?', ' '.join(statement.split()))
+    return IN_LISTS.sub('(?...)', shape)
+
+
+def find_caller():
+    """
+    Finds the databaseHelpers function that sent the current statement.
+
+    Returns:
+        A "module.function" string, None if the statement did not come from
+        a helper.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if HELPERS_FOLDER in filename:
+            return "%s.%s" % (os.path.splitext(os.path.basename(filename))[0], frame.f_code.co_name)
+        frame = frame.f_back
+    return None
+
+
+def explain(engine, statement, parameters, connection=None):
+    """
+    Gets the plan of a SELECT statement, with EXPLAIN QUERY PLAN on SQLite and
+    EXPLAIN anywhere else.
+
+    The plan is read through a DBAPI cursor, so it is not seen by the engine's
+    listeners. By default it runs on a connection of its own from the
+    engine's pool: a failed EXPLAIN aborts the transaction it runs in on
+    PostgreSQL, which must not be the transaction of the statement.
+
+    Args:
+        engine: The engine the statement was sent to.
+        statement: The statement to explain.
+        parameters: The statement's parameters.
+        connection: A DBAPI connection to run EXPLAIN on instead.
+
+    Returns:
+        A list of rows, each a list of strings, or an error message.
+    """
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    own = connection is None
+    try:
+        if own:
+            connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters)
+                return [[str(value) for value in row] for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        finally:
+            if own:
+                # Rolled back as it goes back to the pool
+                connection.close()
+    except Exception as e:
+        return "EXPLAIN failed: %s" % e
+
+
+def read_entries(path):
+    """
+    Reads the slow query log and its rotated files, oldest first.
+
+    Returns:
+        A generator of the logged dicts.
+    """
+    paths = [path + '.' + str(i) for i in range(1, 100) if os.path.exists(path + '.' + str(i))]
+    paths = list(reversed(paths)) + ([path] if os.path.exists(path) else [])
+    for name in paths:
+        with open(name) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def report(path):
+    """
+    Groups the slow query log by statement shape.
+
+    Returns:
+        A list of dicts with the shape, its number of slow executions, their
+        total, mean and max duration in ms, the helpers and endpoints that
+        sent it and the plan of its slowest execution, slowest total first.
+    """
+    groups = {}
+    for entry in read_entries(path):
+        group = groups.setdefault(entry['shape'], {'shape': entry['shape'], 'count': 0, 'total': 0.0, 'max': 0.0,
+                                                   'callers': set(), 'endpoints': set(), 'plan': None})
+        group['count'] += 1
+        group['total'] += entry['duration']
+        if entry['duration'] >= group['max']:
+            group['max'] = entry['duration']
+            group['plan'] = entry.get('plan')
+        if entry.get('caller'):
+            group['callers'].add(entry['caller'])
+        if entry.get('endpoint'):
+            group['endpoints'].add(entry['endpoint'])
+    for group in groups.values():
+        group['mean'] = round(group['total'] / group['count'], 3)
+        group['total'] = round(group['total'], 3)
+        group['callers'] = sorted(group['callers'])
+        group['endpoints'] = sorted(group['endpoints'])
+    return sorted(groups.values(), key=lambda g: g['total'], reverse=True)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and current_app.config.get('SLOW_QUERY_THRESHOLD') is not None:
+        conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not conn.info.get('slow_query_start') or not has_app_context():
+        return
+    seconds = time.perf_counter() - conn.info['slow_query_start'].pop()
+    threshold = current_app.config.get('SLOW_QUERY_THRESHOLD')
+    if threshold is not None and seconds >= threshold:
+        slow_query_log.record(conn, statement, parameters, seconds, executemany)
+
+
+class SlowQueryLog(object):
+    """
+    Logs every statement slower than SLOW_QUERY_THRESHOLD seconds to the
+    SLOW_QUERY_LOG file, one JSON object per line, with its parameters, the
+    databaseHelpers function and the endpoint that sent it and, for SELECTs
+    when SLOW_QUERY_EXPLAIN is set, its plan.
+
+    The file is rotated after SLOW_QUERY_LOG_BYTES, keeping
+    SLOW_QUERY_LOG_BACKUPS old files. Rotation is not coordinated between
+    processes, so give each worker its own file when several write to it.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_THRESHOLD', None)
+        app.config.setdefault('SLOW_QUERY_EXPLAIN', True)
+        app.config.setdefault('SLOW_QUERY_LOG', 'slow_queries.jsonl')
+        app.config.setdefault('SLOW_QUERY_LOG_BYTES', 10 * 1024 * 1024)
+        app.config.setdefault('SLOW_QUERY_LOG_BACKUPS', 5)
+        app.extensions['slow_query_log'] = None
+        app.after_request(self.write_after_response)
+
+    def get_handler(self, app):
+        """
+        Opens the app's log file the first time it logs a statement.
+        """
+        if app.extensions.get('slow_query_log') is None:
+            app.extensions['slow_query_log'] = RotatingFileHandler(
+                app.config['SLOW_QUERY_LOG'], maxBytes=app.config['SLOW_QUERY_LOG_BYTES'],
+                backupCount=app.config['SLOW_QUERY_LOG_BACKUPS'], delay=True)
+        return app.extensions['slow_query_log']
+
+    def record(self, conn, statement, parameters, seconds, executemany):
+        """
+        Logs a slow statement. During a request it is logged once the response
+        is sent, so neither EXPLAIN nor the file slow the request down.
+        """
+        entry = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'duration': round(seconds * 1000, 3),
+            'statement': ' '.join(statement.split()),
+            'shape': normalize(statement),
+            'parameters': parameters,
+            'caller': find_caller(),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'path': request.path if has_request_context() else None,
+        }
+        plan = (current_app.config['SLOW_QUERY_EXPLAIN'] and not executemany
+                and entry['statement'].upper().startswith('SELECT'))
+        query = (conn.engine, statement, parameters, entry, plan)
+        if has_request_context():
+            g.setdefault('slow_queries', []).append(query)
+        elif plan and conn.dialect.name == 'sqlite':
+            # A failed statement leaves a SQLite transaction open, and the pool of an in-memory
+            # database hands out this same connection
+            self.write(current_app._get_current_object(), *query, connection=conn.connection)
+        else:
+            self.write(current_app._get_current_object(), *query)
+
+    def write_after_response(self, response):
+        # The list is shared, the statements of a streamed response are added to it while it is sent
+        queries = g.setdefault('slow_queries', [])
+        app = current_app._get_current_object()
+
+        def write_queries():
+            for query in queries:
+                self.write(app, *query)
+        response.call_on_close(write_queries)
+        return response
+
+    def write(self, app, engine, statement, parameters, entry, plan, connection=None):
+        """
+        Adds a statement to the app's log file, with its plan if plan is set.
+        """
+        if plan:
+            entry['plan'] = explain(engine, statement, parameters, connection)
+        self.get_handler(app).handle(logging.makeLogRecord({'msg': json.dumps(entry, default=str)}))
+
+
+slow_query_log = SlowQueryLog()
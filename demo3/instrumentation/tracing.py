@@ -0,0 +1,223 @@
+import inspect
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+from flask import before_render_template, current_app, g, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from instrumentation.slowQueries import normalize
+
+_local = threading.local()
+
+
+class Trace(object):
+    """
+    The spans of one traced request or block, as Chrome trace events.
+
+    Spans opened while another span is open are its children. Viewers such
+    as chrome://tracing, Perfetto and speedscope nest them by time, and each
+    event also names its parent in its args.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.stack = []
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+
+    def begin(self, name, category, args=None):
+        span = {'name': name, 'cat': category, 'ph': 'X', 'pid': self.pid, 'tid': self.tid,
+                'start': time.perf_counter(),
+                'args': dict(args or {}, id=len(self.events) + len(self.stack) + 1,
+                             parent=self.stack[-1]['args']['id'] if self.stack else None)}
+        self.stack.append(span)
+        return span
+
+    def end(self, span):
+        if not any(s is span for s in self.stack):
+            return
+        # Spans left open by an exception inside span are closed with it
+        while self.stack:
+            top = self.stack.pop()
+            top['ts'] = round((top['start'] - self.origin) * 1e6, 3)
+            top['dur'] = round((time.perf_counter() - top.pop('start')) * 1e6, 3)
+            self.events.append(top)
+            if top is span:
+                break
+
+    def save(self, path):
+        """
+        Writes the trace in the Chrome trace event format.
+        """
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': sorted(self.events, key=lambda e: e['ts']), 'displayTimeUnit': 'ms'}, f)
+
+
+def current_trace():
+    """
+    Gets the trace recording on this thread.
+
+    Returns:
+        The Trace, None if this thread is not traced.
+    """
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def tracing(path, name='trace'):
+    """
+    Traces the block and writes the trace to path, e.g. to trace a helper
+    outside of a request.
+
+    Example:
+        with tracing('add_one_progress_bar.json'):
+            add_one_progress_bar(aid, uid)
+    """
+    trace = Trace()
+    _local.trace = trace
+    span = trace.begin(name, 'block')
+    try:
+        yield trace
+    finally:
+        trace.end(span)
+        _local.trace = None
+        trace.save(path)
+
+
+def traced(f):
+    """
+    Opens a span named module.function around every call of f made while
+    the thread is traced. Untraced calls only pay for one attribute lookup.
+    A generator gets a span for each row it computes.
+    """
+    name = "%s.%s" % (f.__module__.rpartition('.')[2], f.__name__)
+
+    if inspect.isgeneratorfunction(f):
+        @wraps(f)
+        def generator(*args, **kwargs):
+            rows = f(*args, **kwargs)
+            try:
+                while True:
+                    trace = getattr(_local, 'trace', None)
+                    span = trace.begin(name, 'helper') if trace is not None else None
+                    try:
+                        row = next(rows)
+                    except StopIteration:
+                        return
+                    finally:
+                        if span is not None:
+                            trace.end(span)
+                    yield row
+            finally:
+                rows.close()
+        return generator
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        trace = getattr(_local, 'trace', None)
+        if trace is None:
+            return f(*args, **kwargs)
+        span = trace.begin(name, 'helper')
+        try:
+            return f(*args, **kwargs)
+        finally:
+            trace.end(span)
+    return wrapper
+
+
+def trace_functions(module_name):
+    """
+    Wraps every function defined in a module with traced. Called at the end
+    of each databaseHelpers module, so the modules importing its helpers get
+    the traced versions.
+
+    Args:
+        module_name: The __name__ of the module.
+    """
+    module = sys.modules[module_name]
+    for name, value in list(vars(module).items()):
+        if inspect.isfunction(value) and value.__module__ == module_name:
+            setattr(module, name, traced(value))
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        conn.info.setdefault('trace_spans', []).append(
+            trace.begin(normalize(statement)[:80], 'sql', {'statement': ' '.join(statement.split())}))
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = getattr(_local, 'trace', None)
+    if trace is not None and conn.info.get('trace_spans'):
+        trace.end(conn.info['trace_spans'].pop())
+
+
+class Tracer(object):
+    """
+    Traces a TRACE_SAMPLE_RATE share of requests, with a span for the
+    request, every databaseHelpers function, every SQL statement and every
+    template rendered.
+
+    Each trace is written to TRACE_DIR as a Chrome trace JSON file, only the
+    newest TRACE_KEEP are kept.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TRACE_SAMPLE_RATE', 0.0)
+        app.config.setdefault('TRACE_DIR', 'traces')
+        app.config.setdefault('TRACE_KEEP', 100)
+        app.before_request(self.start)
+        app.teardown_request(self.stop)
+        before_render_template.connect(self.start_render, app)
+        template_rendered.connect(self.stop_render, app)
+
+    def start(self):
+        rate = current_app.config['TRACE_SAMPLE_RATE']
+        if not rate or random.random() >= rate:
+            return
+        _local.trace = Trace()
+        g.trace_span = _local.trace.begin("%s %s" % (request.method, request.endpoint), 'route',
+                                          {'path': request.full_path.rstrip('?')})
+
+    def start_render(self, sender, template, context, **extra):
+        trace = current_trace()
+        if trace is not None:
+            g.render_span = trace.begin(template.name, 'template')
+
+    def stop_render(self, sender, template, context, **extra):
+        trace = current_trace()
+        if trace is not None and 'render_span' in g:
+            trace.end(g.pop('render_span'))
+
+    def stop(self, exception=None):
+        trace = current_trace()
+        _local.trace = None
+        span = g.pop('trace_span', None)
+        if trace is None or span is None:
+            return
+        trace.end(span)
+        folder = current_app.config['TRACE_DIR']
+        os.makedirs(folder, exist_ok=True)
+        name = "%s-%s-%d.json" % (datetime.now().strftime('%Y%m%d%H%M%S%f'), request.endpoint or 'none', os.getpid())
+        trace.save(os.path.join(folder, name))
+        for old in sorted(os.listdir(folder), reverse=True)[current_app.config['TRACE_KEEP']:]:
+            os.remove(os.path.join(folder, old))
+
+
+tracer = Tracer()
@@ -0,0 +1,90 @@
+###################################################
+#                                                 #
+#   An HTTP client that plays one simulated user  #
+#   and times each step of their journey.         #
+#                                                 #
+###################################################
+
+import threading
+import time
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, build_opener
+
+
+class NoRedirect(HTTPRedirectHandler):
+    """
+    Returns redirects instead of following them, so each request is timed
+    as its own step.
+    """
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Recorder(object):
+    """
+    Collects the measurements of every step, from every user thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.steps = {}
+
+    def add(self, name, seconds, queries, error):
+        with self.lock:
+            step = self.steps.setdefault(name, {'durations': [], 'queries': [], 'errors': 0})
+            step['durations'].append(seconds)
+            if queries is not None:
+                step['queries'].append(queries)
+            if error:
+                step['errors'] += 1
+
+
+class Client(object):
+    """
+    One simulated user, with their own cookies and so their own session.
+
+    Args:
+        url: The root URL of the app, e.g. http://127.0.0.1:5000.
+        journey: The name of the journey, the prefix of every step name.
+        recorder: The Recorder the steps are added to.
+    """
+
+    def __init__(self, url, journey, recorder, timeout=30):
+        self.url = url.rstrip('/')
+        self.journey = journey
+        self.recorder = recorder
+        self.timeout = timeout
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()), NoRedirect)
+
+    def step(self, name, path, data=None):
+        """
+        Sends a GET, or a POST of the form data when data is given, and
+        records how long it took.
+
+        A step fails when the request cannot be sent, the response is an
+        error, or the user is sent back to the login page.
+
+        Returns:
+            A (status, location, body) tuple, status being None when the
+            request could not be sent.
+        """
+        body = urlencode(data).encode() if data is not None else None
+        start = time.perf_counter()
+        try:
+            response = self.opener.open(self.url + path, body, timeout=self.timeout)
+        except HTTPError as e:
+            response = e
+        except (URLError, OSError) as e:
+            self.recorder.add(self.journey + '.' + name, time.perf_counter() - start, None, True)
+            return None, None, str(e)
+        text = response.read().decode('utf-8', 'replace')
+        seconds = time.perf_counter() - start
+        status = response.status if hasattr(response, 'status') else response.code
+        location = response.headers.get('Location')
+        queries = response.headers.get('X-SQL-Queries')
+        error = status >= 400 or (location is not None and '/login' in location)
+        self.recorder.add(self.journey + '.' + name, seconds, int(queries) if queries else None, error)
+        return status, location, text
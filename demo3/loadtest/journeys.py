@@ -0,0 +1,135 @@
+###################################################
+#                                                 #
+#   The scripted journeys of customers, employees #
+#   and owners, against a database filled by      #
+#   benchmarks/seed.py.                           #
+#                                                 #
+###################################################
+
+import threading
+import time
+from collections import deque
+
+from benchmarks.seed import get_layout, customer_restaurants, EMPLOYEES_PER_RESTAURANT, COUPONS_PER_RESTAURANT, \
+    ACHIEVEMENTS_PER_RESTAURANT, RESTAURANTS_PER_CUSTOMER
+
+# Every seeded user has this password
+PASSWORD = "password"
+
+# Scans an employee makes after logging in
+SCANS_PER_SHIFT = 5
+
+
+class World(object):
+    """
+    What the simulated users know about the seeded data, and the coupons
+    customers bought during the run, which employees then scan.
+
+    Args:
+        counts: The row counts the database was seeded with, see get_scale.
+        think: The mean pause between two steps of a journey, in seconds.
+    """
+
+    def __init__(self, counts, think=0.0):
+        self.counts = counts
+        self.layout = get_layout(counts)
+        self.think = think
+        self.purchases = deque(maxlen=1000)
+        self.lock = threading.Lock()
+
+    def pause(self, rng):
+        if self.think:
+            time.sleep(rng.uniform(0, 2 * self.think))
+
+    def pick(self, kind, rng):
+        first, last = self.layout[kind]
+        return rng.randint(first, last)
+
+    def restaurant_of_employee(self, uid):
+        return (uid - self.layout['employees'][0]) // EMPLOYEES_PER_RESTAURANT + 1
+
+    def coupon_of(self, rid, rng):
+        return (rid - 1) * COUPONS_PER_RESTAURANT + rng.randint(1, COUPONS_PER_RESTAURANT)
+
+    def achievement_of(self, rid, rng):
+        return (rid - 1) * ACHIEVEMENTS_PER_RESTAURANT + rng.randint(1, ACHIEVEMENTS_PER_RESTAURANT)
+
+    def bought(self, uid, cid, rid):
+        with self.lock:
+            self.purchases.append((uid, cid, rid))
+
+    def purchase_at(self, rid):
+        """
+        Takes a coupon bought at a restaurant during the run, None if there is none.
+        """
+        with self.lock:
+            for purchase in self.purchases:
+                if purchase[2] == rid:
+                    self.purchases.remove(purchase)
+                    return purchase
+        return None
+
+
+def login(client, uid):
+    return client.step('login', '/login', {'email': "user%d@bench.test" % uid, 'password': PASSWORD})
+
+
+def customer(client, world, rng):
+    """
+    Logs in, searches, opens a restaurant they are a member of, buys one of
+    its coupons and shows its QR code.
+    """
+    uid = world.pick('customers', rng)
+    rid = rng.choice(customer_restaurants(uid, world.counts, RESTAURANTS_PER_CUSTOMER))
+    login(client, uid)
+    world.pause(rng)
+    client.step('search', '/search', {'query': "Restaurant %d" % rid})
+    world.pause(rng)
+    client.step('restaurant', '/restaurant%d' % rid)
+    world.pause(rng)
+    client.step('coupon_offers', '/couponOffers%d' % rid)
+    world.pause(rng)
+    cid = world.coupon_of(rid, rng)
+    status, location, body = client.step('buy_coupon', '/couponOffers%d' % rid, {'cid': cid})
+    if status == 200 and 'successfully purchased' in body:
+        world.bought(uid, cid, rid)
+    world.pause(rng)
+    client.step('show_qr', '/coupon', {'coupon': cid})
+
+
+def employee(client, world, rng):
+    """
+    Logs in and scans the coupons customers bought at their restaurant,
+    or random coupons and achievements when there are none to scan.
+    """
+    uid = world.pick('employees', rng)
+    rid = world.restaurant_of_employee(uid)
+    login(client, uid)
+    for i in range(SCANS_PER_SHIFT):
+        world.pause(rng)
+        purchase = world.purchase_at(rid)
+        if purchase is not None:
+            client.step('scan_coupon', '/useCoupon/%d/%d' % (purchase[0], purchase[1]))
+        elif i % 2:
+            client.step('scan_coupon', '/useCoupon/%d/%d' % (world.pick('customers', rng), world.coupon_of(rid, rng)))
+        else:
+            client.step('scan_achievement', '/verifyAchievement/%d/%d'
+                        % (world.achievement_of(rid, rng), world.pick('customers', rng)))
+
+
+def owner(client, world, rng):
+    """
+    Logs in and looks at the restaurant's dashboards.
+    """
+    login(client, world.pick('owners', rng))
+    for name, path in (('coupon_stats', '/couponStats'), ('achievement_stats', '/achievementStats'),
+                       ('leaderboard', '/leaderBoard'), ('employees', '/employee')):
+        world.pause(rng)
+        client.step(name, path)
+
+
+JOURNEYS = {
+    'customer': customer,
+    'employee': employee,
+    'owner': owner,
+}
@@ -0,0 +1,219 @@
+###################################################
+#                                                 #
+#   Runs a load test scenario: journeys arrive    #
+#   at random at a given rate, and every step is  #
+#   summarized like a benchmark.                  #
+#                                                 #
+###################################################
+
+import heapq
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.run import get_commit
+from loadtest.client import Client, Recorder
+from loadtest.journeys import JOURNEYS, World
+
+# Journeys started per second of each kind
+SCENARIOS = {
+    # A lunch rush: customers pour in while staff scan and owners check in
+    'lunch_rush': {'customer': 20.0, 'employee': 5.0, 'owner': 0.5},
+    # A quiet afternoon, also a quick check that every journey works
+    'quiet': {'customer': 2.0, 'employee': 0.5, 'owner': 0.1},
+}
+
+
+def parse_rates(text):
+    """
+    Reads journey rates given as "customer=20,owner=0.5".
+
+    Returns:
+        A dict mapping journey names to journeys per second.
+    """
+    rates = {}
+    for item in text.split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() not in JOURNEYS:
+            raise ValueError("Unknown journey %s, expected one of %s" % (name, ", ".join(sorted(JOURNEYS))))
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def serve(app):
+    """
+    Starts the app on a free local port in a background thread, one thread
+    per request like a threaded development server.
+
+    Returns:
+        The server, stop it with shutdown(), and its root URL.
+    """
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:%d" % server.server_port
+
+
+def serve_gunicorn(settings, worker_class='gthread', workers=2, threads=8, timeout=30):
+    """
+    Starts the app under gunicorn with gunicorn.conf.py on a free local port,
+    to measure the worker class production uses.
+
+    Args:
+        settings: Configuration values passed to create_app, they must be
+            Python literals.
+        worker_class: The gunicorn worker class, e.g. sync or gthread.
+        workers: The number of worker processes.
+        threads: The number of threads of each gthread worker.
+        timeout: Seconds to wait for gunicorn to answer.
+
+    Returns:
+        The gunicorn process, stop it with terminate(), and its root URL.
+    """
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    factory = "app:create_app(%s)" % ", ".join("%s=%r" % item for item in sorted(settings.items()))
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=worker_class, WEB_CONCURRENCY=str(workers),
+               GUNICORN_THREADS=str(threads))
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn.app.wsgiapp', '-c', 'gunicorn.conf.py',
+                                '-b', '127.0.0.1:%d' % port, factory], env=env)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited with %d" % process.returncode)
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.1).close()
+            return process, "http://127.0.0.1:%d" % port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start in %ds" % timeout)
+
+
+def arrivals(rates, duration, rng):
+    """
+    Draws the start time of every journey, each kind arriving as a Poisson
+    process at its rate.
+
+    Returns:
+        A sorted list of (seconds after the start, journey name) tuples.
+    """
+    times = []
+    for name, rate in rates.items():
+        if rate <= 0:
+            continue
+        t = rng.expovariate(rate)
+        while t < duration:
+            heapq.heappush(times, (t, name))
+            t += rng.expovariate(rate)
+    return [heapq.heappop(times) for i in range(len(times))]
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+
+def summarize(step, elapsed):
+    """
+    Turns the measurements of a step into its result entry, in the format of
+    the benchmark results so benchmarks/compare.py can compare two runs.
+
+    Returns:
+        A dictionary with the count, throughput per second, error count and
+        rate, p50, p95, p99 and max in milliseconds and the median number of
+        queries, None when the app does not send X-SQL-Queries.
+    """
+    ordered = sorted(step['durations'])
+    count = len(ordered)
+    queries = sorted(step['queries'])
+    return {
+        'count': count,
+        'throughput': round(count / elapsed, 3) if elapsed else None,
+        'errors': step['errors'],
+        'error_rate': round(step['errors'] / count, 4) if count else None,
+        'p50': round(percentile(ordered, 0.5) * 1000, 3) if count else None,
+        'p95': round(percentile(ordered, 0.95) * 1000, 3) if count else None,
+        'p99': round(percentile(ordered, 0.99) * 1000, 3) if count else None,
+        'max': round(ordered[-1] * 1000, 3) if count else None,
+        'queries': percentile(queries, 0.5) if queries else None,
+    }
+
+
+def run(url, counts, rates, duration=60, concurrency=50, think=0.0, random_seed=0, log=print):
+    """
+    Runs journeys against the app at url for duration seconds.
+
+    Arrivals do not wait for earlier journeys to finish, as real customers
+    would not. When every one of the concurrency threads is busy new
+    journeys queue up, and their wait shows up in the late count.
+
+    Args:
+        url: The root URL of the app.
+        counts: The row counts the database was seeded with.
+        rates: A dict mapping journey names to journeys started per second.
+        duration: The number of seconds during which journeys arrive.
+        concurrency: The maximum number of users active at once.
+        think: The mean pause between two steps of a journey, in seconds.
+        random_seed: Seed of the arrivals and of each user's choices.
+        log: Function called with a progress message every 10 seconds.
+
+    Returns:
+        A dictionary with a 'meta' entry describing the run and a 'results'
+        entry with the result of each step, named journey.step.
+    """
+    rng = random.Random(random_seed)
+    world = World(counts, think)
+    recorder = Recorder()
+    schedule = arrivals(rates, duration, rng)
+    late = [0]
+
+    def play(name, due, n):
+        # A journey that starts more than a second after it arrived waited for a free thread
+        if time.perf_counter() - due > 1:
+            late[0] += 1
+        start = time.perf_counter()
+        try:
+            JOURNEYS[name](Client(url, name, recorder), world, random.Random(random_seed * 1000003 + n))
+            error = False
+        except Exception:
+            error = True
+        recorder.add(name + '.journey', time.perf_counter() - start, None, error)
+
+    start = time.perf_counter()
+    next_log = 10
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for n, (at, name) in enumerate(schedule):
+            delay = start + at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if at >= next_log:
+                log("%ds: %d journeys started" % (next_log, n))
+                next_log += 10
+            pool.submit(play, name, start + at, n)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'url': url,
+            'rates': rates,
+            'duration': duration,
+            'elapsed': round(elapsed, 3),
+            'concurrency': concurrency,
+            'think': think,
+            'journeys': len(schedule),
+            'late': late[0],
+            'rows': counts,
+        },
+        'results': {name: summarize(step, elapsed) for name, step in sorted(recorder.steps.items())},
+    }
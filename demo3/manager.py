@@ -1,6 +1,6 @@
 from flask_script import Manager
 from flask_migrate import Migrate, MigrateCommand
-from app import app
+from app import app, create_app
 from exts import db
 from models import User, Coupon, Restaurant, Employee, Achievements
 
@@ -16,5 +16,188 @@ migrate = Migrate(app, db)
 
 manager.add_command('db', MigrateCommand)
 
+
+def benchmark_app(**settings):
+    """
+    Creates an app that uses the benchmark database instead of the real one.
+    """
+    return create_app(SQLALCHEMY_DATABASE_URI = app.config['BENCHMARK_DATABASE_URI'],
+                      SQLALCHEMY_BINDS = {}, SQLALCHEMY_REPLICA_BINDS = [], **settings)
+
+
+@manager.option('-s', '--scale', dest='scale', default='small', help='tiny, small, medium or large')
+@manager.option('--restaurants', dest='restaurants', default=None)
+@manager.option('--users', dest='users', default=None)
+@manager.option('--progress', dest='progress', default=None)
+@manager.option('--redemptions', dest='redemptions', default=None)
+@manager.option('--seed', dest='seed', default=0, type=int)
+def seed_benchmark(scale, restaurants, users, progress, redemptions, seed):
+    """Fill the benchmark database with synthetic data"""
+    from benchmarks.seed import get_scale, seed as seed_database
+    counts = get_scale(scale, restaurants=restaurants, users=users, progress=progress, redemptions=redemptions)
+    with benchmark_app().app_context():
+        seed_database(counts, random_seed=seed)
+
+
+@manager.option('-i', '--iterations', dest='iterations', default=20, type=int)
+@manager.option('-o', '--output', dest='output', default='benchmark.json')
+@manager.option('-k', '--match', dest='match', default=None, help='only run benchmarks whose name contains this')
+def benchmark(iterations, output, match):
+    """Time every databaseHelpers function and route against the benchmark database"""
+    from benchmarks.compare import save
+    from benchmarks.run import run
+    with benchmark_app().app_context():
+        results = run(iterations=iterations, match=match)
+    save(results, output)
+    for name, result in sorted(results['results'].items()):
+        print("%-70s p50 %9s  p95 %9s  queries %5s  errors %d"
+              % (name, result['p50'], result['p95'], result['queries'], result['errors']))
+    print("Results written to %s" % output)
+
+
+@manager.option('-s', '--scenario', dest='scenario', default='lunch_rush', help='lunch_rush or quiet')
+@manager.option('-r', '--rates', dest='rates', default=None,
+                help='journeys per second replacing the scenario\'s, e.g. customer=20,employee=5,owner=0.5')
+@manager.option('-d', '--duration', dest='duration', default=60, type=float, help='seconds during which users arrive')
+@manager.option('-c', '--concurrency', dest='concurrency', default=50, type=int, help='most users active at once')
+@manager.option('--think', dest='think', default=0.0, type=float, help='mean seconds between two steps')
+@manager.option('-u', '--url', dest='url', default=None,
+                help='app to load, by default the benchmark database is served on a local port')
+@manager.option('--scale', dest='scale', default='small', help='scale the app at --url was seeded with')
+@manager.option('-g', '--gunicorn', dest='gunicorn', default=None,
+                help='serve the benchmark database with gunicorn workers of this class, e.g. sync or gthread')
+@manager.option('-w', '--workers', dest='workers', default=2, type=int, help='gunicorn worker processes')
+@manager.option('--threads', dest='threads', default=8, type=int, help='threads of each gthread worker')
+@manager.option('--seed', dest='seed', default=0, type=int)
+@manager.option('-o', '--output', dest='output', default='loadtest.json')
+def loadtest(scenario, rates, duration, concurrency, think, url, scale, gunicorn, workers, threads, seed, output):
+    """Simulate customers, employees and owners against the benchmark database"""
+    from benchmarks.compare import save
+    from benchmarks.seed import get_scale
+    from loadtest.run import SCENARIOS, parse_rates, run, serve, serve_gunicorn
+    rates = parse_rates(rates) if rates else SCENARIOS[scenario]
+    server = process = None
+    if url is None:
+        # Query counts come back in the X-SQL-Queries header of each response
+        target = benchmark_app(SQL_QUERY_HEADERS = True)
+        with target.app_context():
+            counts = {'restaurants': Restaurant.query.count(), 'users': User.query.count()}
+        if gunicorn:
+            process, url = serve_gunicorn({'SQLALCHEMY_DATABASE_URI': app.config['BENCHMARK_DATABASE_URI'],
+                                           'SQLALCHEMY_BINDS': {}, 'SQLALCHEMY_REPLICA_BINDS': [],
+                                           'SQL_QUERY_HEADERS': True},
+                                          worker_class = gunicorn, workers = workers, threads = threads)
+        else:
+            server, url = serve(target)
+    else:
+        counts = get_scale(scale)
+    try:
+        results = run(url, counts, rates, duration=duration, concurrency=concurrency, think=think, random_seed=seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+        if process is not None:
+            process.terminate()
+            process.wait()
+    results['meta']['server'] = {'worker_class': gunicorn, 'workers': workers, 'threads': threads} \
+        if gunicorn else 'werkzeug'
+    save(results, output)
+    for name, result in sorted(results['results'].items()):
+        print("%-34s %6d  %7s/s  errors %5.1f%%  p50 %9s  p95 %9s  p99 %9s  queries %4s"
+              % (name, result['count'], result['throughput'], (result['error_rate'] or 0) * 100,
+                 result['p50'], result['p95'], result['p99'], result['queries']))
+    print("%(journeys)d journeys in %(elapsed).1fs, %(late)d started late" % results['meta'])
+    print("Results written to %s, compare two runs with compare_benchmark" % output)
+
+
+@manager.option('current', help='results written by the benchmark or loadtest command')
+@manager.option('-b', '--baseline', dest='baseline', default=None)
+@manager.option('-t', '--threshold', dest='threshold', default=0.2, type=float,
+                help='allowed latency increase, 0.2 is 20%')
+@manager.option('-q', '--query-threshold', dest='query_threshold', default=0, type=int,
+                help='allowed number of extra queries')
+def compare_benchmark(current, baseline, threshold, query_threshold):
+    """Fail when a benchmark regressed against the stored baseline"""
+    from benchmarks.compare import compare, load
+    regressions = compare(load(baseline or app.config['BENCHMARK_BASELINE']), load(current),
+                          threshold, query_threshold)
+    for regression in regressions:
+        print(regression)
+    if regressions:
+        print("%d regressions" % len(regressions))
+        return 1
+    print("No regressions")
+
+
+@manager.option('rid', type=int, help='restaurant the balances belong to')
+@manager.option('path', help='CSV or JSONL file with email, name, password, points and experience')
+@manager.option('-c', '--chunk-size', dest='chunk_size', default=5000, type=int)
+@manager.option('--checkpoint', dest='checkpoint', default=None, help='defaults to PATH.checkpoint')
+@manager.option('--restart', dest='restart', action='store_true', help='ignore the checkpoint of a failed import')
+def import_customers(path, rid, chunk_size, checkpoint, restart):
+    """Import customers and their balances from a restaurant's old loyalty system"""
+    from databaseHelpers.customerImport import import_customers as import_file
+    stats = import_file(path, rid, chunk_size=chunk_size, checkpoint=checkpoint, restart=restart)
+    print("%(read)d rows read, %(inserted)d new users, %(existing)d existing users, %(duplicates)d duplicate emails, "
+          "%(rejected)d rejected in %(seconds).1fs (%(rows_per_second)s rows/s)" % stats)
+
+
+@manager.option('path', help='JSONL file with one receipt per line')
+@manager.option('-c', '--chunk-size', dest='chunk_size', default=1000, type=int)
+@manager.option('--start', dest='start', default=0, type=int, help='skip this many lines, e.g. the last committed one')
+def ingest_receipts(path, chunk_size, start):
+    """Apply the receipts of a point of sale export to the customers' achievements"""
+    from databaseHelpers.receipt import ingest_export
+    stats = ingest_export(path, chunk_size=chunk_size, start=start)
+    print("%(read)d receipts read, %(rejected)d rejected, %(advanced)d achievements advanced, "
+          "%(completed)d completed" % stats)
+
+
+@manager.option('-c', '--chunk-size', dest='chunk_size', default=1000, type=int)
+@manager.option('--today', dest='today', default=None, help='date the expirations are checked against, YYYY-MM-DD')
+def archive(chunk_size, today):
+    """Move used redemptions, deleted coupons and long expired achievements to the archive tables"""
+    from datetime import date
+    from databaseHelpers.archive import archive as archive_rows
+    stats = archive_rows(date.fromisoformat(today) if today else None, chunk_size=chunk_size)
+    print("%(redemptions)d redemptions, %(coupons)d coupons, %(achievements)d achievements and "
+          "%(progress)d progress entries archived" % stats)
+
+
+@manager.option('uid', type=int, help='customer whose history is printed')
+def archived_history(uid):
+    """Print the coupons and achievement progress of a customer that the archive command moved"""
+    from databaseHelpers.archive import get_archived_achievements_by_uid, get_archived_coupons_by_uid
+    for c in get_archived_coupons_by_uid(uid):
+        print("coupon %(cid)s %(cname)s at %(rname)s, %(points)s points, used %(used)s, archived %(archived)s" % c)
+    for a in get_archived_achievements_by_uid(uid):
+        print("achievement %(aid)s %(name)s at %(rname)s: %(progress)s/%(progressMax)s, last update %(update)s" % a)
+
+
+@manager.option('-t', '--ttl', dest='ttl', default=300, type=int, help='seconds the token stays valid')
+def profile_token(ttl):
+    """Print a token that profiles the requests sending it in an X-Profile-Token header"""
+    from instrumentation.profiler import make_token
+    print(make_token(app.config['SECRET_KEY'], ttl))
+
+
+@manager.option('-p', '--path', dest='path', default=None, help='defaults to SLOW_QUERY_LOG')
+@manager.option('-n', '--top', dest='top', default=20, type=int)
+def slow_query_report(path, top):
+    """Group the slow query log by statement shape, slowest total first"""
+    from instrumentation.slowQueries import report
+    for group in report(path or app.config['SLOW_QUERY_LOG'])[:top]:
+        print("%(count)6d x  total %(total)10.1fms  mean %(mean)8.1fms  max %(max)8.1fms" % group)
+        print("    %s" % group['shape'])
+        print("    helpers: %s" % (", ".join(group['callers']) or "-"))
+        print("    endpoints: %s" % (", ".join(group['endpoints']) or "-"))
+        if isinstance(group['plan'], list):
+            for row in group['plan']:
+                print("    plan: %s" % " | ".join(row))
+        elif group['plan']:
+            print("    plan: %s" % group['plan'])
+        print("")
+
+
 if __name__ == "__main__":
     manager.run()
@@ -0,0 +1,26 @@
+"""index the active coupons of each restaurant by level and points
+
+Revision ID: 2f9b4e7c1d58
+Revises: 8c3f6d2a7b15
+Create Date: 2026-10-19 13:06:52.187340
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f9b4e7c1d58'
+down_revision = '8c3f6d2a7b15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Partial on PostgreSQL and SQLite, a plain index on MySQL
+    op.create_index('ix_coupons_active_rid_level', 'coupons', ['rid', 'level', 'points'], unique=False,
+                    postgresql_where=sa.text('deleted = 0'), sqlite_where=sa.text('deleted = 0'))
+
+
+def downgrade():
+    op.drop_index('ix_coupons_active_rid_level', table_name='coupons')
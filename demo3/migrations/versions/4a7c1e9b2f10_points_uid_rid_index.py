@@ -0,0 +1,24 @@
+"""index points by user and restaurant
+
+Revision ID: 4a7c1e9b2f10
+Revises: d0c75f0798cf
+Create Date: 2026-10-19 09:12:40.104518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a7c1e9b2f10'
+down_revision = 'd0c75f0798cf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_points_uid_rid', 'points', ['uid', 'rid'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_points_uid_rid', table_name='points')
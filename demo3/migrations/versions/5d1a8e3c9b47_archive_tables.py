@@ -0,0 +1,97 @@
+"""archive tables for redemptions, deleted coupons and expired achievements
+
+Revision ID: 5d1a8e3c9b47
+Revises: 2f9b4e7c1d58
+Create Date: 2026-10-19 15:20:41.608213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1a8e3c9b47'
+down_revision = '2f9b4e7c1d58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('coupons', sa.Column('archived_held', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('coupons', sa.Column('archived_used', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table('coupons_archive',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('cid', sa.Integer(), nullable=False),
+    sa.Column('rid', sa.Integer(), nullable=True),
+    sa.Column('deleted', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('description', sa.String(length=1024), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('expiration', sa.Date(), nullable=True),
+    sa.Column('begin', sa.Date(), nullable=True),
+    sa.Column('archived_held', sa.Integer(), nullable=False),
+    sa.Column('archived_used', sa.Integer(), nullable=False),
+    sa.Column('archived', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_coupons_archive_cid'), 'coupons_archive', ['cid'], unique=False)
+    op.create_index(op.f('ix_coupons_archive_rid'), 'coupons_archive', ['rid'], unique=False)
+    op.create_table('redeemed_coupons_archive',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('rcid', sa.Integer(), nullable=False),
+    sa.Column('cid', sa.Integer(), nullable=False),
+    sa.Column('uid', sa.Integer(), nullable=False),
+    sa.Column('rid', sa.Integer(), nullable=False),
+    sa.Column('valid', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('expiration', sa.Date(), nullable=True),
+    sa.Column('archived', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_redeemed_coupons_archive_uid'), 'redeemed_coupons_archive', ['uid'], unique=False)
+    op.create_table('achievements_archive',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('aid', sa.Integer(), nullable=False),
+    sa.Column('rid', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=128), nullable=False),
+    sa.Column('experience', sa.Integer(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('type', sa.Integer(), nullable=False),
+    sa.Column('value', sa.String(length=2048), nullable=False),
+    sa.Column('started', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('archived', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_achievements_archive_aid'), 'achievements_archive', ['aid'], unique=False)
+    op.create_index(op.f('ix_achievements_archive_rid'), 'achievements_archive', ['rid'], unique=False)
+    op.create_table('customer_achievement_progress_archive',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('achievement_id', sa.Integer(), nullable=True),
+    sa.Column('aid', sa.Integer(), nullable=False),
+    sa.Column('uid', sa.Integer(), nullable=False),
+    sa.Column('progress', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('update', sa.DateTime(), nullable=True),
+    sa.Column('archived', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['achievement_id'], ['achievements_archive.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_customer_achievement_progress_archive_achievement_id'),
+                    'customer_achievement_progress_archive', ['achievement_id'], unique=False)
+    op.create_index(op.f('ix_customer_achievement_progress_archive_aid'), 'customer_achievement_progress_archive',
+                    ['aid'], unique=False)
+    op.create_index(op.f('ix_customer_achievement_progress_archive_uid'), 'customer_achievement_progress_archive',
+                    ['uid'], unique=False)
+
+
+def downgrade():
+    op.drop_table('customer_achievement_progress_archive')
+    op.drop_table('achievements_archive')
+    op.drop_table('redeemed_coupons_archive')
+    op.drop_table('coupons_archive')
+    with op.batch_alter_table('coupons') as batch_op:
+        batch_op.drop_column('archived_used')
+        batch_op.drop_column('archived_held')
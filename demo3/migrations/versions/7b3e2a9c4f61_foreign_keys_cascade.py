@@ -0,0 +1,86 @@
+"""foreign keys, deleting the rows of a user or an achievement with it
+
+Revision ID: 7b3e2a9c4f61
+Revises: 5d1a8e3c9b47
+Create Date: 2026-10-19 17:02:13.284517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e2a9c4f61'
+down_revision = '5d1a8e3c9b47'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table, referred column, ondelete), parents before children
+FOREIGN_KEYS = [
+    ('restaurant', 'uid', 'user', 'uid', None),
+    ('coupons', 'rid', 'restaurant', 'rid', None),
+    ('achievements', 'rid', 'restaurant', 'rid', None),
+    ('thresholds', 'rid', 'restaurant', 'rid', None),
+    ('points', 'uid', 'user', 'uid', 'CASCADE'),
+    ('points', 'rid', 'restaurant', 'rid', None),
+    ('experience', 'uid', 'user', 'uid', 'CASCADE'),
+    ('experience', 'rid', 'restaurant', 'rid', None),
+    ('employee', 'uid', 'user', 'uid', 'CASCADE'),
+    ('employee', 'rid', 'restaurant', 'rid', None),
+    ('favourite', 'uid', 'user', 'uid', 'CASCADE'),
+    ('favourite', 'rid', 'restaurant', 'rid', None),
+    ('redeemed_coupons', 'rid', 'restaurant', 'rid', None),
+    ('redeemed_coupons', 'cid', 'coupons', 'cid', None),
+    ('redeemed_coupons', 'uid', 'user', 'uid', 'CASCADE'),
+    ('customer_achievement_progress', 'aid', 'achievements', 'aid', 'CASCADE'),
+    ('customer_achievement_progress', 'uid', 'user', 'uid', 'CASCADE'),
+]
+
+
+def fk_name(table, column, referred):
+    return 'fk_%s_%s_%s' % (table, column, referred)
+
+
+def keys_by_table():
+    tables = {}
+    for table, column, referred, referred_column, ondelete in FOREIGN_KEYS:
+        tables.setdefault(table, []).append((column, referred, referred_column, ondelete))
+    return sorted(tables.items())
+
+
+def delete_orphans(table, column, referred, referred_column):
+    child = sa.table(table, sa.column(column))
+    parent = sa.table(referred, sa.column(referred_column))
+    orphan = sa.and_(child.c[column] != None,
+                     ~sa.exists().where(parent.c[referred_column] == child.c[column]))
+    if table == 'restaurant':
+        # A restaurant outlives the account of its owner
+        op.execute(child.update().where(orphan).values({column: None}))
+    else:
+        op.execute(child.delete().where(orphan))
+
+
+def upgrade():
+    # Rows left behind by deletes before the keys existed, in the order the keys are created so that
+    # the rows of a deleted restaurant go before the redemptions of its coupons
+    for table, column, referred, referred_column, ondelete in FOREIGN_KEYS:
+        delete_orphans(table, column, referred, referred_column)
+
+    inspector = sa.inspect(op.get_bind())
+    for table, keys in keys_by_table():
+        columns = [column for column, referred, referred_column, ondelete in keys]
+        existing = [fk['name'] for fk in inspector.get_foreign_keys(table)
+                    if fk['name'] and fk['constrained_columns'][0] in columns]
+        with op.batch_alter_table(table) as batch_op:
+            for name in existing:
+                batch_op.drop_constraint(name, type_='foreignkey')
+            for column, referred, referred_column, ondelete in keys:
+                batch_op.create_foreign_key(fk_name(table, column, referred), referred, [column], [referred_column],
+                                            ondelete=ondelete)
+
+
+def downgrade():
+    for table, keys in keys_by_table():
+        with op.batch_alter_table(table) as batch_op:
+            for column, referred, referred_column, ondelete in keys:
+                batch_op.drop_constraint(fk_name(table, column, referred), type_='foreignkey')
@@ -0,0 +1,34 @@
+"""index the home feed by user and recency, add favourite.created
+
+Revision ID: 8c3f6d2a7b15
+Revises: 4a7c1e9b2f10
+Create Date: 2026-10-19 10:41:27.553012
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3f6d2a7b15'
+down_revision = '4a7c1e9b2f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('favourite', sa.Column('created', sa.DateTime(), nullable=True))
+    # The order of the existing favourites is unknown, they all get the time of the migration
+    op.execute(sa.text("UPDATE favourite SET created = CURRENT_TIMESTAMP"))
+    op.create_index('ix_favourite_uid_created', 'favourite', ['uid', 'created'], unique=False)
+    op.create_index('ix_redeemed_coupons_uid_valid_rcid', 'redeemed_coupons', ['uid', 'valid', 'rcid'], unique=False)
+    op.create_index('ix_customer_achievement_progress_uid_update', 'customer_achievement_progress', ['uid', 'update'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_customer_achievement_progress_uid_update', table_name='customer_achievement_progress')
+    op.drop_index('ix_redeemed_coupons_uid_valid_rcid', table_name='redeemed_coupons')
+    op.drop_index('ix_favourite_uid_created', table_name='favourite')
+    with op.batch_alter_table('favourite') as batch_op:
+        batch_op.drop_column('created')
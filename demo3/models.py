@@ -9,17 +9,8 @@
 #     db.Column("coupon_id", db.Integer, db.ForeignKey("coupon_info.id"), primary_key=True)
 # )
 
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-import config
-if config.STATUS == "TEST":
-    # for creating test
-    app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = True
-    db = SQLAlchemy(app)
-else:
-    from exts import db
+from datetime import datetime
+from exts import db
 
 
 class User(db.Model):
@@ -32,8 +23,12 @@ class User(db.Model):
 
 class Coupon(db.Model):
     __tablename__ = "coupons"
+    # Only the catalog of active coupons is browsed by customers, deleted
+    # coupons stay for the statistics
+    __table_args__ = (db.Index('ix_coupons_active_rid_level', 'rid', 'level', 'points',
+                               postgresql_where=db.text('deleted = 0'), sqlite_where=db.text('deleted = 0')),)
     cid = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    rid = db.Column(db.Integer)
+    rid = db.Column(db.Integer, db.ForeignKey('restaurant.rid'))
     deleted = db.Column(db.Integer, nullable=False)
     name = db.Column(db.String(64), nullable=False)
     points = db.Column(db.Integer, nullable=False)
@@ -41,65 +36,150 @@ class Coupon(db.Model):
     level = db.Column(db.Integer, nullable=False)
     expiration = db.Column(db.Date, nullable=True)
     begin = db.Column(db.Date, nullable=True)
+    # Redemptions of the coupon moved to redeemed_coupons_archive, still
+    # counted by the statistics
+    archived_held = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    archived_used = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    restaurant = db.relationship('Restaurant')
 
 class Restaurant(db.Model):
     __tablename__ = "restaurant"
     rid = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(64), nullable=False)
     address = db.Column(db.String(128), nullable=True)
-    uid = db.Column(db.Integer)
+    uid = db.Column(db.Integer, db.ForeignKey('user.uid'))
+    owner = db.relationship('User')
 
 class Points(db.Model):
     __tablename__ = "points"
+    __table_args__ = (db.Index('ix_points_uid_rid', 'uid', 'rid'),)
     pid = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    uid = db.Column(db.Integer)
-    rid = db.Column(db.Integer)
+    uid = db.Column(db.Integer, db.ForeignKey('user.uid', ondelete='CASCADE'))
+    rid = db.Column(db.Integer, db.ForeignKey('restaurant.rid'))
     points = db.Column(db.Integer)
 
 class Experience(db.Model):
     __tablename__ = "experience"
-    uid = db.Column(db.Integer, primary_key=True)
-    rid = db.Column(db.Integer, primary_key=True)
+    uid = db.Column(db.Integer, db.ForeignKey('user.uid', ondelete='CASCADE'), primary_key=True)
+    rid = db.Column(db.Integer, db.ForeignKey('restaurant.rid'), primary_key=True)
     experience = db.Column(db.Integer)
 
 class Employee(db.Model):
     __tablename__ = "employee"
-    uid = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    rid = db.Column(db.Integer)
+    uid = db.Column(db.Integer, db.ForeignKey('user.uid', ondelete='CASCADE'), primary_key=True, autoincrement=True)
+    rid = db.Column(db.Integer, db.ForeignKey('restaurant.rid'))
+    user = db.relationship('User')
+    restaurant = db.relationship('Restaurant')
 
 class Redeemed_Coupons(db.Model):
     __tablename__ = "redeemed_coupons"
+    __table_args__ = (db.Index('ix_redeemed_coupons_uid_valid_rcid', 'uid', 'valid', 'rcid'),)
     rcid = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    cid = db.Column(db.Integer, nullable=False)
-    uid = db.Column(db.Integer, nullable=False)
-    rid = db.Column(db.Integer, nullable=False)
+    cid = db.Column(db.Integer, db.ForeignKey('coupons.cid'), nullable=False)
+    uid = db.Column(db.Integer, db.ForeignKey('user.uid', ondelete='CASCADE'), nullable=False)
+    rid = db.Column(db.Integer, db.ForeignKey('restaurant.rid'), nullable=False)
     valid = db.Column(db.Integer, nullable=False)
+    coupon = db.relationship('Coupon')
+    user = db.relationship('User')
+    restaurant = db.relationship('Restaurant')
 
 class Customer_Achievement_Progress(db.Model):
     __tablename__ = "customer_achievement_progress"
-    aid = db.Column(db.Integer, nullable=False, primary_key=True)
-    uid = db.Column(db.Integer, nullable=False, primary_key=True)
+    __table_args__ = (db.Index('ix_customer_achievement_progress_uid_update', 'uid', 'update'),)
+    aid = db.Column(db.Integer, db.ForeignKey('achievements.aid', ondelete='CASCADE'), nullable=False, primary_key=True)
+    uid = db.Column(db.Integer, db.ForeignKey('user.uid', ondelete='CASCADE'), nullable=False, primary_key=True)
     progress = db.Column(db.Integer, nullable=False)
     total = db.Column(db.Integer, nullable=False)
     update = db.Column(db.DateTime, nullable=True)
+    achievement = db.relationship('Achievements')
+    user = db.relationship('User')
 
 class Achievements(db.Model):
     __tablename__ = "achievements"
     aid = db.Column(db.Integer, nullable=False, primary_key=True)
-    rid = db.Column(db.Integer, nullable=False)
+    rid = db.Column(db.Integer, db.ForeignKey('restaurant.rid'), nullable=False)
     name = db.Column(db.String(128), nullable=False)
     experience = db.Column(db.Integer, nullable=False)
     points = db.Column(db.Integer, nullable=False)
     type = db.Column(db.Integer, nullable=False)
     value = db.Column(db.String(2048), nullable=False)
+    restaurant = db.relationship('Restaurant')
 
 class Thresholds(db.Model):
     __tablename__ = "thresholds"
-    rid = db.Column(db.Integer, primary_key=True, nullable=False)
+    rid = db.Column(db.Integer, db.ForeignKey('restaurant.rid'), primary_key=True, nullable=False)
     level = db.Column(db.Integer, primary_key=True, nullable=False)
     reward = db.Column(db.Integer, nullable=False)
 
 class Favourite(db.Model):
     __tablename__ = "favourite"
-    uid = db.Column(db.Integer, primary_key=True)
-    rid = db.Column(db.Integer, primary_key=True)
+    __table_args__ = (db.Index('ix_favourite_uid_created', 'uid', 'created'),)
+    uid = db.Column(db.Integer, db.ForeignKey('user.uid', ondelete='CASCADE'), primary_key=True)
+    rid = db.Column(db.Integer, db.ForeignKey('restaurant.rid'), primary_key=True)
+    created = db.Column(db.DateTime, nullable=True, default=datetime.now)
+    user = db.relationship('User')
+    restaurant = db.relationship('Restaurant')
+
+
+# Archive tables, filled by "python manager.py archive" with the rows the
+# app no longer lists and only read by databaseHelpers/archive.py. Their
+# rows keep the IDs they had, but have their own primary keys since SQLite
+# can give the ID of the last row deleted to the next row inserted.
+
+class Archived_Coupon(db.Model):
+    __tablename__ = "coupons_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    cid = db.Column(db.Integer, nullable=False, index=True)
+    rid = db.Column(db.Integer, index=True)
+    deleted = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(64), nullable=False)
+    points = db.Column(db.Integer, nullable=False)
+    description = db.Column(db.String(1024), nullable=False)
+    level = db.Column(db.Integer, nullable=False)
+    expiration = db.Column(db.Date, nullable=True)
+    begin = db.Column(db.Date, nullable=True)
+    archived_held = db.Column(db.Integer, nullable=False)
+    archived_used = db.Column(db.Integer, nullable=False)
+    archived = db.Column(db.DateTime, nullable=False)
+
+class Archived_Redeemed_Coupons(db.Model):
+    __tablename__ = "redeemed_coupons_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    rcid = db.Column(db.Integer, nullable=False)
+    cid = db.Column(db.Integer, nullable=False)
+    uid = db.Column(db.Integer, nullable=False, index=True)
+    rid = db.Column(db.Integer, nullable=False)
+    valid = db.Column(db.Integer, nullable=False)
+    # The coupon when the redemption was archived, it may be archived later
+    name = db.Column(db.String(64), nullable=False)
+    points = db.Column(db.Integer, nullable=False)
+    expiration = db.Column(db.Date, nullable=True)
+    archived = db.Column(db.DateTime, nullable=False)
+
+class Archived_Achievements(db.Model):
+    __tablename__ = "achievements_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    aid = db.Column(db.Integer, nullable=False, index=True)
+    rid = db.Column(db.Integer, nullable=False, index=True)
+    name = db.Column(db.String(128), nullable=False)
+    experience = db.Column(db.Integer, nullable=False)
+    points = db.Column(db.Integer, nullable=False)
+    type = db.Column(db.Integer, nullable=False)
+    value = db.Column(db.String(2048), nullable=False)
+    # The progress entries of the achievement when it was archived
+    started = db.Column(db.Integer, nullable=False)
+    completed = db.Column(db.Integer, nullable=False)
+    archived = db.Column(db.DateTime, nullable=False)
+
+class Archived_Achievement_Progress(db.Model):
+    __tablename__ = "customer_achievement_progress_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # Set once the achievement itself is archived
+    achievement_id = db.Column(db.Integer, db.ForeignKey('achievements_archive.id'), nullable=True, index=True)
+    aid = db.Column(db.Integer, nullable=False, index=True)
+    uid = db.Column(db.Integer, nullable=False, index=True)
+    progress = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Integer, nullable=False)
+    update = db.Column(db.DateTime, nullable=True)
+    archived = db.Column(db.DateTime, nullable=False)
+    achievement = db.relationship('Archived_Achievements')
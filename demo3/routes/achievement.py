@@ -6,18 +6,20 @@
 #                                                 #
 ###################################################
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
+from flask import Flask, render_template, request, redirect, url_for, session, abort, current_app, jsonify
+from itertools import chain
 from databaseHelpers.achievement import *
 from databaseHelpers.restaurant import *
 from databaseHelpers.qr_code import *
 from databaseHelpers.achievementProgress import *
 from databaseHelpers.employee import *
+from databaseHelpers.archive import get_archived_achievement_stats
+from databaseHelpers.receipt import ingest_receipts
 from databaseHelpers.restaurant import verify_scan_list
+from instrumentation.metrics import count_scan
+from exts import stream_template
 
-achievement_page = Blueprint('achievement_page', __name__, template_folder='templates')
 
-@achievement_page.route('/achievement.html', methods=['GET', 'POST'])
-@achievement_page.route('/achievement', methods=['GET', 'POST'])
 def achievement():
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -41,8 +43,6 @@ def achievement():
 
 
 # To create an achievement
-@achievement_page.route('/createAchievement.html', methods=['GET', 'POST'])
-@achievement_page.route('/createAchievement', methods=['GET', 'POST'])
 def create_achievement():
     # If someone is not logged in redirects them to login page, same as coupon
     if 'account' not in session:
@@ -80,8 +80,6 @@ def create_achievement():
     return render_template('createAchievement.html')
 
 
-@achievement_page.route('/achievementStats.html', methods=['GET', 'POST'])
-@achievement_page.route('/achievementStats', methods=['GET', 'POST'])
 def achievement_stats():
     # If someone is not logged in redirects them to login page, same as coupon
     if 'account' not in session:
@@ -99,11 +97,11 @@ def achievement_stats():
             rid = get_rid(session["account"])
         elif session["type"] == 2:
             rid = get_employee_rid(session["account"])
-        achievements = get_achievement_progress_stats(get_achievements_by_rid(rid))
-        return render_template('achievementStats.html', achievements = achievements, filter = filter)
+        # Achievements moved to the archive are listed as expired after the others
+        achievements = chain(iter_achievement_progress_stats(rid), get_archived_achievement_stats(rid))
+        return stream_template('achievementStats.html', achievements = achievements, filter = filter)
 
 
-@achievement_page.route('/verifyAchievement/<aid>/<uid>', methods=['GET', 'POST'])
 def use_achievement(aid, uid):
 
     # If someone is not logged in redirects them to login page
@@ -117,6 +115,7 @@ def use_achievement(aid, uid):
 
     # Page is restricted to employee/owner only, if user is a customer, redirect to home page
     if session['type'] == -1 or scanner not in access:
+        count_scan('achievement', 'failure')
         return redirect(url_for('qr_page.scan_failure', rname=rname))
 
     # get achievement
@@ -126,15 +125,41 @@ def use_achievement(aid, uid):
     if achievement != 'Not Found':
         # check if achievement is already complete
         if get_progress_completion_status(achievementProgress) == COMPLETE:
+            count_scan('achievement', 'forbidden')
             return redirect(url_for('qr_page.scan_forbidden', forbiddenType = 0, itemType = 'Achievement'))
 
         # check if it is before achievement start date or after achievement end date
-        isInDateRange = is_today_in_achievement_date_range(achievement)
+        isInDateRange = achievement.date_status()
         if isInDateRange != 0:
+            count_scan('achievement', 'forbidden')
             return redirect(url_for('qr_page.scan_forbidden', forbiddenType = isInDateRange, itemType = 'Achievement'))
 
         # update progress
         add_one_progress_bar(achievementProgress, aid, uid)
+        count_scan('achievement', 'success')
         return redirect(url_for('qr_page.scan_successful'))
 
+    count_scan('achievement', 'nonexistent')
     return redirect(url_for('qr_page.scan_nonexistent', scanType = 1))
+
+
+def receipts():
+    # Sent by a point of sale logged in as an employee or owner, the body is a
+    # receipt, a list of receipts or {"receipts": [...]}
+    if 'account' not in session or session['type'] == -1:
+        abort(403)
+
+    body = request.get_json(silent=True)
+    if isinstance(body, dict) and 'receipts' in body:
+        body = body['receipts']
+    batch = body if isinstance(body, list) else [body]
+    if body is None:
+        return jsonify(rejected=[{'index': 0, 'errors': ["The body must be a JSON receipt or list of receipts."]}]), 400
+    if len(batch) > current_app.config['RECEIPT_BATCH_LIMIT']:
+        return jsonify(rejected=[{'index': 0, 'errors': ["Send at most %d receipts at a time."
+                                                         % current_app.config['RECEIPT_BATCH_LIMIT']]}]), 413
+
+    rejected, stats = ingest_receipts(batch, scanner=session['account'])
+    if rejected:
+        return jsonify(rejected=rejected), 400
+    return jsonify(stats)
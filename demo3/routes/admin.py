@@ -0,0 +1,66 @@
+###################################################
+#                                                 #
+#   Includes the pages only administrators see.   #
+#                                                 #
+###################################################
+
+import os
+import tracemalloc
+
+from flask import render_template, request, redirect, url_for, session, abort, current_app, send_from_directory
+from instrumentation.profiler import list_captures
+from instrumentation.memory import start_tracing, stop_tracing, save_baseline, top_allocations, diff_allocations, \
+    route_report
+
+# Most frames kept for the traceback of each traced allocation
+MAX_TRACE_FRAMES = 50
+
+
+def is_admin():
+    return session.get('account') in current_app.config.get('ADMIN_UIDS', [])
+
+
+def profiles():
+    if not is_admin():
+        abort(403)
+
+    captures = list_captures(current_app.config['PROFILER_DIR'])
+    return render_template("adminProfiles.html", captures=captures)
+
+
+def profile_file(name):
+    if not is_admin():
+        abort(403)
+
+    if not (name.endswith('.collapsed') or name.endswith('.json')):
+        abort(404)
+    # send_from_directory refuses names that leave the folder
+    return send_from_directory(os.path.abspath(current_app.config['PROFILER_DIR']), name, as_attachment=True,
+                               mimetype='text/plain')
+
+
+def memory():
+    if not is_admin():
+        abort(403)
+
+    errmsg = []
+    if request.method == 'POST':
+        action = request.form.get('action')
+        if action == 'start':
+            frames = request.form.get('frames') or str(current_app.config['MEMORY_TRACE_FRAMES'])
+            if not frames.isdigit() or not 1 <= int(frames) <= MAX_TRACE_FRAMES:
+                errmsg.append("Invalid number of frames, please provide a value between 1 and %d."
+                              % MAX_TRACE_FRAMES)
+            else:
+                start_tracing(int(frames))
+        elif action == 'stop':
+            stop_tracing()
+        elif action == 'baseline':
+            save_baseline()
+        if not errmsg:
+            return redirect(url_for('admin_page.memory'))
+
+    return render_template("adminMemory.html", tracing=tracemalloc.is_tracing(),
+                           traced=tracemalloc.get_traced_memory(), top=top_allocations(),
+                           diff=diff_allocations(), routes=route_report(), errmsg=errmsg,
+                           max_frames=MAX_TRACE_FRAMES)
@@ -6,19 +6,20 @@
 #                                                 #
 ###################################################
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
+from flask import Flask, render_template, request, redirect, url_for, session
+from itertools import chain
 
-coupon_page = Blueprint('coupon_page', __name__, template_folder='templates')
 from databaseHelpers.coupon import *
 from databaseHelpers.employee import *
 from databaseHelpers.redeemedCoupons import *
 from databaseHelpers.qr_code import *
 from databaseHelpers.experience import *
 from databaseHelpers.level import *
+from databaseHelpers.archive import get_archived_coupons_by_rid
+from instrumentation.metrics import count_scan
+from exts import stream_template
 
 # My coupon page
-@coupon_page.route('/coupon.html', methods=['GET', 'POST'])
-@coupon_page.route('/coupon', methods=['GET', 'POST'])
 def coupon():
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -51,13 +52,10 @@ def coupon():
             rid = get_rid(session["account"])
         else:
             rid = get_employee_rid(session["account"])
-        coupon_list = get_coupons(rid)
-        return render_template("coupon.html", coupons = coupon_list)
+        return stream_template("coupon.html", coupons = iter_coupons(rid))
 
 
 # Create a coupon page
-@coupon_page.route('/createCoupon.html', methods=['GET', 'POST'])
-@coupon_page.route('/createCoupon', methods=['GET', 'POST'])
 def create_coupon():
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -98,8 +96,6 @@ def create_coupon():
 
 
 # View customer coupons
-@coupon_page.route('/couponStats.html', methods=['GET', 'POST'])
-@coupon_page.route('/couponStats', methods=['GET', 'POST'])
 def couponStats():
     today = date.today()
     # If someone is not logged in redirects them to login page
@@ -123,11 +119,12 @@ def couponStats():
     elif request.method == 'POST' and "active" in request.form:
         filter = "active"
 
-    coupon_list = get_redeemed_coupons_by_rid(rid)
-    return render_template("couponStats.html", coupons = coupon_list, today = today, filter = filter)
+    # Deleted coupons moved to the archive are listed after the others, with the counters they were archived with
+    coupons = chain(iter_redeemed_coupons_by_rid(rid, status = filter),
+                    get_archived_coupons_by_rid(rid, status = filter, today = today))
+    return stream_template("couponStats.html", coupons = coupons, today = today, filter = filter)
 
 
-@coupon_page.route('/useCoupon/<uid>/<cid>', methods=['GET', 'POST'])
 def use_coupon(cid,uid):
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -140,6 +137,7 @@ def use_coupon(cid,uid):
 
     # Page is restricted to employee/owner only, if user is a customer, redirect to home page
     if session['type'] == -1 or scanner not in access:
+        count_scan('coupon', 'failure')
         return redirect(url_for('qr_page.scan_failure', rname=rname))
 
     # find rcid
@@ -149,9 +147,12 @@ def use_coupon(cid,uid):
         
         # check if it is before coupon start date or after coupon end date
         if coupon["status"] != 0:
+            count_scan('coupon', 'forbidden')
             return redirect(url_for('qr_page.scan_forbidden', forbiddenType = coupon["status"], itemType = 'Coupon'))
         
         # mark used
         mark_redeem_coupon_used_by_rcid(rcid)
+        count_scan('coupon', 'success')
         return redirect(url_for('qr_page.scan_successful'))
+    count_scan('coupon', 'nonexistent')
     return redirect(url_for('qr_page.scan_nonexistent', scanType = 0))
@@ -4,15 +4,13 @@
 #                                                 #
 ###################################################
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
+from flask import Flask, render_template, request, redirect, url_for, session
 from databaseHelpers.restaurant import *
 from databaseHelpers.employee import *
 from databaseHelpers.user import *
+from exts import stream_template
 
-employee_page = Blueprint('employee_page', __name__, template_folder='templates')
 
-@employee_page.route('/employee.html', methods=['GET', 'POST'])
-@employee_page.route('/employee', methods=['GET', 'POST'])
 def employee():
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -39,11 +37,9 @@ def employee():
             filter = 2
 
 
-
     if session["type"] == 1:
         rid = get_rid(session["account"])
     elif session["type"] == 2:
         rid = get_employee_rid(session["account"])
 
-    employee_list = get_employees(rid)
-    return render_template("employee.html", employees = employee_list, filter = filter)
+    return stream_template("employee.html", employees = iter_employees(rid), filter = filter)
@@ -4,7 +4,7 @@
 #                                                 #
 ###################################################
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
+from flask import Flask, render_template, request, redirect, url_for, session
 
 from databaseHelpers.redeemedCoupons import *
 from databaseHelpers.achievement import *
@@ -15,15 +15,11 @@ from databaseHelpers.user import *
 from datetime import datetime
 from databaseHelpers.redeemedCoupons import *
 from databaseHelpers.favourite import *
-
-
-home_page = Blueprint('home_page', __name__, template_folder='templates')
+from databaseHelpers.feed import get_home_feed
 
 
 # The home landing page
 # Currently nothing is here
-@home_page.route('/home')
-@home_page.route('/home.html')
 def home():
     # Redirects to login page if no user is signed it
     if 'account' not in session:
@@ -32,19 +28,12 @@ def home():
     user = get_user(session['account'])
     # Customer view of home page
     if session['type'] == -1:
-        # Last 3 coupons purchased
-        coupons = get_redeemed_coupons_by_uid(session["account"])[-3:]
-        coupons.reverse()
-
-        # Last 3 restaurants added to favourites
-        restaurants = get_favourites(session['account'])[-3:]
-     
-        #Last 3 updated achievement progrss
-        achievements_progress = get_recently_update_achievements(session['account'])
-        achievements = get_updated_info(achievements_progress)
+        # Last 3 coupons purchased, restaurants added to favourites and
+        # updated achievement progress
+        feed = get_home_feed(session['account'])
 
-        return render_template('home.html', user = user, coupons = coupons,
-                               restaurants = restaurants, achievements=achievements)
+        return render_template('home.html', user = user, coupons = feed['coupons'],
+                               restaurants = feed['restaurants'], achievements = feed['achievements'])
 
     # Employee view of home page
     elif session['type'] == 0:
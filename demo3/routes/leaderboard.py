@@ -1,14 +1,11 @@
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
+from flask import Flask, render_template, request, redirect, url_for, session
 from databaseHelpers.leaderboard import *
 from databaseHelpers.experience import *
 from databaseHelpers.level import *
 from databaseHelpers.employee import *
 from databaseHelpers.restaurant import *
 
-leaderboard_page = Blueprint('leaderboard_page', __name__, template_folder='templates')
 
-@leaderboard_page.route('/leaderBoard.html', methods=['GET', 'POST'])
-@leaderboard_page.route('/leaderBoard', methods=['GET', 'POST'])
 def leaderboard():
     if 'account' not in session:
         return redirect(url_for('login_page.login'))
@@ -5,13 +5,9 @@
 #                                                 #
 ###################################################
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
-login_page = Blueprint('login_page', __name__, template_folder='templates')
+from flask import Flask, render_template, request, redirect, url_for, session
 from databaseHelpers.user import *
 
-@login_page.route('/login', methods=['GET', 'POST'])
-@login_page.route('/login.html', methods=['GET', 'POST'])
-@login_page.route('/', methods = ['GET', 'POST'])
 def login():
     # This runs when the user presses the login button
     if request.method == 'POST':
@@ -43,8 +39,6 @@ def login():
 
 
 # To end session you must logout
-@login_page.route('/logout')
-@login_page.route('/logout.html')
 def logout():
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -0,0 +1,23 @@
+###################################################
+#                                                 #
+#   Includes the route scraped by Prometheus.     #
+#                                                 #
+###################################################
+
+import hmac
+from flask import request, abort, current_app, Response
+from instrumentation.metrics import export
+
+
+def metrics():
+    # The page is off until a token is configured, the scraper sends it as a bearer token
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        abort(404)
+    sent = request.headers.get('Authorization', '')
+    # Compared in constant time so the token cannot be guessed from response times
+    if not hmac.compare_digest(sent.encode(), ('Bearer ' + token).encode()):
+        abort(403)
+
+    body, content_type = export()
+    return Response(body, content_type=content_type)
@@ -6,16 +6,13 @@
 #                                                 #
 ###################################################
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
+from flask import Flask, render_template, request, redirect, url_for, session
 from databaseHelpers.threshold import *
 from databaseHelpers.restaurant import *
 from databaseHelpers.employee import *
 
-milestones_page = Blueprint('milestones_page', __name__, template_folder='templates')
 
 # The registration options page
-@milestones_page.route('/milestones.html', methods=['GET', 'POST'])
-@milestones_page.route('/milestones', methods=['GET', 'POST'])
 def settings():
     # If someone is already logged in they get redirected to the home page
     if 'account' not in session:
@@ -4,15 +4,12 @@
 #                                                 #
 ###################################################
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
-profile_page = Blueprint('profile_page', __name__, template_folder='templates')
+from flask import Flask, render_template, request, redirect, url_for, session
 from databaseHelpers.user import *
 
 from databaseHelpers.restaurant import *
 
 
-@profile_page.route('/profile.html')
-@profile_page.route('/profile')
 def profile():
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -29,8 +26,6 @@ def profile():
 
         return render_template('profile.html', user = user)
 
-@profile_page.route('/editRestaurantInfo.html', methods=['GET', 'POST'])
-@profile_page.route('/editRestaurantInfo', methods=['GET', 'POST'])
 def edit_restaurant_info():
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -6,16 +6,13 @@
 #                                                 #
 ###################################################
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
+from flask import Flask, render_template, request, redirect, url_for, session
 from databaseHelpers.user import *
 from databaseHelpers.restaurant import *
 from databaseHelpers.employee import *
 
-registration_page = Blueprint('registration_page', __name__, template_folder='templates')
 
 # The registration options page
-@registration_page.route('/registration.html')
-@registration_page.route('/registration')
 def registration():
     # If someone is already logged in they get redirected to the home page
     if 'account' in session:
@@ -25,8 +22,6 @@ def registration():
 
 
 # Customer register
-@registration_page.route('/registration0', methods=['GET', 'POST'])
-@registration_page.route('/registration0.html', methods=['GET', 'POST'])
 def user_register():
     # If someone is already logged in they get redirected to the home page
     if 'account' in session:
@@ -48,8 +43,6 @@ def user_register():
 
 
 # Owner register
-@registration_page.route('/registration1', methods=['GET', 'POST'])
-@registration_page.route('/registration1.html', methods=['GET', 'POST'])
 def owner_register():
     # If someone is already logged in they get redirected to the home page
     if 'account' in session:
@@ -76,10 +69,7 @@ def owner_register():
     return render_template("registration1.html", errmsg=errmsg)
 
 
-
 # Employee registration
-@registration_page.route('/registration2', methods=['GET', 'POST'])
-@registration_page.route('/registration2.html', methods=['GET', 'POST'])
 def employee_register():
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -108,9 +98,6 @@ def employee_register():
     return render_template("registration2.html", errmsg=errmsg)
 
 
-@registration_page.route('/login', methods=['GET', 'POST'])
-@registration_page.route('/login.html', methods=['GET', 'POST'])
-@registration_page.route('/', methods = ['GET', 'POST'])
 def login():
     # This runs when the user presses the login button
     if request.method == 'POST':
@@ -1,17 +1,13 @@
 
 
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
+from flask import Flask, render_template, request, redirect, url_for, session
 from databaseHelpers.experience import *
 from databaseHelpers.favourite import *
 
-restaurant_page = Blueprint('restaurant_page', __name__, template_folder='templates')
-
 
 # The home landing page
 # Currently nothing is here
-@restaurant_page.route('/favourites', methods=['GET', 'POST'])
-@restaurant_page.route('/favourites.html', methods=['GET', 'POST'])
 def favourites():
     if 'account' not in session:
         return redirect(url_for('login_page.login'))
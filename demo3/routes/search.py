@@ -6,7 +6,7 @@
 #                                                 #
 ###################################################
 
-from flask import Flask, render_template, request, redirect, url_for, session, Blueprint
+from flask import Flask, render_template, request, redirect, url_for, session
 from databaseHelpers.restaurant import *
 from databaseHelpers.coupon import *
 from databaseHelpers.qr_code import *
@@ -18,12 +18,13 @@ from databaseHelpers.experience import *
 from databaseHelpers.level import *
 from databaseHelpers.threshold import *
 from databaseHelpers.leaderboard import *
+from instrumentation.metrics import count_purchase
 from databaseHelpers.favourite import *
-search_page = Blueprint('search_page', __name__, template_folder='templates')
+
+# The purchasable argument of get_coupon_catalog for each couponOffers filter
+PURCHASABLE_FILTERS = {'all': None, 'purchasable': True, 'notpurchasable': False}
 
 
-@search_page.route('/search.html', methods=['GET', 'POST'])
-@search_page.route('/search', methods=['GET', 'POST'])
 def search():
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -46,8 +47,6 @@ def search():
 
 # Referenced from
 # https://stackoverflow.com/questions/28229668/python-flask-how-to-get-route-id-from-url
-@search_page.route('/restaurant<rid>.html', methods=['GET', 'POST'])
-@search_page.route('/restaurant<rid>', methods=['GET', 'POST'])
 def restaurant(rid):
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -70,8 +69,7 @@ def restaurant(rid):
 
         # Gets coupons
         rname = get_restaurant_name_by_rid(rid)
-        coupons = filter_valid_coupons(get_coupons(rid))[-3:]
-        coupons.reverse()
+        coupons = get_coupon_catalog(rid, sort = 'newest', per_page = 3)
 
         # Gets achievements
         achievements = get_recently_started_achievements(get_achievements_by_rid(rid), session['account'])
@@ -95,9 +93,6 @@ def restaurant(rid):
         return redirect(url_for('home_page.home'))
 
 
-
-@search_page.route('/couponOffers<rid>.html', methods=['GET', 'POST'])
-@search_page.route('/couponOffers<rid>', methods=['GET', 'POST'])
 def couponOffers(rid):
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -110,11 +105,11 @@ def couponOffers(rid):
     restaurant = get_resturant_by_rid(rid)
     if restaurant:
         rname = get_restaurant_name_by_rid(rid)
-        coupons = filter_valid_coupons(get_coupons(rid))
-        coupons.sort(key=lambda x: x.get('level'))
         points = get_points(session['account'], rid).points
         level = convert_experience_to_level(get_experience(session['account'], rid).experience)
         filter = "all"
+        bought = None
+        errmsg = None
         if 'cid' in request.form:
             cid = request.form['cid']
             c = get_coupon_by_cid(cid)
@@ -124,28 +119,32 @@ def couponOffers(rid):
             if c['points'] <= points and c['clevel'] <= level:
                 update_points(session['account'], rid, (-1 * c['points']))
                 insert_redeemed_coupon(cid, session['account'], rid)
+                count_purchase('success')
                 points = get_points(session['account'], rid).points
-                return render_template("couponOffers.html", rid = rid, rname = rname, coupons = coupons, points = points, level = level, bought = c['cname'], filter = filter)
+                bought = c['cname']
 
             # not enough points
-            if c['points'] > points:
+            elif c['points'] > points:
                 errmsg.append("You do not have enough points for this coupon.")
+                count_purchase('points')
 
             # not enough level
             if c['clevel'] > level:
                 errmsg.append("You do not have high enough level to purchase this coupon.")
+                count_purchase('level')
 
-            return render_template("couponOffers.html", rid = rid, rname = rname, coupons = coupons, points = points, level = level, errmsg = errmsg, filter = filter)
         elif request.method == 'POST' and 'purchasable' in request.form:
             filter = "purchasable"
         elif request.method == 'POST' and 'notpurchasable' in request.form:
             filter = "notpurchasable"
-        return render_template("couponOffers.html", rid = rid, rname = rname, coupons = coupons, points = points, level = level, filter = filter)
+
+        # The catalog is read after a purchase, with the points left
+        coupons = get_coupon_catalog(rid, points = points, level = level, purchasable = PURCHASABLE_FILTERS[filter])
+        return render_template("couponOffers.html", rid = rid, rname = rname, coupons = coupons, points = points,
+                               level = level, bought = bought, errmsg = errmsg, filter = filter)
     else:
         return redirect(url_for('home_page.home'))
 
-@search_page.route('/availableAchievements<rid>.html', methods=['GET', 'POST'])
-@search_page.route('/availableAchievements<rid>', methods=['GET', 'POST'])
 def restaurantAchievements(rid):
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -178,8 +177,6 @@ def restaurantAchievements(rid):
         return redirect(url_for('home_page.home'))
 
 
-@search_page.route('/milestones<rid>.html', methods=['GET', 'POST'])
-@search_page.route('/milestones<rid>', methods=['GET', 'POST'])
 def milestones(rid):
     # If someone is not logged in redirects them to login page
     if 'account' not in session:
@@ -210,7 +207,6 @@ def milestones(rid):
 
 
 # View customer leader board
-@search_page.route('/leaderBoard<rid>', methods=['GET', 'POST'])
 def leaderBoard(rid):
     rname = get_restaurant_name_by_rid(rid)
     # If someone is not logged in redirects them to login page
@@ -0,0 +1,191 @@
+###################################################
+#                                                 #
+#   The URL rules of every blueprint. Views are   #
+#   imported on their first request, so starting  #
+#   the app does not import the route modules     #
+#   and the helpers they use.                     #
+#                                                 #
+###################################################
+
+# Lazy loading of views comes from
+# https://flask.palletsprojects.com/en/1.1.x/patterns/lazyloading/
+
+from flask import Blueprint
+from werkzeug.utils import cached_property, import_string
+
+GET_POST = ['GET', 'POST']
+POST = ['POST']
+
+
+class LazyView(object):
+    """
+    A view function imported from its module on the first call.
+    """
+
+    def __init__(self, import_name):
+        self.__module__, self.__name__ = import_name.rsplit('.', 1)
+        self.import_name = import_name
+
+    @cached_property
+    def view(self):
+        return import_string(self.import_name)
+
+    def __call__(self, *args, **kwargs):
+        return self.view(*args, **kwargs)
+
+
+def lazy_blueprint(name, module, rules):
+    """
+    Creates a blueprint whose views are imported from module when first used.
+
+    Args:
+        name: The name of the blueprint, which prefixes its endpoints.
+        module: The import name of the module defining the views.
+        rules: A list of (rule, view name) or (rule, view name, methods)
+          tuples, in the order url_for prefers them.
+
+    Returns:
+        The blueprint.
+    """
+    blueprint = Blueprint(name, __name__)
+    # Flask requires the rules of an endpoint to share one view function
+    views = {}
+    for rule in rules:
+        url, view = rule[:2]
+        methods = rule[2] if len(rule) > 2 else None
+        if view not in views:
+            views[view] = LazyView('%s.%s' % (module, view))
+        blueprint.add_url_rule(url, view, views[view], methods=methods)
+    return blueprint
+
+
+def load_views(app):
+    """
+    Imports every view of app, e.g. before gunicorn forks its workers so
+    they share the imported modules.
+
+    Returns:
+        None.
+    """
+    for view in app.view_functions.values():
+        if isinstance(view, LazyView):
+            view.view
+    return None
+
+
+registration_page = lazy_blueprint('registration_page', 'routes.registration', [
+    ('/registration', 'registration'),
+    ('/registration.html', 'registration'),
+    ('/registration0.html', 'user_register', GET_POST),
+    ('/registration0', 'user_register', GET_POST),
+    ('/registration1.html', 'owner_register', GET_POST),
+    ('/registration1', 'owner_register', GET_POST),
+    ('/registration2.html', 'employee_register', GET_POST),
+    ('/registration2', 'employee_register', GET_POST),
+    ('/', 'login', GET_POST),
+    ('/login.html', 'login', GET_POST),
+    ('/login', 'login', GET_POST),
+])
+
+coupon_page = lazy_blueprint('coupon_page', 'routes.coupon', [
+    ('/coupon', 'coupon', GET_POST),
+    ('/coupon.html', 'coupon', GET_POST),
+    ('/createCoupon', 'create_coupon', GET_POST),
+    ('/createCoupon.html', 'create_coupon', GET_POST),
+    ('/couponStats', 'couponStats', GET_POST),
+    ('/couponStats.html', 'couponStats', GET_POST),
+    ('/useCoupon/<uid>/<cid>', 'use_coupon', GET_POST),
+])
+
+achievement_page = lazy_blueprint('achievement_page', 'routes.achievement', [
+    ('/achievement', 'achievement', GET_POST),
+    ('/achievement.html', 'achievement', GET_POST),
+    ('/createAchievement', 'create_achievement', GET_POST),
+    ('/createAchievement.html', 'create_achievement', GET_POST),
+    ('/achievementStats', 'achievement_stats', GET_POST),
+    ('/achievementStats.html', 'achievement_stats', GET_POST),
+    ('/verifyAchievement/<aid>/<uid>', 'use_achievement', GET_POST),
+    ('/receipts', 'receipts', POST),
+])
+
+home_page = lazy_blueprint('home_page', 'routes.home', [
+    ('/home.html', 'home'),
+    ('/home', 'home'),
+])
+
+employee_page = lazy_blueprint('employee_page', 'routes.employee', [
+    ('/employee', 'employee', GET_POST),
+    ('/employee.html', 'employee', GET_POST),
+])
+
+profile_page = lazy_blueprint('profile_page', 'routes.profile', [
+    ('/profile', 'profile'),
+    ('/profile.html', 'profile'),
+    ('/editRestaurantInfo', 'edit_restaurant_info', GET_POST),
+    ('/editRestaurantInfo.html', 'edit_restaurant_info', GET_POST),
+])
+
+search_page = lazy_blueprint('search_page', 'routes.search', [
+    ('/search', 'search', GET_POST),
+    ('/search.html', 'search', GET_POST),
+    ('/restaurant<rid>', 'restaurant', GET_POST),
+    ('/restaurant<rid>.html', 'restaurant', GET_POST),
+    ('/couponOffers<rid>', 'couponOffers', GET_POST),
+    ('/couponOffers<rid>.html', 'couponOffers', GET_POST),
+    ('/availableAchievements<rid>', 'restaurantAchievements', GET_POST),
+    ('/availableAchievements<rid>.html', 'restaurantAchievements', GET_POST),
+    ('/milestones<rid>', 'milestones', GET_POST),
+    ('/milestones<rid>.html', 'milestones', GET_POST),
+    ('/leaderBoard<rid>', 'leaderBoard', GET_POST),
+])
+
+login_page = lazy_blueprint('login_page', 'routes.login', [
+    ('/', 'login', GET_POST),
+    ('/login.html', 'login', GET_POST),
+    ('/login', 'login', GET_POST),
+    ('/logout.html', 'logout'),
+    ('/logout', 'logout'),
+])
+
+qr_page = lazy_blueprint('qr_page', 'routes.qrCode', [
+    ('/scanFailure<rname>', 'scan_failure'),
+    ('/scanFailure<rname>.html', 'scan_failure'),
+    ('/scanSuccessful', 'scan_successful'),
+    ('/scanSuccessful.html', 'scan_successful'),
+    ('/scanNonexistent<scanType>', 'scan_nonexistent'),
+    ('/scanNonexistent<scanType>.html', 'scan_nonexistent'),
+    ('/scan<itemType>Forbidden<forbiddenType>', 'scan_forbidden'),
+    ('/scan<itemType>Forbidden<forbiddenType>.html', 'scan_forbidden'),
+])
+
+milestones_page = lazy_blueprint('milestones_page', 'routes.milestones', [
+    ('/milestones', 'settings', GET_POST),
+    ('/milestones.html', 'settings', GET_POST),
+])
+
+restaurant_page = lazy_blueprint('restaurant_page', 'routes.restaurant', [
+    ('/favourites.html', 'favourites', GET_POST),
+    ('/favourites', 'favourites', GET_POST),
+])
+
+leaderboard_page = lazy_blueprint('leaderboard_page', 'routes.leaderboard', [
+    ('/leaderBoard', 'leaderboard', GET_POST),
+    ('/leaderBoard.html', 'leaderboard', GET_POST),
+])
+
+metrics_page = lazy_blueprint('metrics_page', 'routes.metrics', [
+    ('/metrics', 'metrics'),
+])
+
+admin_page = lazy_blueprint('admin_page', 'routes.admin', [
+    ('/adminProfiles', 'profiles'),
+    ('/adminProfiles.html', 'profiles'),
+    ('/adminProfiles/<name>', 'profile_file'),
+    ('/adminMemory', 'memory', GET_POST),
+    ('/adminMemory.html', 'memory', GET_POST),
+])
+
+# Registered in this order, the first blueprint matching a URL serves it
+blueprints = [registration_page, coupon_page, achievement_page, home_page, employee_page,
+              profile_page, search_page, login_page, qr_page, milestones_page,
+              restaurant_page, leaderboard_page, metrics_page, admin_page]
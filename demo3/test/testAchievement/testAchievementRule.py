@@ -0,0 +1,87 @@
+import unittest
+import pytest
+import datetime
+from app import app
+from databaseHelpers.achievement import *
+from models import db
+from models import Achievements
+from instrumentation.queries import count_queries
+
+@pytest.mark.usefixtures('database')
+class AchievementRuleTest(unittest.TestCase):
+    """
+    Tests compile_achievement() and get_achievement_rule() in databaseHelpers/achievement.py.
+    """
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
+        self.app = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+
+    def test_compile(self):
+        """
+        Tests compiling a dated type 0 and an indefinite type 1 achievement. Expect the parsed values.
+        """
+        rule = compile_achievement(Achievements(aid=1, rid=12, name="test", points=10, experience=15, type=0,
+                                                value="Item;5;False;2020-08-1;2099-08-31"))
+        self.assertEqual((rule.item, rule.quantity, rule.progress_max), ("Item", 5, 5))
+        self.assertEqual((rule.begin, rule.expiration), (datetime.date(2020, 8, 1), datetime.date(2099, 8, 31)))
+        self.assertEqual(rule.description, "Buy Item 5 times between 2020-08-1 and 2099-08-31.")
+        self.assertEqual(rule.date_status(datetime.date(2020, 7, 31)), -1)
+        self.assertEqual(rule.date_status(), 0)
+        rule = compile_achievement(Achievements(aid=2, rid=12, name="test", points=10, experience=15, type=1,
+                                                value=";6.99;True;;"))
+        self.assertEqual((rule.quantity, rule.progress_max, rule.expiration), (6.99, 1, None))
+        with self.assertRaises(AttributeError):
+            rule.points = 0
+
+    def test_cached(self):
+        """
+        Tests getting a rule twice. Expect its row read each time but the rule compiled once, and None for an
+        achievement that does not exist.
+        """
+        insert_achievement(12, "test", 10, 10, 3, ";4;True;;")
+        aid = Achievements.query.first().aid
+        with count_queries() as log:
+            first = get_achievement_rule(aid)
+            second = get_achievement_rule(aid)
+        self.assertIs(first, second)
+        self.assertEqual(log.count, 2)
+        self.assertIsNone(get_achievement_rule(aid + 1))
+
+    def test_delete_and_insert_invalidate(self):
+        """
+        Tests deleting a cached achievement and inserting another one with the same aid. Expect the new rule.
+        """
+        insert_achievement(12, "old", 10, 10, 3, ";4;True;;")
+        aid = Achievements.query.first().aid
+        self.assertEqual(get_achievement_rule(aid).name, "old")
+        delete_achievement(aid)
+        self.assertIsNone(get_achievement_rule(aid))
+        insert_achievement(12, "new", 10, 10, 3, ";4;True;;")
+        self.assertEqual(Achievements.query.first().aid, aid)
+        self.assertEqual(get_achievement_rule(aid).name, "new")
+
+    def test_changed_by_another_process(self):
+        """
+        Tests an achievement deleted and its aid given to another one without the cache of this process being
+        cleared. Expect the rule of the current row.
+        """
+        insert_achievement(12, "old", 10, 10, 3, ";4;True;;")
+        aid = Achievements.query.first().aid
+        self.assertEqual(get_achievement_rule(aid).name, "old")
+        Achievements.query.filter(Achievements.aid == aid).delete()
+        self.assertIsNone(get_achievement_rule(aid))
+        db.session.add(Achievements(aid=aid, rid=12, name="new", experience=10, points=10, type=3, value=";4;True;;"))
+        self.assertEqual(get_achievement_rule(aid).name, "new")
+        self.assertEqual(get_rule(Achievements.query.first()).name, "new")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,14 @@
 import unittest
+import pytest
 from app import app
 from databaseHelpers.achievement import *
 from models import db
-from models import Achievements
+from models import Achievements, Customer_Achievement_Progress
 
 # The idea of how to do unittest set up in flask comes from
 # https://www.patricksoftwareblog.com/unit-testing-a-flask-application/
 
+@pytest.mark.usefixtures('database')
 class DeleteAchievementTest(unittest.TestCase):
     """
     Test function on deleting achievement
@@ -14,13 +16,14 @@ class DeleteAchievementTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_delete_one_achievement(self):
         """
@@ -38,6 +41,20 @@ class DeleteAchievementTest(unittest.TestCase):
         self.assertIsNone(a1)
         self.assertIsNotNone(a2)
 
+    def test_delete_achievement_progress(self):
+        """
+        Test delete on an achievement customers progressed on. Expect its progress deleted with it.
+        """
+        db.session.add(Achievements(aid=32, rid=12, name='test', experience=10, points=10, type=1, value='test'))
+        db.session.add(Achievements(aid=22, rid=12, name='test', experience=10, points=10, type=1, value='test'))
+        db.session.add(Customer_Achievement_Progress(aid=32, uid=5, progress=1, total=5))
+        db.session.add(Customer_Achievement_Progress(aid=32, uid=6, progress=2, total=5))
+        db.session.add(Customer_Achievement_Progress(aid=22, uid=5, progress=3, total=5))
+        db.session.commit()
+        errmsg = delete_achievement(32)
+        self.assertEqual(errmsg, None)
+        self.assertEqual([(p.aid, p.uid) for p in Customer_Achievement_Progress.query.all()], [(22, 5)])
+
     def test_delete_non_exist_achievement(self):
         """
         Test delete on a non-existing achievement
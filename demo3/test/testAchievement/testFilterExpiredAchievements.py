@@ -1,4 +1,5 @@
 import unittest
+import pytest
 from app import app
 from databaseHelpers.achievement import *
 from models import db
@@ -10,6 +11,7 @@ END_VALID = datetime.strptime("30 June, 2099", "%d %B, %Y")
 END_EXPIRED = datetime.strptime("30 June, 2019", "%d %B, %Y")
 
 
+@pytest.mark.usefixtures('database')
 class FilterExpiredAchievementTest(unittest.TestCase):
     """
     Test filter_expired_achievements() in achievement.py.
@@ -17,13 +19,14 @@ class FilterExpiredAchievementTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_no_expired_achievements(self):
         """
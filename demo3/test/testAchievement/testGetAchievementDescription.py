@@ -1,10 +1,12 @@
 import unittest
+import pytest
 from app import app
 from databaseHelpers.achievement import *
 from models import db
 from models import Achievements
 
 
+@pytest.mark.usefixtures('database')
 class TestGetDescp(unittest.TestCase):
     """
     Tests get_achievement_description() in databaseHelpers/achievement.py
@@ -13,13 +15,14 @@ class TestGetDescp(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_get_description(self):
         """
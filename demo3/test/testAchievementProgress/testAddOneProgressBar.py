@@ -1,10 +1,12 @@
 import unittest
+import pytest
 from models import Customer_Achievement_Progress, Points, User, Achievements
 from models import db
 from app import app
 from databaseHelpers import achievementProgress as achievementhelper
 
 
+@pytest.mark.usefixtures('database')
 class Get_Exact_Customer_Achievement_ProgressTest(unittest.TestCase):
     """
     Tests add_one_progress_bar() in achievementProgress.py
@@ -13,13 +15,14 @@ class Get_Exact_Customer_Achievement_ProgressTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_add_non_complete(self):
         """
@@ -73,6 +76,20 @@ class Get_Exact_Customer_Achievement_ProgressTest(unittest.TestCase):
         self.assertEqual(points.points, 40)
         self.assertEqual(ap.progress, 1)
 
+    def test_add_deleted(self):
+        """
+        Test make progress on an achievement whose rule is cached but which was deleted since, this is invalid
+        and no progress is inserted.
+        """
+        user = User(uid=3, name='cus', password='passwd', email='test', type=-1)
+        achievement = Achievements(aid=1, rid=1, name='test', experience=20, points=20, type=3, value=';5')
+        db.session.add(user)
+        db.session.add(achievement)
+        db.session.commit()
+        achievementhelper.get_achievement_rule(1)
+        Achievements.query.filter(Achievements.aid == 1).delete()
+        achievementhelper.add_one_progress_bar('Not Found', 1, 3)
+        self.assertEqual(Customer_Achievement_Progress.query.count(), 0)
 
 
 if __name__ == "__main__":
@@ -1,12 +1,15 @@
 import unittest
+import pytest
 from models import Customer_Achievement_Progress, Achievements
 from models import db
 import time
 from datetime import datetime
 from app import app
 from databaseHelpers import achievementProgress as achievementhelper
+from instrumentation.queries import count_queries
 
 
+@pytest.mark.usefixtures('database')
 class TestGetAchievementProgressbByUid(unittest.TestCase):
     """
     Tests get_achievement_progress_by_uid() in achievementProgress.py
@@ -15,13 +18,14 @@ class TestGetAchievementProgressbByUid(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_get_nonexistent_achievement_progress(self):
         """
@@ -86,6 +90,20 @@ class TestGetAchievementProgressbByUid(unittest.TestCase):
                                                       'progressMax': 5,
                                                       'uid': 5, 'update': None}])
 
+    def test_single_query(self):
+        """
+        Tests get_achievement_progress_by_uid() with many achievements. Expect one query, without
+        reading the achievements.
+        """
+        for aid in range(10, 40):
+            db.session.add(Achievements(aid=aid, rid=12, name='test', experience=1, points=1, type=1, value='test'))
+            db.session.add(Customer_Achievement_Progress(uid=5, aid=aid, progress=1, total=5))
+        db.session.commit()
+        with count_queries() as log:
+            achievement_progress_list = achievementhelper.get_achievement_progress_by_uid(5)
+        self.assertEqual(len(achievement_progress_list), 30)
+        self.assertEqual(log.count, 1)
+
     def achievement_list_helper(self):
         return [{"aid": 10,
                  "name": "test",
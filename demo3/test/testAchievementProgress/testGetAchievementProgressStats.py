@@ -1,10 +1,12 @@
 import unittest
+import pytest
 from models import Customer_Achievement_Progress, Achievements
 from models import db
 from app import app
 from databaseHelpers.achievementProgress import *
 
 
+@pytest.mark.usefixtures('database')
 class GetProgressCompletionStatusTest(unittest.TestCase):
     """
     Tests get_achievement_progress_stats(achievements) in achievementProgress.py
@@ -13,13 +15,14 @@ class GetProgressCompletionStatusTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_no_achievements(self):
         """
@@ -1,10 +1,12 @@
 import unittest
+import pytest
 from models import Customer_Achievement_Progress
 from models import db
 from app import app
 from databaseHelpers import achievementProgress as achievementhelper
 
 
+@pytest.mark.usefixtures('database')
 class Get_Exact_Customer_Achievement_ProgressTest(unittest.TestCase):
     """
     Tests get_exact_achivement_progress() in achievementProgress.py
@@ -13,13 +15,14 @@ class Get_Exact_Customer_Achievement_ProgressTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_normal_found(self):
         """
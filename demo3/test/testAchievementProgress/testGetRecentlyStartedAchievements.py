@@ -1,4 +1,5 @@
 import unittest
+import pytest
 from models import Customer_Achievement_Progress, Achievements
 from models import db
 import time
@@ -7,6 +8,7 @@ from app import app
 from databaseHelpers import achievementProgress as achievementhelper
 
 
+@pytest.mark.usefixtures('database')
 class TestGetRecentlyStartedAchievements(unittest.TestCase):
     """
     Tests get_recently_started_achievements() in achievementProgress.py
@@ -15,13 +17,14 @@ class TestGetRecentlyStartedAchievements(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_get_recent_achievements_no_achievements_to_filter(self):
         """
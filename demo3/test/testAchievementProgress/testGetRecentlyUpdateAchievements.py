@@ -1,4 +1,5 @@
 import unittest
+import pytest
 from models import Customer_Achievement_Progress, Achievements, Restaurant
 from models import db
 from datetime import datetime
@@ -13,6 +14,7 @@ BIG = datetime(2030, 6, 1)
 SMALL = datetime(2000, 2, 2)
 
 
+@pytest.mark.usefixtures('database')
 class GetRecentlyUpdate(unittest.TestCase):
     """
     Tests get_recently_update_achievements() in databaseHelpers/achievementProgress.py.
@@ -21,13 +23,14 @@ class GetRecentlyUpdate(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_sort_on_short(self):
         """
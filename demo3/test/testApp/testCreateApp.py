@@ -0,0 +1,63 @@
+import unittest
+from models import Restaurant
+from app import create_app
+from databaseHelpers.restaurant import *
+from databaseHelpers.threshold import get_incomplete_milestones, insert_threshold
+from databaseHelpers.achievement import get_achievement_rule, insert_achievement
+
+
+class CreateAppTest(unittest.TestCase):
+    """
+    Test create_app() in app.py
+    """
+    def setUp(self):
+        self.first = create_app(TESTING = True, SQLALCHEMY_DATABASE_URI = 'sqlite://')
+        self.second = create_app(TESTING = True, SQLALCHEMY_DATABASE_URI = 'sqlite://')
+        for app in (self.first, self.second):
+            with app.app_context():
+                db.create_all()
+
+    def test_apps_are_isolated(self):
+        """
+        Test two apps in one process use their own database. Expect a row added through one app to be missing from the other.
+        """
+        with self.first.app_context():
+            insert_new_restaurant("first", "1 Main street", 1)
+        with self.second.app_context():
+            self.assertEqual(get_resturant_by_name("first"), [])
+        with self.first.app_context():
+            self.assertEqual(get_restaurant_name_by_rid(1), "first")
+
+    def test_caches_are_isolated(self):
+        """
+        Test the threshold and achievement rule caches of two apps in one process. Expect each app to see the
+        thresholds and rules of its own database only.
+        """
+        with self.first.app_context():
+            insert_threshold(1, 5, 100)
+            insert_achievement(1, "first", 10, 10, 3, ";4;True;;")
+            self.assertEqual(get_incomplete_milestones(1, 0), [{"rid": 1, "level": 5, "reward": 100}])
+            self.assertEqual(get_achievement_rule(1).name, "first")
+        with self.second.app_context():
+            self.assertEqual(get_incomplete_milestones(1, 0), [])
+            self.assertIsNone(get_achievement_rule(1))
+            insert_achievement(1, "second", 10, 10, 3, ";4;True;;")
+            self.assertEqual(get_achievement_rule(1).name, "second")
+        with self.first.app_context():
+            self.assertEqual(get_achievement_rule(1).name, "first")
+
+    def test_engine_options(self):
+        """
+        Test the engine options are read from the app's own config. Expect pre ping and echo to follow each app.
+        """
+        app = create_app(SQLALCHEMY_DATABASE_URI = 'sqlite://', DB_POOL_PRE_PING = False, SQLALCHEMY_ECHO = True)
+        with app.app_context():
+            self.assertFalse(db.engine.pool._pre_ping)
+            self.assertTrue(db.engine.echo)
+        with self.first.app_context():
+            self.assertTrue(db.engine.pool._pre_ping)
+            self.assertFalse(db.engine.echo)
+
+
+if __name__ == "__main__":
+    unittest.main()
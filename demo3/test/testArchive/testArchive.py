@@ -0,0 +1,151 @@
+import unittest
+import pytest
+import datetime
+from app import app
+from databaseHelpers.archive import archive, archive_achievement, get_archived_coupons_by_uid, \
+    get_archived_coupons_by_rid, get_archived_achievements_by_uid, get_archived_achievement_stats
+from databaseHelpers.redeemedCoupons import get_redeemed_coupons_by_rid, get_redeemed_coupons_by_uid
+from databaseHelpers.achievement import get_achievement_rule
+from models import db
+from models import User, Restaurant, Coupon, Redeemed_Coupons, Achievements, Customer_Achievement_Progress, \
+    Archived_Coupon, Archived_Redeemed_Coupons, Archived_Achievements, Archived_Achievement_Progress
+
+TODAY = datetime.date(2026, 10, 19)
+
+
+@pytest.mark.usefixtures('database')
+class ArchiveTest(unittest.TestCase):
+    """
+    Tests archive() and the archive history helpers in databaseHelpers/archive.py
+    """
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.session.add_all([User(uid=1, name='owner', password='passwd', email='owner@test', type=1),
+                            User(uid=2, name='cus', password='passwd', email='cus@test', type=-1),
+                            Restaurant(rid=1, name='test', address='1 test street', uid=1)])
+        # cid 1 active, 2 expired more than 6 months ago, 3 deleted, 4 deleted and still held
+        for cid, expiration, deleted in [(1, None, 0), (2, datetime.date(2026, 1, 1), 0),
+                                         (3, None, 1), (4, None, 1)]:
+            db.session.add(Coupon(cid=cid, rid=1, name='coupon %d' % cid, points=10, description='1$ off', level=0,
+                                  expiration=expiration, begin=datetime.date(2025, 1, 1) if expiration else None,
+                                  deleted=deleted))
+        # rcid 1 to 7
+        for cid, valid in [(1, 1), (1, 0), (1, 0), (2, 1), (2, 0), (3, 0), (4, 1)]:
+            db.session.add(Redeemed_Coupons(cid=cid, uid=2, rid=1, valid=valid))
+        # aid 1 expired more than 6 months ago, 2 expired recently
+        db.session.add_all([Achievements(aid=1, rid=1, name='old', experience=10, points=10, type=3,
+                                         value=';2;False;2025-1-1;2026-1-31'),
+                            Achievements(aid=2, rid=1, name='recent', experience=10, points=10, type=3,
+                                         value=';2;False;2025-1-1;2026-9-30')])
+        db.session.add_all([Customer_Achievement_Progress(aid=1, uid=uid, progress=progress, total=2,
+                                                          update=datetime.datetime(2026, 1, uid))
+                            for uid, progress in [(2, 1), (3, 2), (4, 2)]])
+        db.session.add(Customer_Achievement_Progress(aid=2, uid=2, progress=1, total=2))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+
+    def counts(self):
+        return dict((c['cid'], (c['holders'], c['used'])) for c in get_redeemed_coupons_by_rid(1))
+
+    def test_archive(self):
+        """
+        Tests archiving in chunks of 2. Expect the used and expired redemptions, the deleted coupon no one holds
+        and the old achievement with its progress moved, and the statistics unchanged.
+        """
+        before = self.counts()
+        get_achievement_rule(1)
+        stats = archive(TODAY, chunk_size=2, log=lambda message: None)
+        self.assertEqual(stats, {'redemptions': 5, 'coupons': 1, 'achievements': 1, 'progress': 3})
+        self.assertEqual(sorted(r.rcid for r in Redeemed_Coupons.query), [1, 7])
+        self.assertEqual(sorted(c.cid for c in Coupon.query), [1, 2, 4])
+        self.assertEqual([a.aid for a in Achievements.query], [2])
+        self.assertEqual([p.aid for p in Customer_Achievement_Progress.query], [2])
+        self.assertIsNone(get_achievement_rule(1))
+        del before[3]
+        self.assertEqual(self.counts(), before)
+        archived = Archived_Coupon.query.one()
+        self.assertEqual((archived.cid, archived.archived_used), (3, 1))
+        archived = Archived_Achievements.query.one()
+        self.assertEqual((archived.aid, archived.started, archived.completed), (1, 3, 2))
+
+    def test_archive_again(self):
+        """
+        Tests archiving twice. Expect nothing more archived the second time.
+        """
+        archive(TODAY, log=lambda message: None)
+        self.assertEqual(archive(TODAY, log=lambda message: None),
+                         {'redemptions': 0, 'coupons': 0, 'achievements': 0, 'progress': 0})
+        self.assertEqual(Archived_Redeemed_Coupons.query.count(), 5)
+        self.assertEqual(Archived_Achievement_Progress.query.count(), 3)
+
+    def test_resume_achievement(self):
+        """
+        Tests archiving an achievement whose progress was partly archived by an archival that stopped.
+        Expect every entry linked to the archived achievement.
+        """
+        db.session.add(Archived_Achievement_Progress(aid=1, uid=5, progress=2, total=2,
+                                                     archived=datetime.datetime.now()))
+        db.session.commit()
+        self.assertEqual(archive_achievement(1), 3)
+        archived = Archived_Achievements.query.one()
+        self.assertEqual((archived.started, archived.completed), (4, 3))
+        self.assertEqual(Archived_Achievement_Progress.query.filter_by(achievement_id=archived.id).count(), 4)
+
+    def test_missing_achievement(self):
+        """
+        Tests archiving an achievement that does not exist. Expect it skipped and logged, and nothing archived.
+        """
+        messages = []
+        self.assertIsNone(archive_achievement(3, log = messages.append))
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(Archived_Achievements.query.count(), 0)
+
+    def test_stats_pages(self):
+        """
+        Tests the owner's coupon and achievement statistics once archived. Expect the archived coupon under the
+        deleted filter with its counters, and the archived achievement as expired.
+        """
+        archive(TODAY, log=lambda message: None)
+        self.assertEqual([(c['cid'], c['holders'], c['used']) for c in get_archived_coupons_by_rid(1, 'deleted')],
+                         [(3, 0, 1)])
+        self.assertEqual(get_archived_coupons_by_rid(1, 'active'), [])
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['account'] = 1
+            session['type'] = 1
+        page = client.post('/couponStats', data = {'deleted': 'deleted'}).get_data(as_text = True)
+        self.assertIn('coupon 3', page)
+        self.assertIn('coupon 4', page)
+        page = client.post('/achievementStats', data = {'expired': 'expired'}).get_data(as_text = True)
+        self.assertIn("Visit 2 times between 2025-1-1 and 2026-1-31.", page)
+        self.assertIn("Visit 2 times between 2025-1-1 and 2026-9-30.", page)
+
+    def test_history(self):
+        """
+        Tests the history of the customer and restaurant once archived. Expect the archived rows.
+        """
+        archive(TODAY, log=lambda message: None)
+        coupons = get_archived_coupons_by_uid(2)
+        self.assertEqual([(c['rcid'], c['cname'], c['used']) for c in coupons],
+                         [(6, 'coupon 3', True), (5, 'coupon 2', True), (4, 'coupon 2', False),
+                          (3, 'coupon 1', True), (2, 'coupon 1', True)])
+        self.assertEqual(coupons[0]['rname'], 'test')
+        achievements = get_archived_achievements_by_uid(2)
+        self.assertEqual(len(achievements), 1)
+        self.assertEqual(achievements[0]['description'], "Visit 2 times between 2025-1-1 and 2026-1-31.")
+        self.assertEqual((achievements[0]['progress'], achievements[0]['progressMax']), (1, 2))
+        stats = get_archived_achievement_stats(1)
+        self.assertEqual([(a['aid'], a['in progress'], a['complete']) for a in stats], [(1, 1, 2)])
+        self.assertEqual([c['cid'] for c in get_redeemed_coupons_by_uid(2)], [1, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
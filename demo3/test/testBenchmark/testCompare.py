@@ -0,0 +1,63 @@
+import unittest
+from benchmarks.compare import compare
+
+
+def result(p50, p95, queries, errors = 0):
+    return {'p50': p50, 'p95': p95, 'mean': p50, 'queries': queries, 'iterations': 10, 'errors': errors}
+
+
+class CompareTest(unittest.TestCase):
+    """
+    Test compare() in benchmarks/compare.py
+    """
+    def setUp(self):
+        self.baseline = {'results': {'helper:user.get_user': result(10.0, 20.0, 1)}}
+
+    def test_same_results(self):
+        """
+        Test a run identical to the baseline. Expect no regression.
+        """
+        self.assertEqual(compare(self.baseline, self.baseline), [])
+
+    def test_slower_within_threshold(self):
+        """
+        Test a run 10% slower than the baseline with a 20% threshold. Expect no regression.
+        """
+        current = {'results': {'helper:user.get_user': result(11.0, 22.0, 1)}}
+        self.assertEqual(compare(self.baseline, current, threshold = 0.2), [])
+
+    def test_slower_beyond_threshold(self):
+        """
+        Test a run whose p95 is 50% slower than the baseline. Expect one regression.
+        """
+        current = {'results': {'helper:user.get_user': result(10.0, 30.0, 1)}}
+        regressions = compare(self.baseline, current, threshold = 0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("p95", regressions[0])
+
+    def test_small_difference_is_noise(self):
+        """
+        Test a run slower than the threshold by less than a millisecond. Expect no regression.
+        """
+        baseline = {'results': {'helper:level.convert_experience_to_level': result(0.01, 0.02, 0)}}
+        current = {'results': {'helper:level.convert_experience_to_level': result(0.05, 0.08, 0)}}
+        self.assertEqual(compare(baseline, current), [])
+
+    def test_more_queries(self):
+        """
+        Test a run sending one more query than the baseline. Expect one regression, none with a query threshold of 1.
+        """
+        current = {'results': {'helper:user.get_user': result(10.0, 20.0, 2)}}
+        self.assertEqual(len(compare(self.baseline, current)), 1)
+        self.assertEqual(compare(self.baseline, current, query_threshold = 1), [])
+
+    def test_new_benchmark(self):
+        """
+        Test a run with a benchmark missing from the baseline. Expect it not to be compared.
+        """
+        current = {'results': {'route:home_page.home': result(50.0, 90.0, 12)}}
+        self.assertEqual(compare(self.baseline, current), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
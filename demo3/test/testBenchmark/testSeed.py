@@ -0,0 +1,69 @@
+import unittest
+from app import create_app
+from exts import db
+from models import User, Restaurant, Customer_Achievement_Progress, Redeemed_Coupons
+from benchmarks.seed import get_scale, seed
+from benchmarks.run import benchmark_helpers, get_samples, measure
+
+
+class SeedTest(unittest.TestCase):
+    """
+    Test seed() in benchmarks/seed.py and the rolled back runs of benchmarks/run.py
+    """
+    def setUp(self):
+        self.app = create_app(TESTING = True, SQLALCHEMY_DATABASE_URI = 'sqlite://')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.counts = get_scale('tiny', users = 100)
+        self.inserted = seed(self.counts, log = lambda message: None)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_row_counts(self):
+        """
+        Test the number of rows seeded at the tiny scale with fewer users. Expect the requested counts.
+        """
+        self.assertEqual(User.query.count(), 100)
+        self.assertEqual(Restaurant.query.count(), self.counts['restaurants'])
+        self.assertEqual(Customer_Achievement_Progress.query.count(), self.counts['progress'])
+        self.assertEqual(Redeemed_Coupons.query.count(), self.counts['redemptions'])
+        self.assertEqual(self.inserted['user'], 100)
+
+    def test_same_seed_same_data(self):
+        """
+        Test seeding twice with the same seed. Expect the same rows.
+        """
+        first = [(r.cid, r.uid) for r in Redeemed_Coupons.query.order_by(Redeemed_Coupons.rcid)]
+        seed(self.counts, log = lambda message: None)
+        second = [(r.cid, r.uid) for r in Redeemed_Coupons.query.order_by(Redeemed_Coupons.rcid)]
+        self.assertEqual(first, second)
+
+    def test_measure_rolls_back(self):
+        """
+        Test timing a helper that writes. Expect the write to be rolled back after each iteration.
+        """
+        from databaseHelpers.restaurant import insert_new_restaurant
+        get_samples()
+        db.session.remove()
+        result = measure(lambda: lambda: insert_new_restaurant("Benchmark", "1 Benchmark street", 1), 3)
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(result['iterations'], 3)
+        self.assertEqual(result['queries'], 2)
+        self.assertEqual(Restaurant.query.count(), self.counts['restaurants'])
+
+    def test_helpers_run(self):
+        """
+        Test timing every helper once with the sample arguments. Expect none to raise.
+        """
+        samples = get_samples()
+        db.session.remove()
+        results = benchmark_helpers(samples, 1)
+        self.assertFalse([name for name, result in results.items() if result['errors']])
+        self.assertFalse([name for name in results if '._' in name])
+
+
+if __name__ == "__main__":
+    unittest.main()
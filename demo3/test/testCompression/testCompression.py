@@ -0,0 +1,120 @@
+import unittest
+import gzip
+import zlib
+from unittest import mock
+import pytest
+from prometheus_client import REGISTRY
+import compression
+from compression import choose_encoding, parse_accept_encoding
+from databaseHelpers.restaurant import get_rid
+from exts import db
+from models import Coupon
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class AcceptEncodingTest(unittest.TestCase):
+    """
+    Tests reading Accept-Encoding in compression.py
+    """
+
+    def test_parse(self):
+        """
+        Tests a header with qualities. Expect 1 when no quality is given.
+        """
+        self.assertEqual(parse_accept_encoding("gzip, deflate;q=0.5, BR;q=0.8, x;q=bad"),
+                         {'gzip': 1.0, 'deflate': 0.5, 'br': 0.8, 'x': 0.0})
+
+    def test_choose(self):
+        """
+        Tests picking an encoding. Expect the highest quality, brotli at equal quality, none if refused.
+        """
+        self.assertEqual(choose_encoding("gzip;q=1, br;q=0.5"), 'gzip')
+        self.assertEqual(choose_encoding("identity"), None)
+        self.assertEqual(choose_encoding(None), None)
+        self.assertEqual(choose_encoding("*, gzip;q=0"), 'br' if compression.brotli else None)
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(choose_encoding("gzip, br"), 'gzip')
+        if compression.brotli:
+            self.assertEqual(choose_encoding("gzip, br"), 'br')
+
+
+@pytest.mark.usefixtures('seeded')
+class CompressedPageTest(unittest.TestCase):
+    """
+    Tests the compression of pages, on the seeded app of conftest.py
+    """
+
+    def setUp(self):
+        with self.client.session_transaction() as session:
+            session['account'] = self.samples['owner']
+            session['type'] = 1
+
+    def test_buffered_page(self):
+        """
+        Tests a page with gzip accepted. Expect it compressed, smaller and counted in the metrics.
+        """
+        plain = self.client.get('/leaderBoard')
+        saved = sample('pickeasy_compression_saved_bytes_total', {'encoding': 'gzip'})
+        response = self.client.get('/leaderBoard', headers = {'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(int(response.headers['Content-Length']), len(response.get_data()))
+        self.assertEqual(gzip.decompress(response.get_data()), plain.get_data())
+        self.assertEqual(sample('pickeasy_compression_saved_bytes_total', {'encoding': 'gzip'}) - saved,
+                         len(plain.get_data()) - len(response.get_data()))
+
+    @unittest.skipUnless(compression.brotli, "brotli is not installed")
+    def test_brotli(self):
+        """
+        Tests a page with brotli accepted. Expect it compressed with brotli.
+        """
+        plain = self.client.get('/leaderBoard').get_data()
+        response = self.client.get('/leaderBoard', headers = {'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.get_data()), plain)
+
+    def test_below_min_size(self):
+        """
+        Tests a page smaller than COMPRESS_MIN_SIZE. Expect it sent as it is.
+        """
+        self.app.config['COMPRESS_MIN_SIZE'] = 10 ** 7
+        response = self.client.get('/leaderBoard', headers = {'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn(b'</html>', response.get_data())
+
+    def test_busy_level(self):
+        """
+        Tests a page while the CPUs are busy. Expect the COMPRESS_BUSY_LEVEL level.
+        """
+        busy = sample('pickeasy_compressed_responses_total', {'encoding': 'gzip', 'level': '1'})
+        with mock.patch.object(compression, 'is_busy', return_value = True):
+            self.client.get('/leaderBoard', headers = {'Accept-Encoding': 'gzip'})
+        self.assertEqual(sample('pickeasy_compressed_responses_total', {'encoding': 'gzip', 'level': '1'}), busy + 1)
+
+    def test_streamed_page(self):
+        """
+        Tests a streamed page with gzip accepted. Expect the header in the first compressed chunk.
+        """
+        rid = get_rid(self.samples['owner'])
+        db.session.bulk_insert_mappings(Coupon, [{'rid': rid, 'deleted': 0, 'name': "Streamed %d" % i, 'points': 1,
+                                                  'level': 0, 'description': "A coupon"} for i in range(2000)])
+        db.session.commit()
+        plain = self.client.get('/couponStats').get_data()
+        response = self.client.get('/couponStats', headers = {'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = iter(response.response)
+        first = decoder.decompress(next(chunks))
+        self.assertIn(b"Coupon Statistics", first)
+        self.assertNotIn(b"Streamed 0", first)
+        body = first + b"".join(decoder.decompress(chunk) for chunk in chunks) + decoder.flush()
+        response.close()
+        self.assertEqual(body, plain)
+
+
+if __name__ == '__main__':
+    unittest.main()
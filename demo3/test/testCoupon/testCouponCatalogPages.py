@@ -0,0 +1,82 @@
+import unittest
+import datetime
+import pytest
+from exts import db
+from models import Coupon, Points
+from databaseHelpers.restaurant import get_rid
+
+EXPIRED = datetime.date(2020, 6, 30)
+
+
+@pytest.mark.usefixtures('seeded')
+class CouponCatalogPageTest(unittest.TestCase):
+    """
+    Tests the filters of the coupon pages, on the seeded app of conftest.py
+    """
+
+    def add_coupon(self, rid, name, points = 1, level = 0, expiration = None, deleted = 0):
+        db.session.add(Coupon(rid = rid, name = name, points = points, level = level, description = "A coupon",
+                              begin = datetime.date(2020, 1, 1) if expiration else None, expiration = expiration,
+                              deleted = deleted))
+        db.session.commit()
+
+    def login(self, uid, type):
+        with self.client.session_transaction() as session:
+            session['account'] = uid
+            session['type'] = type
+
+    def test_coupon_offers_filters(self):
+        """
+        Tests the purchasable filters of /couponOffers. Expect only the matching active coupons.
+        """
+        rid, uid = self.samples['rid'], self.samples['uid']
+        self.add_coupon(rid, "Catalog cheap")
+        self.add_coupon(rid, "Catalog dear", points = 10 ** 6)
+        self.add_coupon(rid, "Catalog expired", expiration = EXPIRED)
+        self.add_coupon(rid, "Catalog deleted", deleted = 1)
+        self.login(uid, -1)
+        url = '/couponOffers%d' % rid
+        page = self.client.get(url).get_data(as_text = True)
+        self.assertIn("Catalog cheap", page)
+        self.assertIn("Catalog dear", page)
+        self.assertNotIn("Catalog expired", page)
+        self.assertNotIn("Catalog deleted", page)
+        page = self.client.post(url, data = {'purchasable': "Purchable"}).get_data(as_text = True)
+        self.assertIn("Catalog cheap", page)
+        self.assertNotIn("Catalog dear", page)
+        page = self.client.post(url, data = {'notpurchasable': "Non-purchasable"}).get_data(as_text = True)
+        self.assertNotIn("Catalog cheap", page)
+        self.assertIn("Catalog dear", page)
+
+    def test_purchase_rereads_catalog(self):
+        """
+        Tests buying a coupon with all of the customer's points. Expect the other coupons no longer purchasable.
+        """
+        rid, uid = self.samples['rid'], self.samples['uid']
+        Points.query.filter(Points.uid == uid, Points.rid == rid).first().points = 100
+        Coupon.query.filter(Coupon.rid == rid, Coupon.points == 0).update({'points': 1})
+        self.add_coupon(rid, "Catalog all points", points = 100)
+        cid = Coupon.query.filter(Coupon.name == "Catalog all points").first().cid
+        self.login(uid, -1)
+        page = self.client.post('/couponOffers%d' % rid, data = {'cid': cid}).get_data(as_text = True)
+        self.assertIn("<b>Catalog all points</b> was successfully purchased", page)
+        self.assertNotIn('name = "cid"', page)
+
+    def test_coupon_stats_filters(self):
+        """
+        Tests the status filters of /couponStats. Expect only the coupons with that status.
+        """
+        rid = get_rid(self.samples['owner'])
+        self.add_coupon(rid, "Stats active")
+        self.add_coupon(rid, "Stats expired", expiration = EXPIRED)
+        self.add_coupon(rid, "Stats deleted", deleted = 1)
+        self.login(self.samples['owner'], 1)
+        for filter, shown in [('active', "Stats active"), ('expired', "Stats expired"), ('deleted', "Stats deleted")]:
+            page = self.client.post('/couponStats', data = {filter: filter}).get_data(as_text = True)
+            with self.subTest(filter = filter):
+                self.assertIn(shown, page)
+                self.assertEqual(sum(name in page for name in ("Stats active", "Stats expired", "Stats deleted")), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
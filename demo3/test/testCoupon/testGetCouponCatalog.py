@@ -0,0 +1,111 @@
+import unittest
+import pytest
+import datetime
+from models import Coupon
+from models import db
+from app import app
+from databaseHelpers import coupon as couponhelper
+from instrumentation.queries import count_queries
+
+VALID = datetime.date(9999, 5, 1)
+INVALID = datetime.date(2020, 6, 30)
+BEGIN = datetime.date(2020, 5, 1)
+
+
+@pytest.mark.usefixtures('database')
+class GetCouponCatalogTest(unittest.TestCase):
+    """
+    Test get_coupon_catalog() in databaseHelpers/coupon.py.
+    """
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
+        self.app = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+        # cid 1 to 6, of restaurant 12 except cid 6
+        for name, points, level, expiration, deleted, rid in [("active", 10, 2, VALID, 0, 12),
+                                                              ("indefinite", 30, 0, None, 0, 12),
+                                                              ("expired", 10, 0, INVALID, 0, 12),
+                                                              ("deleted", 10, 0, VALID, 1, 12),
+                                                              ("cheap", 5, 1, VALID, 0, 12),
+                                                              ("other", 1, 0, VALID, 0, 13)]:
+            db.session.add(Coupon(rid=rid, name=name, points=points, description="1$ off", level=level,
+                                  begin=BEGIN if expiration else None, expiration=expiration, deleted=deleted))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+
+    def names(self, *args, **kwargs):
+        return [c['name'] for c in couponhelper.get_coupon_catalog(*args, **kwargs)]
+
+    def test_empty(self):
+        """
+        Test a restaurant without coupons. Expect an empty list.
+        """
+        self.assertEqual(couponhelper.get_coupon_catalog(99), [])
+
+    def test_active_by_level(self):
+        """
+        Test the default catalog. Expect the coupons neither deleted nor expired, by level then cid.
+        """
+        self.assertEqual(self.names(12), ["indefinite", "cheap", "active"])
+
+    def test_status(self):
+        """
+        Test each status. Expect the coupons of the restaurant with that status.
+        """
+        self.assertEqual(self.names(12, status='expired'), ["expired"])
+        self.assertEqual(self.names(12, status='deleted'), ["deleted"])
+        self.assertEqual(self.names(12, status='all', sort='newest'),
+                         ["cheap", "deleted", "expired", "indefinite", "active"])
+        with self.assertRaises(ValueError):
+            couponhelper.get_coupon_catalog(12, status='unknown')
+
+    def test_expires_today(self):
+        """
+        Test a coupon expiring today. Expect it still active.
+        """
+        db.session.add(Coupon(rid=12, name="today", points=1, description="1$ off", level=0, begin=BEGIN,
+                              expiration=datetime.date.today(), deleted=0))
+        db.session.commit()
+        self.assertIn("today", self.names(12))
+
+    def test_purchasable(self):
+        """
+        Test the catalog of a customer with 10 points at level 1. Expect purchasable set, and filtered on.
+        """
+        coupons = couponhelper.get_coupon_catalog(12, points=10, level=1)
+        self.assertEqual([(c['name'], c['purchasable']) for c in coupons],
+                         [("indefinite", False), ("cheap", True), ("active", False)])
+        self.assertEqual(self.names(12, points=10, level=1, purchasable=True), ["cheap"])
+        self.assertEqual(self.names(12, points=10, level=1, purchasable=False), ["indefinite", "active"])
+        self.assertNotIn('purchasable', couponhelper.get_coupon_catalog(12)[0])
+
+    def test_sort_and_pages(self):
+        """
+        Test sorting by points and name, and pages of 2 coupons. Expect the matching slices.
+        """
+        self.assertEqual(self.names(12, sort='points'), ["cheap", "active", "indefinite"])
+        self.assertEqual(self.names(12, sort='name'), ["active", "cheap", "indefinite"])
+        self.assertEqual(self.names(12, per_page=2), ["indefinite", "cheap"])
+        self.assertEqual(self.names(12, page=2, per_page=2), ["active"])
+        self.assertEqual(self.names(12, page=3, per_page=2), [])
+
+    def test_uses_active_index(self):
+        """
+        Test the query plan of the active catalog. Expect the partial index on active coupons.
+        """
+        with count_queries() as log:
+            couponhelper.get_coupon_catalog(12, points=10, level=1)
+        statement, parameters = log.queries[0][:2]
+        cursor = db.session.connection().connection.cursor()
+        plan = cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        self.assertIn("ix_coupons_active_rid_level", " ".join(str(row) for row in plan))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import pytest
 from models import User, Coupon, Restaurant, Employee
 from models import db
 import time
@@ -10,6 +11,7 @@ BEGIN = datetime.date(2020, 5, 1)
 END = datetime.date(2020, 6, 30)
 
 
+@pytest.mark.usefixtures('database')
 class SelectCouponTest(unittest.TestCase):
     """
     Test get_coupons() in databaseHelpers/coupon.py.
@@ -17,13 +19,14 @@ class SelectCouponTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_coupon_single(self):
         """
@@ -0,0 +1,140 @@
+import unittest
+import pytest
+import os
+import json
+import tempfile
+from unittest import mock
+from app import app
+from databaseHelpers.customerImport import *
+from databaseHelpers import customerImport
+from models import db
+from models import User, Points, Experience
+
+
+@pytest.mark.usefixtures('database')
+class ImportCustomersTest(unittest.TestCase):
+    """
+    Tests import_customers() in databaseHelpers/customerImport.py
+    """
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
+        self.ctx = app.app_context()
+        self.ctx.push()
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+        db.session.remove()
+        self.ctx.pop()
+
+    def write(self, name, text):
+        path = os.path.join(self.folder.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_import_csv(self):
+        """
+        Tests importing a CSV file of new customers.
+        """
+        path = self.write('customers.csv', "email,name,points,experience\n"
+                                           "a@test.com,Alice,100,250\n"
+                                           "B@Test.com,,5,0\n")
+        stats = import_customers(path, 3, log=lambda message: None)
+        self.assertEqual(stats['read'], 2)
+        self.assertEqual(stats['inserted'], 2)
+        alice = User.query.filter_by(email="a@test.com").first()
+        self.assertEqual(alice.name, "Alice")
+        self.assertEqual(alice.type, -1)
+        self.assertEqual(User.query.filter_by(email="b@test.com").first().name, "b")
+        self.assertEqual(Points.query.filter_by(uid=alice.uid, rid=3).first().points, 100)
+        self.assertEqual(Experience.query.filter_by(uid=alice.uid, rid=3).first().experience, 250)
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+    def test_import_jsonl_existing_user(self):
+        """
+        Tests importing a JSONL file whose customer already has an account and a balance.
+        """
+        db.session.add(User(name="Alice", email="a@test.com", password="x", type=-1))
+        db.session.commit()
+        uid = User.query.first().uid
+        db.session.add(Points(uid=uid, rid=3, points=7))
+        db.session.commit()
+        path = self.write('customers.jsonl', json.dumps({'email': "a@test.com", 'points': 40}) + "\n")
+        stats = import_customers(path, 3, log=lambda message: None)
+        self.assertEqual(stats['inserted'], 0)
+        self.assertEqual(stats['existing'], 1)
+        self.assertEqual(User.query.count(), 1)
+        self.assertEqual(Points.query.filter_by(uid=uid, rid=3).count(), 1)
+        self.assertEqual(Points.query.filter_by(uid=uid, rid=3).first().points, 40)
+
+    def test_duplicates_and_rejected_rows(self):
+        """
+        Tests a file with a repeated email and invalid rows. Expect the last row of the repeated email to win.
+        """
+        path = self.write('customers.csv', "email,points\n"
+                                           "a@test.com,10\n"
+                                           ",10\n"
+                                           "b@test.com,-1\n"
+                                           "A@test.com,20\n")
+        stats = import_customers(path, 3, log=lambda message: None)
+        self.assertEqual(stats['rejected'], 2)
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(User.query.count(), 1)
+        self.assertEqual(Points.query.first().points, 20)
+
+    def test_malformed_jsonl_line(self):
+        """
+        Tests a JSONL file with a line that is not JSON. Expect the line rejected and the rows after it imported.
+        """
+        path = self.write('customers.jsonl', '{"email": "a@test.com"}\n'
+                                             '{"email": "b@test.com", \n'
+                                             '["c@test.com"]\n'
+                                             '{"email": "d@test.com"}\n')
+        messages = []
+        stats = import_customers(path, 3, log=messages.append)
+        self.assertEqual(stats['rejected'], 2)
+        self.assertEqual(stats['inserted'], 2)
+        self.assertIn("Line 2 rejected: Invalid row, please provide a JSON object.", messages)
+
+    def test_copy_field(self):
+        """
+        Tests the fields written for COPY. Expect empty strings quoted, so they are not read as NULL.
+        """
+        self.assertEqual(copy_field(''), '""')
+        self.assertEqual(copy_field(None), '')
+        self.assertEqual(copy_field('say "hi", bye'), '"say ""hi"", bye"')
+        self.assertEqual(copy_field(-1), '-1')
+
+    def test_resume_after_failure(self):
+        """
+        Tests running an import again after it failed in its second chunk. Expect it to resume after the first chunk.
+        """
+        path = self.write('customers.csv', "email,points\n" + "".join("c%d@test.com,%d\n" % (i, i) for i in range(5)))
+        real_import_chunk = customerImport.import_chunk
+        calls = []
+
+        def failing_import_chunk(rows, rid):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError("Connection lost")
+            return real_import_chunk(rows, rid)
+
+        with mock.patch.object(customerImport, 'import_chunk', failing_import_chunk):
+            self.assertRaises(RuntimeError, import_customers, path, 3, chunk_size=2, log=lambda message: None)
+        self.assertEqual(User.query.count(), 2)
+        with open(path + '.checkpoint') as f:
+            self.assertEqual(json.load(f)['line'], 3)
+
+        stats = import_customers(path, 3, chunk_size=2, log=lambda message: None)
+        self.assertEqual(stats['read'], 5)
+        self.assertEqual(stats['inserted'], 5)
+        self.assertEqual(User.query.count(), 5)
+        self.assertEqual(sorted(p.points for p in Points.query), [0, 1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
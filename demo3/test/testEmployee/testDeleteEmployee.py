@@ -1,11 +1,14 @@
 import unittest
-from models import User, Coupon, Restaurant, Employee
+import pytest
+from models import User, Coupon, Restaurant, Employee, Points, Experience, Favourite, Redeemed_Coupons, \
+    Customer_Achievement_Progress
 from models import db
 import time
 from app import app
 from databaseHelpers import employee as employeehelper
 
 
+@pytest.mark.usefixtures('database')
 class DeleteEmployeeTest(unittest.TestCase):
     """
     Test delete_employee() in databaseHelpers/employee.py
@@ -13,13 +16,14 @@ class DeleteEmployeeTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_delete_one_employee(self):
         """
@@ -36,6 +40,21 @@ class DeleteEmployeeTest(unittest.TestCase):
         self.assertIsNone(e)
         self.assertIsNone(u)
 
+    def test_delete_employee_rows(self):
+        """
+        Test delete an employee with points, experience, favourites, coupons and achievement progress.
+        Expect every row of the employee deleted, and the rows of other users kept.
+        """
+        for uid in (9187, 9188):
+            db.session.add_all([User(uid=uid, name="joe", email="joe%d.com" % uid, password="passwd", type=0),
+                                Employee(uid=uid, rid=18), Points(uid=uid, rid=18, points=5),
+                                Experience(uid=uid, rid=18, experience=5), Favourite(uid=uid, rid=18),
+                                Redeemed_Coupons(cid=1, uid=uid, rid=18, valid=1),
+                                Customer_Achievement_Progress(aid=1, uid=uid, progress=1, total=5)])
+        db.session.commit()
+        employeehelper.delete_employee(9187)
+        for model in (User, Employee, Points, Experience, Favourite, Redeemed_Coupons, Customer_Achievement_Progress):
+            self.assertEqual([row.uid for row in model.query.all()], [9188])
 
 
 if __name__ == "__main__":
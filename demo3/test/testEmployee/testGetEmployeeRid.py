@@ -1,10 +1,12 @@
 import unittest
+import pytest
 from models import User, Coupon, Restaurant, Employee
 from models import db
 import time
 from app import app
 from databaseHelpers.employee import *
 
+@pytest.mark.usefixtures('database')
 class SelectEmployeeByRidTest(unittest.TestCase):
     """
     Test get_employee_rid() in employee.py
@@ -12,13 +14,14 @@ class SelectEmployeeByRidTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_no_employee(self):
         """
@@ -1,10 +1,12 @@
 import unittest
-from models import User, Restaurant, Experience
+import pytest
+from models import User, Restaurant, Experience, Points, Thresholds
 from models import db
 import time
 from app import app
 from databaseHelpers import experience as experiencehelper
 
+@pytest.mark.usefixtures('database')
 class UpdateExperienceTest(unittest.TestCase):
     '''
     Tests update_experience() in databaseHelpers/experience.py.
@@ -12,13 +14,14 @@ class UpdateExperienceTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_update_nonexistent_experience_entry(self):
         '''
@@ -81,6 +84,20 @@ class UpdateExperienceTest(unittest.TestCase):
         self.assertEqual(experience.rid, 12)
         self.assertEqual(experience.experience, 10)
 
+    def test_update_experience_crosses_several_milestones(self):
+        '''
+        Tests gaining three levels at once past two milestones. Expect the rewards of both milestones
+        credited, and not the one above the new level.
+        '''
+        db.session.add(Experience(uid=1, rid=12, experience=10))
+        db.session.add(Points(uid=1, rid=12, points=0))
+        for level, reward in [(1, 10), (3, 30), (4, 40)]:
+            db.session.add(Thresholds(rid=12, level=level, reward=reward))
+        db.session.commit()
+        errmsg = experiencehelper.update_experience(1, 12, 600)
+        self.assertEqual(errmsg, None)
+        self.assertEqual(Points.query.filter_by(uid=1, rid=12).first().points, 40)
+
 
 if __name__ == "__main__":
     unittest.main()
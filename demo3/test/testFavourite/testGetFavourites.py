@@ -1,7 +1,9 @@
 import unittest
+import pytest
 from app import app
 from databaseHelpers.favourite import *
 
+@pytest.mark.usefixtures('database')
 class InsertFavouriteTest(unittest.TestCase):
     '''
     Tests get_favourites(uid): in databaseHelpers/favourite.py.
@@ -9,13 +11,14 @@ class InsertFavouriteTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_get_no_favourites(self):
         """
@@ -0,0 +1,110 @@
+import unittest
+from datetime import date, datetime, timedelta
+import pytest
+from exts import db
+from models import Achievements, Coupon, Customer_Achievement_Progress, Favourite, Redeemed_Coupons, Restaurant, User
+from databaseHelpers.feed import get_home_feed
+from databaseHelpers.redeemedCoupons import get_kept_expiration_cutoff
+from instrumentation.queries import count_queries
+
+START = datetime(2026, 1, 1)
+
+
+class KeptExpirationCutoffTest(unittest.TestCase):
+    """
+    Tests get_kept_expiration_cutoff() in databaseHelpers/redeemedCoupons.py
+    """
+
+    def test_cutoff(self):
+        """
+        Tests the cutoff on the last day of a month. Expect the last expiration listed 6 months later to be after it.
+        """
+        self.assertEqual(get_kept_expiration_cutoff(date(2026, 2, 28)), date(2025, 8, 31))
+        self.assertEqual(get_kept_expiration_cutoff(date(2026, 3, 1)), date(2025, 9, 1))
+        self.assertEqual(get_kept_expiration_cutoff(date(2026, 10, 19)), date(2026, 4, 19))
+
+
+@pytest.mark.usefixtures('seeded')
+class GetHomeFeedTest(unittest.TestCase):
+    """
+    Tests get_home_feed() in databaseHelpers/feed.py, on the seeded app of conftest.py
+    """
+
+    def setUp(self):
+        user = User(name = "feed", password = "password", email = "feed@feed.test", type = -1)
+        db.session.add(user)
+        db.session.commit()
+        self.uid = user.uid
+
+    def add_history(self, count, expiration = None):
+        """
+        Adds count new restaurants, each favourited, with a coupon redeemed and an achievement progressed by the user,
+        later rows being more recent.
+        """
+        start = Restaurant.query.count()
+        for i in range(start, start + count):
+            restaurant = Restaurant(name = "Feed %d" % i, address = "%d Feed street" % i, uid = self.samples['owner'])
+            db.session.add(restaurant)
+            db.session.flush()
+            coupon = Coupon(rid = restaurant.rid, deleted = 0, name = "Feed coupon %d" % i, points = 1, level = 0,
+                            description = "A coupon", expiration = expiration, begin = date(2020, 1, 1))
+            achievement = Achievements(rid = restaurant.rid, name = "Feed achievement %d" % i, experience = 1,
+                                       points = 1, type = 3, value = ";5;True;;")
+            db.session.add_all([coupon, achievement])
+            db.session.flush()
+            db.session.add_all([
+                Favourite(uid = self.uid, rid = restaurant.rid, created = START + timedelta(minutes = i)),
+                Redeemed_Coupons(cid = coupon.cid, uid = self.uid, rid = restaurant.rid, valid = 1),
+                Customer_Achievement_Progress(aid = achievement.aid, uid = self.uid, progress = 1, total = 5,
+                                              update = START + timedelta(minutes = i))])
+        db.session.commit()
+        return start
+
+    def test_empty(self):
+        """
+        Tests a customer without any history. Expect empty lists.
+        """
+        self.assertEqual(get_home_feed(self.uid), {'coupons': [], 'restaurants': [], 'achievements': []})
+
+    def test_newest_first(self):
+        """
+        Tests a customer with 5 items of each kind. Expect the 3 newest, newest first.
+        """
+        start = self.add_history(5)
+        feed = get_home_feed(self.uid)
+        names = ["Feed %d" % i for i in range(start + 4, start + 1, -1)]
+        self.assertEqual([r['name'] for r in feed['restaurants']], names)
+        self.assertEqual([c['rname'] for c in feed['coupons']], names)
+        self.assertEqual([c['cname'] for c in feed['coupons']], ["Feed coupon %d" % i for i in range(start + 4, start + 1, -1)])
+        self.assertEqual([a['rname'] for a in feed['achievements']], names)
+
+    def test_skips_used_and_expired_coupons(self):
+        """
+        Tests a customer whose newest coupons are used or expired more than 6 months ago. Expect older coupons instead.
+        """
+        start = self.add_history(3)
+        self.add_history(1, expiration = date.today() - timedelta(days = 365))
+        self.add_history(1)
+        newest = Redeemed_Coupons.query.filter(Redeemed_Coupons.uid == self.uid) \
+            .order_by(Redeemed_Coupons.rcid.desc()).first()
+        newest.valid = 0
+        db.session.commit()
+        feed = get_home_feed(self.uid)
+        self.assertEqual([c['rname'] for c in feed['coupons']], ["Feed %d" % i for i in range(start + 2, start - 1, -1)])
+
+    def test_constant_queries(self):
+        """
+        Tests a customer with 3 and then 33 items of each kind. Expect the same number of queries.
+        """
+        self.add_history(3)
+        with count_queries() as small:
+            get_home_feed(self.uid)
+        self.add_history(30)
+        with count_queries() as large:
+            get_home_feed(self.uid)
+        self.assertEqual(large.count, small.count)
+        self.assertLessEqual(large.count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import pytest
+from exts import db
+from models import User
+from databaseHelpers.user import insert_new_user
+
+
+@pytest.mark.usefixtures('seeded')
+class SeededFixtureTest(unittest.TestCase):
+    """
+    Tests the seeded fixture of conftest.py. Both tests make the same
+    changes, so whichever runs second fails if the first one leaked.
+    """
+
+    def check_rolled_back(self):
+        self.assertEqual(self.app.config['TRACE_SAMPLE_RATE'], 0.0)
+        self.assertIsNone(User.query.filter(User.email == "leak@bench.test").first())
+        self.app.config['TRACE_SAMPLE_RATE'] = 1.0
+        errmsg, uid = insert_new_user("leak", "leak@bench.test", "password", "password", -1)
+        self.assertIsNone(errmsg)
+        self.assertEqual(db.session.query(User).get(uid).name, "leak")
+
+    def test_first(self):
+        """
+        Tests a committed insert and a config change. Expect neither to be seen by the other test.
+        """
+        self.check_rolled_back()
+
+    def test_second(self):
+        """
+        Tests a committed insert and a config change. Expect neither to be seen by the other test.
+        """
+        self.check_rolled_back()
+
+    def test_seeded_data(self):
+        """
+        Tests the data seeded once per worker. Expect the samples to exist.
+        """
+        self.assertIsNotNone(db.session.query(User).get(self.samples['uid']))
+        self.assertEqual(User.query.count(), 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,12 @@
 import unittest
+import pytest
 
 from databaseHelpers.leaderboard import top_n_in_order
 from models import User, Experience
 from models import db
 from app import app
 
+@pytest.mark.usefixtures('database')
 class TopNInordertest(unittest.TestCase):
     """
     Test top_n_in_order() in databaseHelpers.coupon.py.
@@ -12,13 +14,14 @@ class TopNInordertest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_sort_fewer_than_n(self):
         """
@@ -0,0 +1,100 @@
+import unittest
+import os
+import random
+import shutil
+import tempfile
+from app import create_app
+from exts import db
+from benchmarks.compare import compare
+from benchmarks.seed import get_scale, seed
+from databaseHelpers.qr_code import get_root
+from loadtest.run import parse_rates, arrivals, summarize, serve, run
+
+QR_FOLDER = os.path.join(str(get_root()), 'static', 'Resources', 'QR')
+
+
+class LoadTestTest(unittest.TestCase):
+    """
+    Tests loadtest/run.py
+    """
+
+    def test_parse_rates(self):
+        """
+        Tests reading journey rates. Expect unknown journeys to be refused.
+        """
+        self.assertEqual(parse_rates("customer=20, owner=0.5"), {'customer': 20.0, 'owner': 0.5})
+        with self.assertRaises(ValueError):
+            parse_rates("tourist=3")
+
+    def test_arrivals(self):
+        """
+        Tests drawing arrivals. Expect them sorted, within the duration and close to the rate.
+        """
+        schedule = arrivals({'customer': 50.0, 'owner': 5.0, 'employee': 0}, 20, random.Random(1))
+        times = [t for t, name in schedule]
+        self.assertEqual(times, sorted(times))
+        self.assertLess(times[-1], 20)
+        self.assertAlmostEqual(sum(1 for t, name in schedule if name == 'customer') / 20, 50, delta = 5)
+        self.assertAlmostEqual(sum(1 for t, name in schedule if name == 'owner') / 20, 5, delta = 2)
+        self.assertEqual(schedule, arrivals({'customer': 50.0, 'owner': 5.0}, 20, random.Random(1)))
+
+    def test_summarize(self):
+        """
+        Tests summarizing a step. Expect percentiles in milliseconds and the error rate.
+        """
+        step = {'durations': [i / 1000 for i in range(1, 101)], 'queries': [3, 5, 4], 'errors': 5}
+        result = summarize(step, 10)
+        self.assertEqual(result['count'], 100)
+        self.assertEqual(result['throughput'], 10)
+        self.assertEqual(result['error_rate'], 0.05)
+        self.assertEqual(result['p50'], 51)
+        self.assertEqual(result['p99'], 99)
+        self.assertEqual(result['max'], 100)
+        self.assertEqual(result['queries'], 4)
+
+
+class LoadTestRunTest(unittest.TestCase):
+    """
+    Tests a short load test against a local server
+    """
+
+    def setUp(self):
+        # Each server thread needs its own connection, which an in-memory database cannot give
+        self.folder = tempfile.mkdtemp()
+        self.qr_codes = set(os.listdir(QR_FOLDER))
+        self.app = create_app(TESTING = True, SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(self.folder, 'load.db'),
+                              SQL_QUERY_HEADERS = True)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.counts = get_scale('tiny')
+        seed(self.counts, log = lambda message: None)
+        db.session.remove()
+        self.server, self.url = serve(self.app)
+
+    def tearDown(self):
+        self.server.shutdown()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.folder)
+        for name in set(os.listdir(QR_FOLDER)) - self.qr_codes:
+            os.remove(os.path.join(QR_FOLDER, name))
+
+    def test_run(self):
+        """
+        Tests every journey. Expect each step to be measured without errors and the run to compare to itself.
+        """
+        results = run(self.url, self.counts, {'customer': 5.0, 'employee': 2.0, 'owner': 2.0}, duration = 1.5,
+                      concurrency = 4, random_seed = 3, log = lambda message: None)
+        steps = results['results']
+        for name in ('customer.login', 'customer.search', 'customer.restaurant', 'customer.coupon_offers',
+                     'customer.buy_coupon', 'customer.show_qr', 'employee.login', 'owner.coupon_stats'):
+            self.assertIn(name, steps)
+        for name, step in steps.items():
+            self.assertEqual(step['errors'], 0, name)
+        self.assertEqual(steps['owner.leaderboard']['queries'], 13)
+        self.assertEqual(compare(results, results), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import tracemalloc
+import pytest
+from instrumentation.memory import RouteMemory, routes, stop_tracing
+
+
+class RouteMemoryTest(unittest.TestCase):
+    """
+    Tests RouteMemory in instrumentation/memory.py
+    """
+
+    def test_grows(self):
+        """
+        Tests a route whose peak follows the objects it loads. Expect it to be flagged.
+        """
+        memory = RouteMemory(10)
+        for objects in range(1, 7):
+            memory.add(objects, 1000 + objects * 500)
+        self.assertAlmostEqual(memory.correlation(), 1.0)
+        self.assertTrue(memory.grows(5, 0.8))
+        self.assertFalse(memory.grows(7, 0.8))
+
+    def test_constant(self):
+        """
+        Tests a route loading the same number of objects every time. Expect it not to be flagged.
+        """
+        memory = RouteMemory(10)
+        for peak in (1000, 5000, 2000, 9000, 3000):
+            memory.add(10, peak)
+        self.assertIsNone(memory.correlation())
+        self.assertFalse(memory.grows(5, 0.8))
+        self.assertEqual(memory.max_peak, 9000)
+        self.assertEqual(memory.mean_peak, 4000)
+
+    def test_samples(self):
+        """
+        Tests adding more requests than the route keeps. Expect the oldest to be dropped but counted.
+        """
+        memory = RouteMemory(3)
+        for objects in range(5):
+            memory.add(objects, objects)
+        self.assertEqual(memory.count, 5)
+        self.assertEqual(list(memory.samples), [(2, 2), (3, 3), (4, 4)])
+
+
+@pytest.mark.usefixtures('seeded')
+class MemoryPageTest(unittest.TestCase):
+    """
+    Tests the /adminMemory page and the per route peak memory on the seeded
+    app of conftest.py
+    """
+
+    def setUp(self):
+        self.app.config['ADMIN_UIDS'] = [1]
+        routes.clear()
+
+    def tearDown(self):
+        if tracemalloc.is_tracing():
+            stop_tracing()
+        routes.clear()
+
+    def login(self, uid):
+        with self.client.session_transaction() as session:
+            session['account'] = uid
+            session['type'] = 1
+
+    def test_forbidden(self):
+        """
+        Tests the page as a user not in ADMIN_UIDS. Expect it to be forbidden.
+        """
+        self.login(2)
+        self.assertEqual(self.client.get('/adminMemory').status_code, 403)
+        self.assertEqual(self.client.post('/adminMemory', data = {'action': 'start'}).status_code, 403)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_not_tracing(self):
+        """
+        Tests requests while tracemalloc is stopped. Expect nothing to be recorded.
+        """
+        self.login(1)
+        self.client.get('/leaderBoard')
+        self.assertEqual(routes, {})
+
+    def test_tracing(self):
+        """
+        Tests starting tracing, a request, a baseline and stopping. Expect the request's peak and objects.
+        """
+        self.login(1)
+        self.client.post('/adminMemory', data = {'action': 'start', 'frames': '2'})
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertEqual(tracemalloc.get_traceback_limit(), 2)
+        self.client.get('/leaderBoard')
+        memory = routes['leaderboard_page.leaderboard']
+        self.assertEqual(memory.count, 1)
+        self.assertGreater(memory.max_peak, 0)
+        self.assertGreater(memory.max_objects, 0)
+        self.client.post('/adminMemory', data = {'action': 'baseline'})
+        page = self.client.get('/adminMemory').get_data(as_text = True)
+        self.assertIn('leaderboard_page.leaderboard', page)
+        self.assertIn('Growth since the baseline', page)
+        self.assertIn('Top allocation sites', page)
+        self.client.post('/adminMemory', data = {'action': 'stop'})
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_without_reset_peak(self):
+        """
+        Tests tracing on a Python without tracemalloc.reset_peak. Expect the growth of the request to be recorded.
+        """
+        self.login(1)
+        self.client.post('/adminMemory', data = {'action': 'start', 'frames': '1'})
+        reset_peak = tracemalloc.reset_peak
+        del tracemalloc.reset_peak
+        try:
+            self.client.get('/leaderBoard')
+        finally:
+            tracemalloc.reset_peak = reset_peak
+        memory = routes['leaderboard_page.leaderboard']
+        self.assertEqual(memory.count, 1)
+        self.assertGreaterEqual(memory.max_peak, 0)
+
+    def test_invalid_frames(self):
+        """
+        Tests starting tracing with frames that are not a number or out of range. Expect an error and no tracing.
+        """
+        self.login(1)
+        for frames in ['abc', '0', '-3', '51']:
+            response = self.client.post('/adminMemory', data = {'action': 'start', 'frames': frames})
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Invalid number of frames', response.get_data(as_text = True))
+            self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == '__main__':
+    unittest.main()
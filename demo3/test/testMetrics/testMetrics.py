@@ -0,0 +1,115 @@
+import unittest
+import pytest
+import os
+import subprocess
+import sys
+import tempfile
+from app import app
+from models import db
+from models import Restaurant, Coupon
+from instrumentation.metrics import SCANS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Handles a request in a fresh process, as a gunicorn worker would
+WORKER = """
+from app import create_app
+app = create_app(TESTING = True, SQLALCHEMY_DATABASE_URI = 'sqlite://', METRICS_TOKEN = 'secret')
+print(app.test_client().get(%r, headers = {'Authorization': 'Bearer secret'}).get_data(as_text = True))
+"""
+
+
+def sample(body, name, labels):
+    """
+    Finds the value of a sample in a Prometheus text export, None if it is missing.
+    """
+    prefix = name + "{" + ",".join('%s="%s"' % item for item in sorted(labels.items())) + "} "
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return None
+
+
+@pytest.mark.usefixtures('database')
+class MetricsTest(unittest.TestCase):
+    """
+    Tests the /metrics route and instrumentation/metrics.py
+    """
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
+        app.config['METRICS_TOKEN'] = 'secret'
+        self.app = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        app.config['METRICS_TOKEN'] = None
+        db.session.remove()
+        self.ctx.pop()
+
+    def scrape(self):
+        return self.app.get('/metrics', headers = {'Authorization': 'Bearer secret'}).get_data(as_text = True)
+
+    def test_request_latency(self):
+        """
+        Tests the latency histogram after a request. Expect its count to go up by one.
+        """
+        labels = {'blueprint': 'registration_page', 'endpoint': 'registration_page.login', 'method': 'GET'}
+        before = sample(self.scrape(), 'pickeasy_request_seconds_count', labels) or 0
+        self.app.get('/login')
+        body = self.scrape()
+        self.assertEqual(sample(body, 'pickeasy_request_seconds_count', labels), before + 1)
+        self.assertIn('pickeasy_request_render_seconds_count{blueprint="registration_page",endpoint="registration_page.login"}', body)
+        self.assertIn('pickeasy_request_db_seconds_count{blueprint="registration_page",endpoint="registration_page.login"}', body)
+
+    def test_scan_counter(self):
+        """
+        Tests scanning a coupon as a customer. Expect a failed coupon scan to be counted.
+        """
+        db.session.add(Restaurant(rid = 1, name = "test", address = "1 Main street", uid = 2))
+        db.session.add(Coupon(cid = 1, rid = 1, name = "test", points = 10, description = "test", level = 0, deleted = 0))
+        db.session.commit()
+        before = SCANS.labels('coupon', 'failure')._value.get()
+        with self.app.session_transaction() as session:
+            session['account'] = 1
+            session['type'] = -1
+        self.app.get('/useCoupon/1/1')
+        self.assertEqual(SCANS.labels('coupon', 'failure')._value.get(), before + 1)
+
+    def test_token(self):
+        """
+        Tests /metrics when a token is configured. Expect 403 without the right token and 200 with it.
+        """
+        self.assertEqual(self.app.get('/metrics').status_code, 403)
+        for header in ('Bearer wrong', 'Bearer secret ', 'Bearer sécret'):
+            with self.subTest(header = header):
+                self.assertEqual(self.app.get('/metrics', headers = {'Authorization': header}).status_code, 403)
+        response = self.app.get('/metrics', headers = {'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_token(self):
+        """
+        Tests /metrics when no token is configured. Expect 404, the page is off.
+        """
+        app.config['METRICS_TOKEN'] = None
+        self.assertEqual(self.app.get('/metrics').status_code, 404)
+
+    def test_multiprocess(self):
+        """
+        Tests two worker processes sharing a metrics directory. Expect the second to export the first one's request.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            env = dict(os.environ, prometheus_multiproc_dir = folder)
+            for path in ('/login', '/metrics'):
+                process = subprocess.run([sys.executable, '-c', WORKER % path], cwd = ROOT, env = env,
+                                         stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True)
+                self.assertEqual(process.returncode, 0, process.stderr)
+        labels = {'blueprint': 'registration_page', 'endpoint': 'registration_page.login', 'method': 'GET'}
+        self.assertEqual(sample(process.stdout, 'pickeasy_request_seconds_count', labels), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,12 @@
 import unittest
+import pytest
 from models import User, Restaurant, Points
 from models import db
 import time
 from app import app
 from databaseHelpers import points as pointshelper
 
+@pytest.mark.usefixtures('database')
 class SelectPointsTest(unittest.TestCase):
     """
     Test get_points() in databaseHelpers/points.py
@@ -12,13 +14,14 @@ class SelectPointsTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_get_existing_points_entry(self):
         """
@@ -0,0 +1,104 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from app import create_app
+from instrumentation.profiler import make_token, check_token, collapse, list_captures, TOKEN_HEADER
+
+
+class ProfilerTest(unittest.TestCase):
+    """
+    Tests instrumentation/profiler.py and the /adminProfiles pages
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.app = create_app(TESTING = True, SQLALCHEMY_DATABASE_URI = 'sqlite://', PROFILER_DIR = self.folder,
+                              ADMIN_UIDS = [1])
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_token(self):
+        """
+        Tests checking tokens. Expect only unexpired tokens signed with the secret to be valid.
+        """
+        self.assertTrue(check_token("secret", make_token("secret")))
+        self.assertFalse(check_token("other", make_token("secret")))
+        self.assertFalse(check_token("secret", make_token("secret", ttl = -1)))
+        self.assertFalse(check_token("secret", "garbage"))
+        self.assertFalse(check_token("secret", None))
+
+    def test_collapse(self):
+        """
+        Tests collapsing the current stack. Expect the callers first and this test last.
+        """
+        stack = collapse(sys._getframe())
+        self.assertTrue(stack.endswith("testProfiler.py:test_collapse"))
+        self.assertEqual(stack.count(";"), len(stack.split(";")) - 1)
+
+    def test_unprofiled_request(self):
+        """
+        Tests a request without a token. Expect nothing to be written.
+        """
+        self.client.get('/login')
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_token_request(self):
+        """
+        Tests a request sending a valid token. Expect its stacks and timeline to be written.
+        """
+        token = make_token(self.app.config['SECRET_KEY'])
+        self.client.get('/login', headers = {TOKEN_HEADER: token})
+        captures = list_captures(self.folder)
+        self.assertEqual(len(captures), 1)
+        self.assertEqual(captures[0]['trigger'], 'token')
+        self.assertEqual(captures[0]['endpoint'], 'registration_page.login')
+        self.assertEqual(captures[0]['status'], 200)
+        self.assertTrue(os.path.exists(os.path.join(self.folder, captures[0]['name'] + '.collapsed')))
+
+    def test_slow_threshold(self):
+        """
+        Tests the slow request threshold. Expect only requests slower than it to be kept.
+        """
+        self.app.config['PROFILER_SLOW_THRESHOLD'] = 60
+        self.client.get('/login')
+        self.assertEqual(list_captures(self.folder), [])
+        self.app.config['PROFILER_SLOW_THRESHOLD'] = 0
+        self.client.get('/login')
+        self.assertEqual([c['trigger'] for c in list_captures(self.folder)], ['slow'])
+
+    def test_keep(self):
+        """
+        Tests profiling more requests than PROFILER_KEEP. Expect the oldest captures to be removed.
+        """
+        self.app.config['PROFILER_SAMPLE_RATE'] = 1.0
+        self.app.config['PROFILER_KEEP'] = 2
+        for i in range(4):
+            self.client.get('/login')
+        self.assertEqual(len(list_captures(self.folder)), 2)
+        self.assertEqual(len(os.listdir(self.folder)), 4)
+
+    def test_admin_pages(self):
+        """
+        Tests the profile list and download. Expect them to be forbidden to users not in ADMIN_UIDS.
+        """
+        self.client.get('/login', headers = {TOKEN_HEADER: make_token(self.app.config['SECRET_KEY'])})
+        name = list_captures(self.folder)[0]['name']
+        self.assertEqual(self.client.get('/adminProfiles').status_code, 403)
+        self.assertEqual(self.client.get('/adminProfiles/%s.json' % name).status_code, 403)
+        with self.client.session_transaction() as session:
+            session['account'] = 1
+        page = self.client.get('/adminProfiles')
+        self.assertEqual(page.status_code, 200)
+        self.assertIn(name, page.get_data(as_text = True))
+        download = self.client.get('/adminProfiles/%s.json' % name)
+        self.assertEqual(download.status_code, 200)
+        self.assertIn(b'"trigger": "token"', download.data)
+        self.assertEqual(self.client.get('/adminProfiles/manager.py').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
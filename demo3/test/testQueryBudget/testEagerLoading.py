@@ -0,0 +1,126 @@
+import unittest
+from datetime import datetime, timedelta
+import pytest
+from exts import db
+from models import Achievements, Coupon, Customer_Achievement_Progress, Employee, Favourite, Redeemed_Coupons, \
+    Restaurant, User
+from databaseHelpers.employee import get_employees
+from databaseHelpers.achievementProgress import get_updated_info
+from instrumentation.queries import count_queries
+
+
+@pytest.mark.usefixtures('seeded')
+class EagerLoadingTest(unittest.TestCase):
+    """
+    Tests the pages and helpers listing related rows run the same number of
+    queries whatever the length of the list, on the seeded app of conftest.py
+    """
+
+    def setUp(self):
+        self.uid = self.samples['uid']
+        with self.client.session_transaction() as session:
+            session['account'] = self.uid
+            session['type'] = -1
+
+    def add_restaurants(self, count):
+        """
+        Adds restaurants, each with a coupon and an achievement.
+
+        Returns:
+            A list of (rid, cid, aid) tuples.
+        """
+        rows = []
+        for i in range(count):
+            restaurant = Restaurant(name = "Eager %d" % i, address = "%d Eager street" % i, uid = self.samples['owner'])
+            db.session.add(restaurant)
+            db.session.flush()
+            coupon = Coupon(rid = restaurant.rid, deleted = 0, name = "Eager coupon %d" % i, points = 1, level = 0,
+                            description = "A coupon")
+            achievement = Achievements(rid = restaurant.rid, name = "Eager achievement %d" % i, experience = 1,
+                                       points = 1, type = 3, value = ";5;True;;")
+            db.session.add_all([coupon, achievement])
+            db.session.flush()
+            rows.append((restaurant.rid, coupon.cid, achievement.aid))
+        db.session.commit()
+        return rows
+
+    def add_customer_rows(self, count):
+        """
+        Adds a favourite, a redeemed coupon and an achievement progress of the sample customer in count new restaurants.
+        """
+        for rid, cid, aid in self.add_restaurants(count):
+            db.session.add_all([
+                Favourite(uid = self.uid, rid = rid),
+                Redeemed_Coupons(cid = cid, uid = self.uid, rid = rid, valid = 1),
+                Customer_Achievement_Progress(aid = aid, uid = self.uid, progress = 1, total = 5,
+                                              update = datetime.now() + timedelta(days = 1, seconds = aid))])
+        db.session.commit()
+
+    def page_queries(self, path):
+        with count_queries() as log:
+            response = self.client.get(path)
+            response.get_data()
+        self.assertEqual(response.status_code, 200)
+        return log.count
+
+    def test_customer_pages(self):
+        """
+        Tests the customer pages listing favourites, coupons and achievements with 3 and then 13 new rows.
+        Expect the same number of queries.
+        """
+        for path in ('/home', '/favourites', '/coupon'):
+            self.add_customer_rows(3)
+            before = self.page_queries(path)
+            self.add_customer_rows(10)
+            with self.subTest(path = path):
+                self.assertEqual(self.page_queries(path), before)
+
+    def test_favourites_page(self):
+        """
+        Tests the favourites page. Expect the name and address of every favourite restaurant.
+        """
+        self.add_customer_rows(2)
+        page = self.client.get('/favourites').get_data(as_text = True)
+        for i in range(2):
+            self.assertIn("Eager %d" % i, page)
+            self.assertIn("%d Eager street" % i, page)
+
+    def test_get_employees(self):
+        """
+        Tests get_employees with 10 more employees. Expect a single query either way.
+        """
+        rid = self.samples['rid']
+        with count_queries() as log:
+            before = get_employees(rid)
+        self.assertEqual(log.count, 1)
+        users = [User(name = "eager%d" % i, password = "password", email = "eager%d@eager.test" % i, type = 0)
+                 for i in range(10)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all([Employee(uid = u.uid, rid = rid) for u in users])
+        db.session.commit()
+        db.session.expire_all()
+        with count_queries() as log:
+            after = get_employees(rid)
+        self.assertEqual(log.count, 1)
+        self.assertEqual(len(after), len(before) + 10)
+        self.assertIn({"uid": users[0].uid, "name": "eager0", "email": "eager0@eager.test", "type": 0}, after)
+
+    def test_get_updated_info(self):
+        """
+        Tests get_updated_info on progress rows of new achievements. Expect one query and the restaurant of each.
+        """
+        self.add_customer_rows(3)
+        progress = Customer_Achievement_Progress.query.filter(Customer_Achievement_Progress.uid == self.uid) \
+            .order_by(Customer_Achievement_Progress.update.desc()).limit(3).all()
+        db.session.expire_all()
+        progress = [Customer_Achievement_Progress.query.get((ap.aid, ap.uid)) for ap in progress]
+        with count_queries() as log:
+            info = get_updated_info(progress)
+        self.assertEqual(log.count, 1)
+        self.assertEqual(sorted(i['rname'] for i in info), ["Eager 0", "Eager 1", "Eager 2"])
+        self.assertEqual(info[0]['description'], "Visit 5 times.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import pytest
+from exts import db
+from models import Achievements, Coupon, Customer_Achievement_Progress, Redeemed_Coupons
+from databaseHelpers.restaurant import get_rid
+from benchmarks.run import get_routes, route_url, OWNER_ENDPOINTS
+from instrumentation.queries import count_queries
+
+# Maximum number of queries of a GET of each route against the tiny
+# benchmark data set. Every route needs a budget, lower it when a route
+# gets cheaper.
+QUERY_BUDGETS = {
+    'admin_page.memory': 0,
+    'admin_page.profile_file': 0,
+    'admin_page.profiles': 0,
+    'achievement_page.achievement': 2,
+    'achievement_page.achievement_stats': 3,
+    'achievement_page.create_achievement': 0,
+    'achievement_page.use_achievement': 6,
+    'coupon_page.coupon': 1,
+    'coupon_page.couponStats': 3,
+    'coupon_page.create_coupon': 0,
+    'coupon_page.use_coupon': 8,
+    'employee_page.employee': 2,
+    'home_page.home': 5,
+    'leaderboard_page.leaderboard': 13,
+    'login_page.login': 0,
+    'login_page.logout': 0,
+    'metrics_page.metrics': 0,
+    'milestones_page.settings': 2,
+    'profile_page.edit_restaurant_info': 3,
+    'profile_page.profile': 1,
+    'qr_page.scan_failure': 0,
+    'qr_page.scan_forbidden': 0,
+    'qr_page.scan_nonexistent': 0,
+    'qr_page.scan_successful': 0,
+    'registration_page.employee_register': 0,
+    'registration_page.login': 0,
+    'registration_page.owner_register': 0,
+    'registration_page.registration': 0,
+    'registration_page.user_register': 0,
+    'restaurant_page.favourites': 2,
+    'search_page.couponOffers': 5,
+    'search_page.leaderBoard': 12,
+    'search_page.milestones': 4,
+    'search_page.restaurant': 13,
+    'search_page.restaurantAchievements': 4,
+    'search_page.search': 0,
+}
+
+# Budgets of the routes whose owner view differs from the customer view,
+# which QUERY_BUDGETS covers. They must not grow with the restaurant's lists.
+OWNER_QUERY_BUDGETS = {
+    'home_page.home': 8,
+}
+
+
+@pytest.mark.usefixtures('seeded')
+class RouteQueryBudgetTest(unittest.TestCase):
+    """
+    Tests the number of queries of every route against QUERY_BUDGETS, on the
+    seeded app of conftest.py
+    """
+
+    def test_every_route_has_a_budget(self):
+        """
+        Tests every endpoint of the app has a query budget.
+        """
+        endpoints = set(endpoint for endpoint, rule in get_routes(self.app))
+        self.assertEqual(endpoints - set(QUERY_BUDGETS), set())
+
+    def test_routes_within_budget(self):
+        """
+        Tests a GET of every route. Expect no route to run more queries than its budget.
+        """
+        for endpoint, rule in get_routes(self.app):
+            owner = endpoint in OWNER_ENDPOINTS
+            with self.client.session_transaction() as session:
+                session['account'] = self.samples['owner'] if owner else self.samples['uid']
+                session['type'] = 1 if owner else -1
+            # Streamed pages run their queries while the body is read
+            with count_queries() as log:
+                self.client.get(route_url(rule, self.samples)).get_data()
+            with self.subTest(endpoint = endpoint):
+                self.assertLessEqual(log.count, QUERY_BUDGETS.get(endpoint, 0))
+
+    def add_lists(self, count):
+        """
+        Adds count coupons redeemed by the sample customer and count
+        achievements they started to the sample owner's restaurant.
+        """
+        rid = get_rid(self.samples['owner'])
+        coupons = [Coupon(rid = rid, name = "Budget %d" % i, description = "Budget", points = 1, level = 0,
+                          deleted = 0) for i in range(count)]
+        achievements = [Achievements(rid = rid, name = "Budget %d" % i, experience = 1, points = 1, type = 3,
+                                     value = ";2;True;;") for i in range(count)]
+        db.session.add_all(coupons + achievements)
+        db.session.flush()
+        db.session.add_all([Redeemed_Coupons(rid = rid, cid = c.cid, uid = self.samples['uid'], valid = 1)
+                            for c in coupons])
+        db.session.add_all([Customer_Achievement_Progress(aid = a.aid, uid = self.samples['uid'], progress = 1,
+                                                          total = 2) for a in achievements])
+        db.session.commit()
+
+    def test_owner_views_within_budget(self):
+        """
+        Tests a GET of every route in OWNER_QUERY_BUDGETS as the owner, before and after adding 20 coupons and
+        achievements to the restaurant. Expect the same number of queries, within the budget.
+        """
+        with self.client.session_transaction() as session:
+            session['account'] = self.samples['owner']
+            session['type'] = 1
+        routes = dict(get_routes(self.app))
+        for endpoint, budget in OWNER_QUERY_BUDGETS.items():
+            counts = []
+            for added in (0, 20):
+                self.add_lists(added)
+                with count_queries() as log:
+                    self.client.get(route_url(routes[endpoint], self.samples)).get_data()
+                counts.append(log.count)
+            with self.subTest(endpoint = endpoint):
+                self.assertEqual(counts[0], counts[1])
+                self.assertLessEqual(counts[1], budget)
+
+
+if __name__ == "__main__":
+    unittest.main()
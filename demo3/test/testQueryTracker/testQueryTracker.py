@@ -0,0 +1,87 @@
+import unittest
+import pytest
+from app import app
+from databaseHelpers.employee import *
+from instrumentation.queries import QueryLog, count_queries
+from models import db
+from models import Employee, User
+
+
+@pytest.mark.usefixtures('database')
+class QueryTrackerTest(unittest.TestCase):
+    """
+    Tests the query counting in instrumentation/queries.py
+    """
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
+        app.config['SQL_QUERY_HEADERS'] = True
+        self.app = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+        for uid in range(1, 7):
+            db.session.add(User(uid=uid, name="employee", email="e%d@test.com" % uid, password="x", type=0))
+            db.session.add(Employee(uid=uid, rid=1))
+        db.session.commit()
+
+    def tearDown(self):
+        app.config['SQL_QUERY_HEADERS'] = None
+        db.session.remove()
+        self.ctx.pop()
+
+    def test_count_queries(self):
+        """
+        Tests counting the queries of get_employees() with 6 employees. Expect one query, the users are joined.
+        """
+        with count_queries() as log:
+            get_employees(1)
+        self.assertEqual(log.count, 1)
+        self.assertGreater(log.duration, 0)
+
+    def test_n_plus_one(self):
+        """
+        Tests the N+1 detection on a User query per employee. Expect the User query to be reported.
+        """
+        with count_queries() as log:
+            for e in Employee.query.filter(Employee.rid == 1).all():
+                User.query.filter(User.uid == e.uid).first()
+        repeated = log.n_plus_one(5)
+        self.assertEqual(len(repeated), 1)
+        self.assertIn("FROM user", repeated[0][0])
+        self.assertEqual(repeated[0][1], 6)
+
+    def test_same_parameters_are_not_n_plus_one(self):
+        """
+        Tests a statement repeated with the same parameters. Expect no N+1.
+        """
+        log = QueryLog()
+        log.queries = [("SELECT 1 WHERE a = ?", (1,), 0.001, 0.0)] * 6
+        self.assertEqual(log.n_plus_one(5), [])
+
+    def test_response_headers(self):
+        """
+        Tests the query headers of a response when they are enabled.
+        """
+        with self.app.session_transaction() as session:
+            session['account'] = 1
+            session['type'] = 1
+        response = self.app.get('/employee')
+        # The page is streamed, reading it ends the request
+        response.get_data()
+        self.assertIn('X-SQL-Queries', response.headers)
+        self.assertIn('X-SQL-Time', response.headers)
+        self.assertEqual(response.headers['X-SQL-N-Plus-One'], '0')
+
+    def test_no_headers_when_disabled(self):
+        """
+        Tests the query headers of a response when they are disabled.
+        """
+        app.config['SQL_QUERY_HEADERS'] = False
+        response = self.app.get('/login')
+        self.assertNotIn('X-SQL-Queries', response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import pytest
+import time
+from flask import session
+from models import Restaurant
+from app import app
+from exts import LAST_WRITE_KEY
+from databaseHelpers.restaurant import *
+
+
+@pytest.mark.usefixtures('database')
+class RoutingSessionTest(unittest.TestCase):
+    """
+    Test read only helpers are routed to the replica bind in exts.py
+    """
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
+        app.config['SQLALCHEMY_BINDS'] = {'replica': app.config['TEST_REPLICA_DATABASE_URI']}
+        app.config['SQLALCHEMY_REPLICA_BINDS'] = ['replica']
+        app.config['REPLICATION_LAG_TOLERANCE'] = 5
+        self.ctx = app.app_context()
+        self.ctx.push()
+        self.replica = db.get_engine(app, 'replica')
+        db.Model.metadata.create_all(bind=self.replica)
+        db.session.add(Restaurant(rid = 1, name = "primary", address = "1 Main street", uid = 1))
+        db.session.commit()
+        db.session.remove()
+        self.replica.execute(Restaurant.__table__.insert(), rid = 1, name = "replica", address = "1 Main street", uid = 1)
+
+    def tearDown(self):
+        db.session.remove()
+        db.Model.metadata.drop_all(bind=self.replica)
+        app.config['SQLALCHEMY_BINDS'] = {}
+        app.config['SQLALCHEMY_REPLICA_BINDS'] = []
+        self.ctx.pop()
+
+    def test_read_only_helper_uses_replica(self):
+        """
+        Test a read only helper reads from the replica. Expect the replica's row.
+        """
+        self.assertEqual(get_restaurant_name_by_rid(1), "replica")
+
+    def test_other_helper_uses_primary(self):
+        """
+        Test a helper that is not read only reads from the primary. Expect the primary's row.
+        """
+        self.assertEqual(get_resturant_by_rid(1).name, "primary")
+
+    def test_read_after_write_uses_primary(self):
+        """
+        Test a read only helper that follows a write in the same session. Expect the primary's row.
+        """
+        insert_new_restaurant("another", "2 Main street", 2)
+        self.assertEqual(get_restaurant_name_by_rid(1), "primary")
+
+    def test_no_replica_uses_primary(self):
+        """
+        Test a read only helper when no replica is configured. Expect the primary's row.
+        """
+        app.config['SQLALCHEMY_REPLICA_BINDS'] = []
+        self.assertEqual(get_restaurant_name_by_rid(1), "primary")
+
+    def test_recent_write_in_user_session_uses_primary(self):
+        """
+        Test a read only helper for a user who wrote within the lag tolerance. Expect the primary's row.
+        """
+        with app.test_request_context('/'):
+            session[LAST_WRITE_KEY] = time.time()
+            self.assertEqual(get_restaurant_name_by_rid(1), "primary")
+
+    def test_old_write_in_user_session_uses_replica(self):
+        """
+        Test a read only helper for a user who wrote before the lag tolerance. Expect the replica's row.
+        """
+        with app.test_request_context('/'):
+            session[LAST_WRITE_KEY] = time.time() - 10
+            self.assertEqual(get_restaurant_name_by_rid(1), "replica")
+
+
+if __name__ == "__main__":
+    unittest.main()
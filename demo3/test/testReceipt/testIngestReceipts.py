@@ -0,0 +1,150 @@
+import unittest
+import pytest
+import os
+import json
+import tempfile
+from app import app
+from databaseHelpers.receipt import *
+from databaseHelpers.threshold import get_milestone_table
+from models import db
+from models import User, Restaurant, Employee, Achievements, Customer_Achievement_Progress, Points, Experience, \
+    Thresholds
+from instrumentation.queries import count_queries
+
+
+@pytest.mark.usefixtures('database')
+class IngestReceiptsTest(unittest.TestCase):
+    """
+    Tests ingest_receipts() and ingest_export() in databaseHelpers/receipt.py
+    """
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
+        self.client = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.session.add_all([User(uid=1, name='owner', password='passwd', email='owner@test', type=1),
+                            User(uid=2, name='cus', password='passwd', email='cus@test', type=-1),
+                            User(uid=3, name='other', password='passwd', email='other@test', type=1),
+                            Restaurant(rid=1, name='test', address='test', uid=1),
+                            # aid 1 to 5: buy 3 fries, spend $20, group of 4, visit twice, expired visit
+                            Achievements(aid=1, rid=1, name='fries', experience=100, points=10, type=0,
+                                         value='Fries;3;True;;'),
+                            Achievements(aid=2, rid=1, name='spend', experience=100, points=20, type=1,
+                                         value=';20.00;True;;'),
+                            Achievements(aid=3, rid=1, name='group', experience=100, points=40, type=2,
+                                         value=';4;True;;'),
+                            Achievements(aid=4, rid=1, name='visit', experience=100, points=80, type=3,
+                                         value=';2;True;;'),
+                            Achievements(aid=5, rid=1, name='old', experience=100, points=160, type=3,
+                                         value=';1;False;2020-1-1;2020-1-31'),
+                            Thresholds(rid=1, level=1, reward=1000), Thresholds(rid=1, level=2, reward=2000)])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+
+    def progress(self):
+        return dict((p.aid, p.progress) for p in Customer_Achievement_Progress.query.filter_by(uid=2))
+
+    def test_one_receipt(self):
+        """
+        Tests a receipt with 2 fries, $25 spent and a group of 2. Expect every matching active achievement advanced.
+        """
+        rejected, stats = ingest_receipts([{'uid': 2, 'rid': 1, 'total': 25,  'party': 2,
+                                            'items': [{'name': 'fries', 'quantity': 2}]}])
+        self.assertEqual(rejected, [])
+        self.assertEqual(self.progress(), {1: 2, 2: 1, 4: 1})
+        self.assertEqual(stats['completed'], [{'aid': 2, 'uid': 2}])
+        self.assertEqual(Points.query.filter_by(uid=2, rid=1).first().points, 20 + 1000)
+        self.assertEqual(Experience.query.filter_by(uid=2, rid=1).first().experience, 100)
+
+    def test_batch_completes_and_crosses_milestones(self):
+        """
+        Tests a batch completing four achievements. Expect every reward and both milestones credited, and
+        progress capped at its maximum.
+        """
+        receipt = {'uid': 2, 'rid': 1, 'total': 25, 'party': 4, 'items': [{'name': 'FRIES', 'quantity': 5}]}
+        rejected, stats = ingest_receipts([receipt, receipt])
+        self.assertEqual(rejected, [])
+        self.assertEqual(self.progress(), {1: 3, 2: 1, 3: 1, 4: 2})
+        self.assertEqual(len(stats['completed']), 4)
+        # 400 experience is level 2
+        self.assertEqual(Experience.query.filter_by(uid=2, rid=1).first().experience, 400)
+        self.assertEqual(Points.query.filter_by(uid=2, rid=1).first().points, 150 + 3000)
+
+    def test_constant_queries(self):
+        """
+        Tests a batch of 1 receipt, then of 2 receipts for each of 50 customers, all completing achievements.
+        Expect the same number of queries.
+        """
+        db.session.add_all([User(uid=uid, name='cus', password='passwd', email='%d@test' % uid, type=-1)
+                            for uid in range(10, 60)])
+        db.session.commit()
+        receipt = {'rid': 1, 'total': 30, 'party': 1}
+        # Both batches read the milestones from the cache
+        get_milestone_table(1)
+        with count_queries() as small:
+            ingest_receipts([dict(receipt, uid=2)])
+        with count_queries() as large:
+            ingest_receipts([dict(receipt, uid=uid) for uid in range(10, 60)] * 2)
+        self.assertEqual(large.count, small.count)
+        self.assertEqual(Points.query.filter_by(uid=59, rid=1).first().points, 20 + 80 + 1000)
+
+    def test_rejected(self):
+        """
+        Tests a batch with invalid receipts. Expect them rejected and nothing written.
+        """
+        rejected, stats = ingest_receipts([{'uid': 2, 'rid': 1}, {'uid': 1, 'rid': 1}, {'uid': 2},
+                                           {'uid': 2, 'rid': 1, 'items': [{'quantity': 2}]}])
+        self.assertIsNone(stats)
+        self.assertEqual([r['index'] for r in rejected], [1, 2, 3])
+        self.assertEqual(self.progress(), {})
+
+    def test_scanner(self):
+        """
+        Tests receipts sent by the owner and by another user. Expect only the owner's accepted.
+        """
+        rejected, stats = ingest_receipts([{'uid': 2, 'rid': 1}], scanner=3)
+        self.assertEqual(rejected, [{'index': 0, 'errors': ["You cannot scan at this restaurant."]}])
+        rejected, stats = ingest_receipts([{'uid': 2, 'rid': 1}], scanner=1)
+        self.assertEqual(rejected, [])
+
+    def test_route(self):
+        """
+        Tests posting receipts to /receipts as a customer, then as the owner. Expect 403, then the stats.
+        """
+        with self.client.session_transaction() as session:
+            session['account'] = 2
+            session['type'] = -1
+        self.assertEqual(self.client.post('/receipts', json={'uid': 2, 'rid': 1}).status_code, 403)
+        with self.client.session_transaction() as session:
+            session['account'] = 1
+            session['type'] = 1
+        response = self.client.post('/receipts', json={'receipts': [{'uid': 2, 'rid': 1, 'total': 30}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['completed'], [{'aid': 2, 'uid': 2}])
+        response = self.client.post('/receipts', json=[{'uid': 2, 'rid': 1, 'total': -1}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_export(self):
+        """
+        Tests a JSONL export with a rejected line, in chunks of 2. Expect the valid receipts applied.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'receipts.jsonl')
+            with open(path, 'w') as f:
+                for receipt in [{'uid': 2, 'rid': 1}, {'uid': 9, 'rid': 1}, {'uid': 2, 'rid': 1}]:
+                    f.write(json.dumps(receipt) + "\n")
+            messages = []
+            stats = ingest_export(path, chunk_size=2, log=messages.append)
+        self.assertEqual(stats, {'read': 3, 'rejected': 1, 'advanced': 2, 'completed': 1})
+        self.assertIn("Line 2 rejected: No customer with this uid.", messages)
+        self.assertEqual(self.progress(), {4: 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
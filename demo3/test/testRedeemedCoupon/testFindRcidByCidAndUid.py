@@ -1,4 +1,5 @@
 import unittest
+import pytest
 from models import Redeemed_Coupons, Coupon, Restaurant
 from models import db
 from app import app
@@ -6,6 +7,7 @@ from databaseHelpers import redeemedCoupons as rchelper
 from databaseHelpers import coupon as chelper
 
 
+@pytest.mark.usefixtures('database')
 class FindRcidByCidAndUid(unittest.TestCase):
     """
     Test find_rcid_by_cid_and_uid(cid, uid) in redeemedCoupons.py
@@ -13,13 +15,14 @@ class FindRcidByCidAndUid(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_one_coupon(self):
         """
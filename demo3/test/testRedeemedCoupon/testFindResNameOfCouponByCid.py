@@ -1,10 +1,12 @@
 import unittest
+import pytest
 from models import Coupon, Restaurant
 from models import db
 from app import app
 from databaseHelpers import coupon as chelper
 
 
+@pytest.mark.usefixtures('database')
 class FindResnameByCid(unittest.TestCase):
     """
     Test find_res_name_of_coupon_by_cid() in redeemedCoupons.py
@@ -13,13 +15,14 @@ class FindResnameByCid(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_normal_resname_valid_cid(self):
         """
@@ -1,4 +1,5 @@
 import unittest
+import pytest
 from databaseHelpers.redeemedCoupons import insert_redeemed_coupon
 from models import User, Coupon, Restaurant, Employee, Redeemed_Coupons
 from models import db
@@ -7,6 +8,7 @@ from app import app
 from databaseHelpers import redeemedCoupons
 from datetime import datetime
 
+@pytest.mark.usefixtures('database')
 class InsertRedeemedCouponTest(unittest.TestCase):
     """
     Test insert_redeemed_coupon() in databaseHelpers.redeemedCoupons.py.
@@ -14,13 +16,14 @@ class InsertRedeemedCouponTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_insert_coupon(self):
         """
@@ -1,10 +1,12 @@
 import unittest
+import pytest
 from models import Redeemed_Coupons
 from models import db
 from app import app
 from databaseHelpers import redeemedCoupons as rchelper
 
 
+@pytest.mark.usefixtures('database')
 class MarkRedeemedCoupon(unittest.TestCase):
     """
     Test mark_redeem_coupon_used_by_rcid(rcid) in redeemedCoupons.py
@@ -12,13 +14,14 @@ class MarkRedeemedCoupon(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_valid_coupon(self):
         """
@@ -1,4 +1,5 @@
 import unittest
+import pytest
 from models import User, Coupon, Restaurant, Employee
 from models import db
 import time
@@ -6,6 +7,7 @@ from app import app
 from databaseHelpers.restaurant import get_errmsg_registration as get_errmsg
 
 
+@pytest.mark.usefixtures('database')
 class InsertRestaurantTest(unittest.TestCase):
     '''
     Test insert_new_restaurant() in databaseHelpers/restaurant.py
@@ -13,13 +15,14 @@ class InsertRestaurantTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_no_errmsg(self):
         """Tests that valid input results in no errors"""
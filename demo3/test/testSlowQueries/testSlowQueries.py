@@ -0,0 +1,124 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from app import create_app
+from exts import db
+from models import User
+from databaseHelpers.user import get_user_name_by_uid
+from instrumentation.slowQueries import explain, normalize, read_entries, report
+
+
+class SlowQueryLogTest(unittest.TestCase):
+    """
+    Tests instrumentation/slowQueries.py
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'slow.jsonl')
+        # Every statement is slow with a threshold of 0
+        self.app = create_app(TESTING = True, SQLALCHEMY_DATABASE_URI = 'sqlite://', SLOW_QUERY_LOG = self.path)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(name = "joe", email = "joe@utsc.com", password = "passwd", type = -1))
+        db.session.commit()
+        self.app.config['SLOW_QUERY_THRESHOLD'] = 0
+
+    def tearDown(self):
+        self.app.config['SLOW_QUERY_THRESHOLD'] = None
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.folder)
+
+    def test_normalize(self):
+        """
+        Tests normalizing statements. Expect literals, parameters and IN lists to be replaced.
+        """
+        self.assertEqual(normalize("SELECT *\n  FROM user WHERE uid IN (?, ?, ?) AND type = 1"),
+                         "SELECT * FROM user WHERE uid IN (?...) AND type = ?")
+        self.assertEqual(normalize("SELECT * FROM user WHERE email = 'a''b' AND uid = %(uid_1)s"),
+                         "SELECT * FROM user WHERE email = ? AND uid = ?")
+        self.assertEqual(normalize("SELECT param_1 FROM user WHERE uid IN (%s, %s)"),
+                         "SELECT param_1 FROM user WHERE uid IN (?...)")
+
+    def test_disabled(self):
+        """
+        Tests a query with no threshold. Expect nothing to be logged.
+        """
+        self.app.config['SLOW_QUERY_THRESHOLD'] = None
+        get_user_name_by_uid(1)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_helper_query(self):
+        """
+        Tests a slow SELECT sent by a helper. Expect its parameters, helper and plan to be logged.
+        """
+        get_user_name_by_uid(1)
+        entries = list(read_entries(self.path))
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['caller'], 'user.get_user_name_by_uid')
+        self.assertEqual(entries[0]['parameters'], [1, 1, 0])
+        self.assertIsNone(entries[0]['endpoint'])
+        self.assertIsInstance(entries[0]['plan'], list)
+        self.assertIn('user', " ".join(" ".join(row) for row in entries[0]['plan']))
+
+    def test_request_query(self):
+        """
+        Tests a slow statement sent during a request. Expect it logged with its endpoint and plan once the
+        response is closed.
+        """
+        with self.app.test_client() as client:
+            with client.session_transaction() as session:
+                session['account'] = 1
+                session['type'] = -1
+            response = client.get('/profile')
+            self.assertEqual(list(read_entries(self.path)), [])
+            response.close()
+        entries = list(read_entries(self.path))
+        self.assertTrue(entries)
+        self.assertEqual(set(e['endpoint'] for e in entries), {'profile_page.profile'})
+        self.assertTrue(all(isinstance(e['plan'], list) for e in entries if e['statement'].startswith('SELECT')))
+
+    def test_explain_failure(self):
+        """
+        Tests a slow statement whose EXPLAIN fails. Expect the error logged as its plan and the transaction
+        of the statement still usable.
+        """
+        self.assertIn("EXPLAIN failed", explain(db.engine, "SELECT * FROM missing_table", ()))
+        db.session.add(User(name = "ann", email = "ann@utsc.com", password = "passwd", type = -1))
+        db.session.flush()
+        self.assertEqual(User.query.count(), 2)
+        db.session.commit()
+
+    def test_rotation(self):
+        """
+        Tests logging more than SLOW_QUERY_LOG_BYTES. Expect the log to be rotated and still read in full.
+        """
+        self.app.config['SLOW_QUERY_LOG_BYTES'] = 1000
+        self.app.config['SLOW_QUERY_LOG_BACKUPS'] = 20
+        self.app.extensions['slow_query_log'] = None
+        for i in range(10):
+            get_user_name_by_uid(i)
+        self.assertTrue(os.path.exists(self.path + '.1'))
+        self.assertEqual(len(list(read_entries(self.path))), 10)
+
+    def test_report(self):
+        """
+        Tests the report. Expect executions with different parameters to be grouped by shape.
+        """
+        for i in range(3):
+            get_user_name_by_uid(i)
+        db.session.query(User).filter(User.uid.in_([1, 2])).all()
+        groups = report(self.path)
+        self.assertEqual(len(groups), 2)
+        by_count = {g['count']: g for g in groups}
+        self.assertEqual(by_count[3]['callers'], ['user.get_user_name_by_uid'])
+        self.assertEqual(by_count[1]['callers'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
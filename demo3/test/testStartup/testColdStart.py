@@ -0,0 +1,69 @@
+import unittest
+import os
+import subprocess
+import sys
+
+# Modules that are only needed by a few pages and must not load at startup
+LAZY_MODULES = ['qrcode', 'PIL', 'dateutil']
+
+# Packages whose modules are imported by the first request that uses them
+LAZY_PACKAGES = ['databaseHelpers']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_python(*args):
+    """
+    Runs a fresh interpreter in the app's root directory.
+
+    Returns:
+        The finished process.
+    """
+    return subprocess.run([sys.executable] + list(args), cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def imported_modules(process):
+    """
+    Lists the modules reported by -X importtime.
+
+    Returns:
+        A set of module names.
+    """
+    return set(line.split('|')[-1].strip() for line in process.stderr.splitlines()
+               if line.startswith('import time:') and '|' in line)
+
+
+class ColdStartTest(unittest.TestCase):
+    """
+    Test what importing app.py loads in a new process.
+
+    The modules are budgeted rather than the milliseconds, which depend on
+    the load of the machine, e.g. other test workers.
+    """
+    def test_import_budget(self):
+        """
+        Test the modules -X importtime reports for app. Expect none of the lazy modules, views or helpers.
+        """
+        process = run_python('-X', 'importtime', '-c', 'import app')
+        self.assertEqual(process.returncode, 0, process.stderr)
+        modules = imported_modules(process)
+        self.assertIn('app', modules)
+        self.assertIn('routes.urls', modules)
+        top_level = set(m.split('.')[0] for m in modules)
+        self.assertEqual(top_level & set(LAZY_MODULES + LAZY_PACKAGES), set())
+        self.assertEqual([m for m in modules if m.startswith('routes.') and m != 'routes.urls'], [])
+
+    def test_first_request_imports_view(self):
+        """
+        Test a request to the login page. Expect only its view module and helpers imported.
+        """
+        code = ('import app, sys; app.app.test_client().get("/login"); '
+                'print(",".join(sorted(m for m in sys.modules if m.startswith("routes."))))')
+        process = run_python('-c', code)
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.strip().split(','), ['routes.registration', 'routes.urls'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import tracemalloc
+import pytest
+from exts import db
+from models import Coupon
+from databaseHelpers.restaurant import get_rid
+from databaseHelpers.employee import get_employees, iter_employees
+from databaseHelpers.achievement import get_achievements_by_rid
+from databaseHelpers.achievementProgress import get_achievement_progress_stats, iter_achievement_progress_stats
+from databaseHelpers.redeemedCoupons import get_redeemed_coupons_by_rid, iter_redeemed_coupons_by_rid
+
+COLUMNS = ('cid', 'name', 'description', 'points', 'level', 'begin', 'expiration', 'deleted')
+
+
+@pytest.mark.usefixtures('seeded')
+class StreamedHelperTest(unittest.TestCase):
+    """
+    Tests the generator helpers give the rows of the list helpers they stream, on the seeded app of conftest.py
+    """
+
+    def test_iter_redeemed_coupons_by_rid(self):
+        """
+        Tests the coupons of the sample restaurant. Expect the holders and uses of get_redeemed_coupons_by_rid.
+        """
+        rid = self.samples['rid']
+        rows = [dict((key, getattr(row, key)) for key in COLUMNS + ('holders', 'used'))
+                for row in iter_redeemed_coupons_by_rid(rid, batch_size = 3)]
+        self.assertNotEqual(rows, [])
+        self.assertEqual(sorted(rows, key = lambda c: c['cid']),
+                         sorted(get_redeemed_coupons_by_rid(rid), key = lambda c: c['cid']))
+
+    def test_iter_achievement_progress_stats(self):
+        """
+        Tests the achievements of the sample restaurant. Expect the stats of get_achievement_progress_stats.
+        """
+        rid = self.samples['rid']
+        expected = get_achievement_progress_stats(get_achievements_by_rid(rid))
+        self.assertNotEqual(expected, [])
+        self.assertEqual(sorted(iter_achievement_progress_stats(rid, batch_size = 3), key = lambda a: a['aid']),
+                         sorted(expected, key = lambda a: a['aid']))
+
+    def test_iter_employees(self):
+        """
+        Tests the employees of the sample restaurant. Expect the employees of get_employees.
+        """
+        rid = self.samples['rid']
+        rows = [dict(uid = e.uid, name = e.name, email = e.email, type = e.type) for e in iter_employees(rid)]
+        self.assertNotEqual(rows, [])
+        self.assertEqual(sorted(rows, key = lambda e: e['uid']), sorted(get_employees(rid), key = lambda e: e['uid']))
+
+
+@pytest.mark.usefixtures('seeded')
+class StreamedPageTest(unittest.TestCase):
+    """
+    Tests the owner list pages are sent while they are rendered, on the seeded app of conftest.py
+    """
+
+    def setUp(self):
+        with self.client.session_transaction() as session:
+            session['account'] = self.samples['owner']
+            session['type'] = 1
+        self.rid = get_rid(self.samples['owner'])
+
+    def add_coupons(self, count):
+        db.session.bulk_insert_mappings(Coupon, [
+            {'rid': self.rid, 'deleted': 0, 'name': "Streamed %d" % i, 'points': 10, 'level': 0,
+             'description': "A coupon with a long enough description " * 4} for i in range(count)])
+        db.session.commit()
+
+    def peak_memory(self, path):
+        """
+        Reads a page chunk by chunk, dropping each chunk.
+
+        Returns:
+            The peak memory allocated while reading it, in bytes.
+        """
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+            response = self.client.get(path)
+            for chunk in response.response:
+                pass
+            response.close()
+            return tracemalloc.get_traced_memory()[1] - start
+        finally:
+            tracemalloc.stop()
+
+    def test_header_sent_first(self):
+        """
+        Tests the first chunk of /couponStats. Expect the page header without any coupon.
+        """
+        self.add_coupons(50)
+        response = self.client.get('/couponStats')
+        chunks = iter(response.response)
+        first = next(chunks).decode()
+        self.assertIn("Coupon Statistics", first)
+        self.assertNotIn("Streamed 0", first)
+        self.assertIn("Streamed 49", b"".join(chunks).decode())
+        response.close()
+
+    def test_measured_after_body(self):
+        """
+        Tests the query log of /couponStats. Expect it logged once the last chunk is sent, counting the queries
+        of the rows that the X-SQL-Queries header sent before them does not.
+        """
+        self.app.config['SQL_QUERY_HEADERS'] = True
+        with self.assertLogs(self.app.logger, 'DEBUG') as logs:
+            self.app.logger.debug("started")
+            response = self.client.get('/couponStats')
+            chunks = iter(response.response)
+            next(chunks)
+            self.assertEqual(len(logs.output), 1)
+            for chunk in chunks:
+                pass
+            response.close()
+        self.assertEqual(len(logs.output), 2)
+        queries = int(logs.output[1].split(": ")[1].split()[0])
+        self.assertGreater(queries, int(response.headers['X-SQL-Queries']))
+
+    def test_same_page_when_buffered(self):
+        """
+        Tests each list page with STREAM_TEMPLATES off. Expect the same page.
+        """
+        for path in ('/coupon', '/couponStats', '/achievementStats', '/employee'):
+            streamed = self.client.get(path).get_data()
+            self.app.config['STREAM_TEMPLATES'] = False
+            buffered = self.client.get(path).get_data()
+            self.app.config['STREAM_TEMPLATES'] = True
+            with self.subTest(path = path):
+                self.assertEqual(streamed, buffered)
+
+    def test_flat_memory(self):
+        """
+        Tests reading /couponStats with 10 times more coupons. Expect the peak memory to stay about the same.
+        """
+        self.add_coupons(1000)
+        small = self.peak_memory('/couponStats')
+        self.add_coupons(9000)
+        large = self.peak_memory('/couponStats')
+        self.assertLess(large, small * 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
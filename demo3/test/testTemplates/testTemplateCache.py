@@ -0,0 +1,91 @@
+import unittest
+import os
+import shutil
+import tempfile
+import pytest
+from app import create_app
+from exts import template_cache
+from benchmarks.run import get_routes, route_url, OWNER_ENDPOINTS
+
+
+def count_calls(obj, name):
+    """
+    Replaces the method name of obj by one counting its calls.
+
+    Returns:
+        A list holding the number of calls.
+    """
+    calls = [0]
+    method = getattr(obj, name)
+
+    def counted(*args, **kwargs):
+        calls[0] += 1
+        return method(*args, **kwargs)
+    setattr(obj, name, counted)
+    return calls
+
+
+@pytest.mark.usefixtures('seeded')
+class TemplateWarmupTest(unittest.TestCase):
+    """
+    Tests loading the templates at boot, on the seeded app of conftest.py
+    """
+
+    def test_no_compile_after_warm(self):
+        """
+        Tests a GET of every route after warming the templates. Expect no template to be loaded again.
+        """
+        count, seconds = template_cache.warm(self.app)
+        self.assertEqual(count, len([name for name in os.listdir(self.app.jinja_loader.searchpath[0])
+                                     if name.endswith('.html')]))
+        loads = count_calls(self.app.jinja_env.loader, 'load')
+        compiles = count_calls(self.app.jinja_env, 'compile')
+        try:
+            for endpoint, rule in get_routes(self.app):
+                owner = endpoint in OWNER_ENDPOINTS
+                with self.client.session_transaction() as session:
+                    session['account'] = self.samples['owner'] if owner else self.samples['uid']
+                    session['type'] = 1 if owner else -1
+                self.client.get(route_url(rule, self.samples))
+        finally:
+            del self.app.jinja_env.loader.load
+            del self.app.jinja_env.compile
+        self.assertEqual(loads[0], 0)
+        self.assertEqual(compiles[0], 0)
+
+
+class TemplateCacheTest(unittest.TestCase):
+    """
+    Tests the compiled templates saved in TEMPLATE_CACHE_DIR
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_cache_shared_between_apps(self):
+        """
+        Tests warming a second app with the same folder. Expect it to load every template without compiling.
+        """
+        count, seconds = template_cache.warm(create_app(TEMPLATE_CACHE_DIR = self.folder))
+        self.assertEqual(len(os.listdir(self.folder)), count)
+        app = create_app(TEMPLATE_CACHE_DIR = self.folder)
+        compiles = count_calls(app.jinja_env, 'compile')
+        self.assertEqual(template_cache.warm(app)[0], count)
+        self.assertEqual(compiles[0], 0)
+
+    def test_no_cache(self):
+        """
+        Tests an app without TEMPLATE_CACHE_DIR. Expect it to compile every template.
+        """
+        app = create_app(TEMPLATE_CACHE_DIR = None)
+        compiles = count_calls(app.jinja_env, 'compile')
+        count, seconds = template_cache.warm(app)
+        self.assertEqual(compiles[0], count)
+        self.assertIsNone(app.jinja_env.bytecode_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
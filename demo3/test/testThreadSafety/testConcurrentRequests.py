@@ -0,0 +1,111 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from app import create_app
+from exts import db
+from benchmarks.seed import get_layout, get_scale, seed
+from instrumentation.profiler import Profiler
+
+THREADS = 8
+
+
+def run_together(target, count):
+    """
+    Runs target(i) for i in range(count), each in its own thread, all
+    starting at the same time.
+
+    Returns:
+        The list of the values returned, in the order of i.
+    """
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    errors = []
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = target(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target = run, args = (i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+class ConcurrentRequestTest(unittest.TestCase):
+    """
+    Tests the app handles requests from several threads at once, as
+    gunicorn's gthread workers do
+    """
+
+    def setUp(self):
+        # Each thread needs its own connection, which an in-memory database cannot give
+        self.folder = tempfile.mkdtemp()
+        self.app = create_app(TESTING = True, SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(self.folder, 'threads.db'),
+                              SQLALCHEMY_BINDS = {}, SQLALCHEMY_REPLICA_BINDS = [], SQL_QUERY_HEADERS = True)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        seed(get_scale('tiny'), log = lambda message: None)
+        db.session.remove()
+        first, last = get_layout(get_scale('tiny'))['customers']
+        self.uids = [first + i % (last - first + 1) for i in range(THREADS)]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.folder)
+
+    def get_as(self, uid, path):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session['account'] = uid
+            session['type'] = -1
+        response = client.get(path)
+        return response.status_code, response.get_data(as_text = True), response.headers.get('X-SQL-Queries')
+
+    def test_sessions_are_not_shared(self):
+        """
+        Tests every thread loading its own profile at once. Expect each to see its own user.
+        """
+        results = run_together(lambda i: self.get_as(self.uids[i], '/profile'), THREADS)
+        for uid, (status, page, queries) in zip(self.uids, results):
+            self.assertEqual(status, 200)
+            self.assertIn("user%d@bench.test" % uid, page)
+
+    def test_query_counts_are_per_request(self):
+        """
+        Tests the query count of concurrent requests. Expect each to count only its own queries.
+        """
+        serial = self.get_as(self.uids[0], '/favourites')[2]
+        results = run_together(lambda i: self.get_as(self.uids[0], '/favourites'), THREADS)
+        self.assertEqual([queries for status, page, queries in results], [serial] * THREADS)
+
+    def test_one_profiler_sampler(self):
+        """
+        Tests the first profiled requests of several threads. Expect them to share one sampler thread.
+        """
+        profiler = Profiler()
+        samplers = run_together(lambda i: profiler.get_sampler(0.05), THREADS)
+        self.assertTrue(all(sampler is samplers[0] for sampler in samplers))
+
+    def test_dispose_engines(self):
+        """
+        Tests disposing the engines, as a worker does after the fork. Expect new engines to be made.
+        """
+        engine = db.engine
+        db.dispose_engines(self.app)
+        self.assertIsNot(db.engine, engine)
+        self.assertEqual(db.session.execute("SELECT count(*) FROM user").scalar(), get_scale('tiny')['users'])
+
+
+if __name__ == '__main__':
+    unittest.main()
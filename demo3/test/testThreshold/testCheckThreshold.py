@@ -1,7 +1,9 @@
 import unittest
+import pytest
 from app import app
 from databaseHelpers.threshold import *
 
+@pytest.mark.usefixtures('database')
 class CheckThresholdTest(unittest.TestCase):
     '''
     Tests check_threshold(rid, level) in databaseHelpers/threshold.py.
@@ -9,13 +11,14 @@ class CheckThresholdTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
 
     def test_check_no_threshold(self):
         """
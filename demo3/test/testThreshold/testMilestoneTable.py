@@ -0,0 +1,69 @@
+import unittest
+import pytest
+from app import app
+from databaseHelpers.threshold import *
+from instrumentation.queries import count_queries
+
+@pytest.mark.usefixtures('database')
+class MilestoneTableTest(unittest.TestCase):
+    '''
+    Tests get_milestone_table() and get_crossed_milestones() in databaseHelpers/threshold.py.
+    '''
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
+        self.app = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+        for level, reward in [(5, 50), (1, 10), (3, 30)]:
+            db.session.add(Thresholds(rid = 3, level = level, reward = reward))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+
+    def test_sorted_and_cached(self):
+        """
+        Test reading the table twice. Expect the levels sorted and no query the second time.
+        """
+        self.assertEqual(get_milestone_table(3), ([1, 3, 5], [10, 30, 50]))
+        with count_queries() as log:
+            self.assertEqual(get_milestone_table(3), ([1, 3, 5], [10, 30, 50]))
+        self.assertEqual(log.count, 0)
+
+    def test_changes_invalidate(self):
+        """
+        Test inserting, updating and deleting thresholds of a cached table. Expect each change read back.
+        """
+        get_milestone_table(3)
+        insert_threshold(3, 2, 20)
+        self.assertEqual(get_milestone_table(3), ([1, 2, 3, 5], [10, 20, 30, 50]))
+        update_threshold(3, 2, 25)
+        self.assertEqual(get_milestone_table(3), ([1, 2, 3, 5], [10, 25, 30, 50]))
+        delete_threshold(3, 2)
+        self.assertEqual(get_milestone_table(3), ([1, 3, 5], [10, 30, 50]))
+
+    def test_expired(self):
+        """
+        Test a table cached longer than THRESHOLD_CACHE_SECONDS. Expect it read again.
+        """
+        get_milestone_table(3)
+        app.config['THRESHOLD_CACHE_SECONDS'] = 0
+        try:
+            with count_queries() as log:
+                get_milestone_table(3)
+        finally:
+            app.config['THRESHOLD_CACHE_SECONDS'] = 60
+        self.assertEqual(log.count, 1)
+
+    def test_crossed_milestones(self):
+        """
+        Test going from level 1 to level 5, and from level 5 up. Expect the milestones above the old level up to the new one.
+        """
+        self.assertEqual(get_crossed_milestones(3, 1, 5), [{"level": 3, "reward": 30}, {"level": 5, "reward": 50}])
+        self.assertEqual(get_crossed_milestones(3, 0, 2), [{"level": 1, "reward": 10}])
+        self.assertEqual(get_crossed_milestones(3, 5, 9), [])
+        self.assertEqual(get_next_milestone(3, 3), {"level": 5, "reward": 50})
+        self.assertIsNone(get_next_milestone(3, 5))
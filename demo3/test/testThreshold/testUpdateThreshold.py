@@ -1,9 +1,11 @@
 import unittest
+import pytest
 
 from app import app
 from databaseHelpers.threshold import *
 
 
+@pytest.mark.usefixtures('database')
 class UpdatorThresholdTest(unittest.TestCase):
     '''
     Tests update_threshold(rid, level, reward) in databaseHelpers/threshold.py.
@@ -11,13 +13,14 @@ class UpdatorThresholdTest(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = app.config['TEST_DATABASE_URI']
         self.app = app.test_client()
-        db.create_all()
+        self.ctx = app.app_context()
+        self.ctx.push()
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        self.ctx.pop()
         
     def test_update_negative_reward_threshold(self):
         """
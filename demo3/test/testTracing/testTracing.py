@@ -0,0 +1,100 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import pytest
+from databaseHelpers.leaderboard import get_data, top_n_in_order
+from instrumentation.tracing import tracing, current_trace
+
+
+@pytest.mark.usefixtures('seeded')
+class TracingTest(unittest.TestCase):
+    """
+    Tests instrumentation/tracing.py on the seeded app of conftest.py
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.app.config['TRACE_DIR'] = self.folder
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def load(self, path):
+        with open(path) as f:
+            return json.load(f)['traceEvents']
+
+    def test_nested_helpers(self):
+        """
+        Tests tracing a helper that calls helpers. Expect SQL spans inside the inner helpers' spans.
+        """
+        path = os.path.join(self.folder, 'trace.json')
+        with tracing(path):
+            get_data(top_n_in_order(1, 3))
+        self.assertIsNone(current_trace())
+        events = self.load(path)
+        by_id = {e['args']['id']: e for e in events}
+        names = [e['name'] for e in events]
+        self.assertEqual(names[0], 'trace')
+        self.assertEqual(names.count('leaderboard.get_data'), 1)
+        self.assertEqual(names.count('user.get_user_name_by_uid'), 3)
+        for e in events:
+            if e['name'] == 'user.get_user_name_by_uid':
+                self.assertEqual(by_id[e['args']['parent']]['name'], 'leaderboard.get_data')
+            if e['cat'] == 'sql':
+                parent = by_id[e['args']['parent']]
+                self.assertEqual(parent['cat'], 'helper')
+                self.assertGreaterEqual(e['ts'], parent['ts'])
+                self.assertLessEqual(e['ts'] + e['dur'], parent['ts'] + parent['dur'] + 1)
+
+    def test_exception(self):
+        """
+        Tests a helper that raises inside a traced block. Expect its span to be closed and tracing to stop.
+        """
+        path = os.path.join(self.folder, 'trace.json')
+        with self.assertRaises(TypeError):
+            with tracing(path):
+                get_data([None])
+        self.assertIsNone(current_trace())
+        self.assertEqual([e['name'] for e in self.load(path)], ['trace', 'leaderboard.get_data'])
+
+    def test_untraced_request(self):
+        """
+        Tests a request with TRACE_SAMPLE_RATE 0. Expect no trace.
+        """
+        self.app.test_client().get('/login')
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_traced_request(self):
+        """
+        Tests a traced request. Expect a trace with the route, helper, SQL and template spans.
+        """
+        self.app.config['TRACE_SAMPLE_RATE'] = 1.0
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session['account'] = 1
+            session['type'] = 1
+        client.get('/leaderBoard')
+        self.assertIsNone(current_trace())
+        files = os.listdir(self.folder)
+        self.assertEqual(len(files), 1)
+        events = self.load(os.path.join(self.folder, files[0]))
+        self.assertEqual(events[0]['name'], 'GET leaderboard_page.leaderboard')
+        self.assertIsNone(events[0]['args']['parent'])
+        self.assertEqual(set(e['cat'] for e in events), {'route', 'helper', 'sql', 'template'})
+
+    def test_keep(self):
+        """
+        Tests tracing more requests than TRACE_KEEP. Expect only the newest traces to be kept.
+        """
+        self.app.config['TRACE_SAMPLE_RATE'] = 1.0
+        self.app.config['TRACE_KEEP'] = 2
+        client = self.app.test_client()
+        for i in range(4):
+            client.get('/login')
+        self.assertEqual(len(os.listdir(self.folder)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()